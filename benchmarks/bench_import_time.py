@@ -0,0 +1,84 @@
+"""Benchmark: cold import time of each toolbox module against a budget.
+
+Every module is imported in a fresh interpreter under `python -X importtime`;
+the best cumulative time of several runs is compared with its budget, and the
+script exits non-zero when any module is over, so it can gate CI. Run with:
+python benchmarks/bench_import_time.py [budget_ms] [module ...]
+"""
+
+import re
+import sys
+import subprocess
+
+RUNS = 5
+DEFAULT_BUDGET_MS = 250.0
+# modules that must stay light: no third-party imports, no .env loading
+BUDGETS_MS = {"toolbox": 5.0, "toolbox.exceptions": 30.0, "toolbox.hash": 30.0}
+MODULES = (
+    "toolbox",
+    "toolbox.exceptions",
+    "toolbox.hash",
+    "toolbox.dot_env",
+    "toolbox.utils",
+    "toolbox.log",
+    "toolbox.fs",
+    "toolbox.date",
+    "toolbox.bucket",
+    "toolbox.calc",
+    "toolbox.runner",
+    "toolbox.web",
+    "toolbox.api",
+)
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Return {name: (self_us, cumulative_us)} for module and what it pulled in.
+
+    Interpreter startup imports (site, encodings, ...) are left out: only lines
+    nested under module's own entry in the -X importtime tree are kept.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr.strip()}")
+    rows = [m.groups() for m in map(_LINE_RE.match, proc.stderr.splitlines()) if m]
+    end = next(i for i, row in enumerate(rows) if row[3] == module)
+    depth = len(rows[end][2])
+    start = end
+    while start and len(rows[start - 1][2]) > depth:
+        start -= 1
+    return {name: (int(own), int(cum)) for own, cum, _, name in rows[start : end + 1]}
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    budget = float(args.pop(0)) if args and args[0][0].isdigit() else None
+    modules = args or MODULES
+    over = []
+    for module in modules:
+        runs = [import_times(module) for _ in range(RUNS)]
+        best = min(runs, key=lambda t: t[module][1])
+        total = best[module][1] / 1000
+        limit = budget or BUDGETS_MS.get(module, DEFAULT_BUDGET_MS)
+        heaviest = sorted(
+            (name for name in best if name != module),
+            key=lambda name: best[name][0],
+            reverse=True,
+        )[:3]
+        status = "ok" if total <= limit else "OVER"
+        print(
+            f"{module:<20} {total:8.2f} ms (budget {limit:6.1f}) {status:<4}  "
+            f"heaviest: {', '.join(heaviest) or '-'}"
+        )
+        if total > limit:
+            over.append(module)
+    if over:
+        raise SystemExit(f"over import-time budget: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
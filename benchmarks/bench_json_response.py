@@ -0,0 +1,54 @@
+"""Benchmark: ToolboxJSONResponse vs. FastAPI's default JSON path on large lists.
+
+The baseline mirrors what endpoints did before: obj_to_srl, then
+jsonable_encoder, then JSONResponse. Run with:
+python benchmarks/bench_json_response.py [n_items]
+"""
+
+import sys
+import uuid
+import timeit
+from decimal import Decimal
+from datetime import datetime, timezone
+from hexbytes import HexBytes
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from toolbox.api import ToolboxJSONResponse
+from toolbox.utils import obj_to_srl, orjson
+
+N_ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+
+def build_payload(n: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "tx": HexBytes(i.to_bytes(32, "big")),
+            "price": Decimal(f"{i}.{i % 100:02d}"),
+            "qty": Decimal(i % 7),
+            "ts": now,
+            "tags": ["a", "b", i],
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    payload = build_payload(N_ITEMS)
+
+    def default() -> bytes:
+        return JSONResponse(jsonable_encoder(obj_to_srl(payload))).body
+
+    def toolbox() -> bytes:
+        return ToolboxJSONResponse(payload).body
+
+    engine = "orjson" if orjson is not None else "stdlib json"
+    print(f"{N_ITEMS} items, ToolboxJSONResponse using {engine}")
+    for name, fn in (("JSONResponse", default), ("ToolboxJSONResponse", toolbox)):
+        best = min(timeit.repeat(fn, number=3, repeat=5)) / 3
+        print(f"{name:<20} {best * 1000:8.2f} ms/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Microbenchmark: RouteIndex vs. a linear path_regex scan over 500+ routes.
+
+Run with: python benchmarks/bench_route_index.py [n_routes]
+"""
+
+import sys
+import random
+import timeit
+from fastapi import FastAPI
+from toolbox.api import RouteIndex, compile_globs
+
+N_ROUTES = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+SKIP = ["/", "/docs", "/openapi.json", "/favicon.ico", "/static/*", "/health*"]
+
+
+def build_app(n: int) -> FastAPI:
+    app = FastAPI()
+    for i in range(n):
+        if i % 3 == 0:
+            path = f"/svc{i}/items"
+        elif i % 3 == 1:
+            path = f"/svc{i}/items/{{item_id:int}}"
+        else:
+            path = f"/svc{i}/users/{{name}}/orders/{{order_id}}"
+        app.add_api_route(path, lambda: None, methods=["GET"])
+    return app
+
+
+def sample_paths(n: int, k: int = 1000) -> list[str]:
+    random.seed(0)
+    paths = []
+    for _ in range(k):
+        i = random.randrange(n)
+        paths.append(
+            [
+                f"/svc{i}/items",
+                f"/svc{i}/items/{i}",
+                f"/svc{i}/users/bob/orders/{i}",
+                f"/unknown/{i}",
+            ][random.randrange(4)]
+        )
+    return paths
+
+
+def main() -> None:
+    app = build_app(N_ROUTES)
+    paths = sample_paths(N_ROUTES)
+    index = RouteIndex(app).build()
+    skip = compile_globs(SKIP)
+    routes = RouteIndex.collect(app.routes)
+
+    from fnmatch import fnmatch
+
+    def linear() -> None:
+        for p in paths:
+            any(route.path_regex.match(p) for route in RouteIndex.collect(app.routes))
+            any(fnmatch(p, s) for s in SKIP)
+
+    def indexed() -> None:
+        for p in paths:
+            index.match(p)
+            skip.match(p)
+
+    for p in paths:
+        assert index.match(p) == any(r.path_regex.match(p) for r in routes), p
+
+    for name, fn in (("linear scan", linear), ("RouteIndex", indexed)):
+        best = min(timeit.repeat(fn, number=5, repeat=5)) / (5 * len(paths))
+        print(f"{name:<12} {len(routes)} routes: {best * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
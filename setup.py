@@ -22,6 +22,12 @@ setup(
             "fastapi",
             "scalar-fastapi",
         ],
+        "fast": [
+            "orjson",
+            "uvloop; sys_platform != 'win32'",
+            "httptools",
+            "sortedcontainers",
+        ],
     },
     url="https://github.com/Valcrist/toolbox",
     author="Valcrist",
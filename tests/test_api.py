@@ -0,0 +1,389 @@
+import time
+import asyncio
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from toolbox.api import (
+    MetricsRegistry,
+    RouteIndex,
+    Tarpit,
+    TokenBuckets,
+    cache_response,
+    get_route_index,
+    init_metrics,
+    init_response_cache,
+    rate_limit_middleware,
+)
+from toolbox.exceptions import ToolboxError
+
+
+def make_app():
+    app = FastAPI()
+    cache = init_response_cache(app, ttl=60)
+    calls = {"me": 0, "news": 0, "login": 0}
+
+    @app.get("/me")
+    async def me(request: Request):
+        calls["me"] += 1
+        await asyncio.sleep(0.01)
+        return {"user": request.headers.get("authorization")}
+
+    @app.get("/news")
+    @cache_response(ttl=60)
+    async def news():
+        calls["news"] += 1
+        await asyncio.sleep(0.01)
+        return {"news": calls["news"]}
+
+    @app.get("/login")
+    @cache_response(ttl=60)
+    async def login(request: Request, response: Response):
+        calls["login"] += 1
+        await asyncio.sleep(0.01)
+        response.set_cookie("session", request.query_params.get("u", ""))
+        return {"user": request.query_params.get("u")}
+
+    return app, cache, calls
+
+
+async def fetch_all(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+        return await asyncio.gather(*(c.get(url, headers=h) for url, h in requests))
+
+
+def test_undecorated_route_is_not_coalesced():
+    app, cache, calls = make_app()
+    reqs = [("/me", {"authorization": f"user{i}"}) for i in range(5)]
+    responses = asyncio.run(fetch_all(app, reqs))
+    assert [r.json()["user"] for r in responses] == [f"user{i}" for i in range(5)]
+    assert calls["me"] == 5
+    assert "x-cache" not in responses[0].headers
+
+
+def test_cacheable_route_coalesces_and_hits():
+    app, cache, calls = make_app()
+    responses = asyncio.run(fetch_all(app, [("/news", {})] * 5))
+    assert {r.json()["news"] for r in responses} == {1}
+    assert calls["news"] == 1
+    again = asyncio.run(fetch_all(app, [("/news", {})]))[0]
+    assert again.headers["x-cache"] == "HIT"
+
+
+def test_if_none_match_compares_whole_etags():
+    app, cache, calls = make_app()
+    etag = asyncio.run(fetch_all(app, [("/news", {})]))[0].headers["etag"]
+    inner = etag.strip('"')
+    headers = [
+        f'"x", W/{etag}',
+        "*",
+        f'"{inner}x"',
+        f'"v{etag}"',  # contains the etag, but as part of another tag
+        f'"x", {etag}-gzip',
+    ]
+    reqs = [("/news", {"if-none-match": h}) for h in headers]
+    statuses = [r.status_code for r in asyncio.run(fetch_all(app, reqs))]
+    assert statuses == [304, 304, 200, 200, 200]
+
+
+def test_authorization_and_cookie_bypass_cache():
+    app, cache, calls = make_app()
+    asyncio.run(fetch_all(app, [("/news", {"authorization": "a"})]))
+    asyncio.run(fetch_all(app, [("/news", {"cookie": "s=1"})]))
+    assert calls["news"] == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_set_cookie_response_is_never_shared():
+    app, cache, calls = make_app()
+    responses = asyncio.run(fetch_all(app, [("/login?u=bob", {})] * 3))
+    assert calls["login"] == 3
+    assert all(r.cookies.get("session") == "bob" for r in responses)
+    assert cache.stats()["entries"] == 0
+
+
+def test_use_toolbox_json_skips_jsonable_encoder(monkeypatch):
+    import fastapi.routing
+    from datetime import datetime, timezone
+    from fastapi import BackgroundTasks
+    from hexbytes import HexBytes
+    from toolbox.api import use_toolbox_json
+    from toolbox.utils import obj_to_srl
+
+    def no_encoder(obj, *args, **kwargs):
+        if isinstance(obj, (dict, list)):
+            raise AssertionError("jsonable_encoder walked the return value")
+        return obj
+
+    monkeypatch.setattr(fastapi.routing, "jsonable_encoder", no_encoder)
+    app = FastAPI()
+    use_toolbox_json(app)
+    data = {"ts": datetime(2024, 1, 2, tzinfo=timezone.utc), "tx": HexBytes(b"\x01")}
+    done = []
+
+    @app.get("/data", status_code=201)
+    def get_data(response: Response, tasks: BackgroundTasks):
+        response.set_cookie("seen", "1")
+        tasks.add_task(done.append, True)
+        return data
+
+    response = asyncio.run(fetch_all(app, [("/data", {})]))[0]
+    assert response.status_code == 201
+    assert response.cookies.get("seen") == "1"
+    assert response.json() == obj_to_srl(data)
+    assert done == [True]
+
+
+def test_route_index_resolves_templates():
+    app = FastAPI()
+    router, inner = APIRouter(), APIRouter()
+    app.get("/items/latest")(lambda: None)
+    app.get("/items/{item_id:int}")(lambda item_id: None)
+    app.get("/files/{path:path}")(lambda path: None)
+    app.get("/v{major}.{minor}")(lambda major, minor: None)
+    router.get("/users/{name}")(lambda name: None)
+    inner.get("/ping")(lambda: None)
+    router.include_router(inner, prefix="/inner")
+    app.include_router(router, prefix="/sub")
+
+    index = get_route_index(app)
+    assert index is get_route_index(app)
+    assert index.lookup("/items/latest") == "/items/latest"
+    assert index.lookup("/items/5") == "/items/{item_id:int}"
+    assert index.lookup("/items/five") is None
+    assert index.lookup("/files/a/b.txt") == "/files/{path:path}"
+    assert index.lookup("/v1.2") == "/v{major}.{minor}"
+    assert index.lookup("/sub/users/bob") == "/sub/users/{name}"
+    assert index.lookup("/sub/inner/ping") == "/sub/inner/ping"
+    assert not index.match("/nope")
+
+    app.get("/nope")(lambda: None)
+    assert index.match("/nope")
+
+
+def test_logger_middleware_tees_request_and_response_bodies(monkeypatch):
+    import toolbox.api as api
+
+    logged = {}
+    monkeypatch.setattr(
+        api, "_log_request", lambda url, headers, tee: logged.update(req=tee.value())
+    )
+    monkeypatch.setattr(
+        api, "_log_response", lambda url, *args: logged.update(resp=args[-1].value())
+    )
+    app = FastAPI()
+    api.logger_middleware(app, "PROD", log_requests=True, log_response=True)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return Response(await request.body(), media_type="application/json")
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.post("/echo", content=b'{"hello": "world"}')
+
+    response = asyncio.run(post())
+    api._log_executor.submit(lambda: None).result()
+    assert response.content == b'{"hello": "world"}'
+    assert logged == {"req": b'{"hello": "world"}', "resp": b'{"hello": "world"}'}
+
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    items = registry.route("GET", '/items/"{id}"')
+    items.observe(200, 5_000_000)
+    items.observe(200, 50_000_000)
+    items.observe(503, 500_000_000)
+    lines = registry.render().splitlines()
+
+    label = 'method="GET",route="/items/\\"{id}\\""'
+    assert f'http_requests_total{{{label},status="2xx"}} 2' in lines
+    assert f'http_requests_total{{{label},status="5xx"}} 1' in lines
+    name = "http_request_duration_seconds"
+    assert f'{name}_bucket{{{label},le="0.01"}} 1' in lines
+    assert f'{name}_bucket{{{label},le="0.1"}} 2' in lines
+    assert f'{name}_bucket{{{label},le="+Inf"}} 3' in lines
+    assert f"{name}_count{{{label}}} 3" in lines
+    assert "# TYPE http_requests_in_flight gauge" in lines
+    assert registry.snapshot()[0]["status"] == {"2xx": 2, "5xx": 1}
+
+
+def test_metrics_middleware_labels_by_route_and_folds_methods():
+    app = FastAPI()
+    registry = init_metrics(app)
+
+    @app.api_route("/items/{item_id}", methods=["GET", "PURGE"])
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            for i in range(3):
+                await c.get(f"/items/{i}")
+            await c.request("PURGE", "/items/1")
+            await c.request("BREW", "/items/1")
+            await c.get("/missing")
+            return await c.get("/metrics")
+
+    response = asyncio.run(run())
+    counts = {(m["method"], m["route"]): m["requests"] for m in registry.snapshot()}
+    assert counts == {
+        ("GET", "/items/{item_id}"): 3,
+        ("OTHER", "/items/{item_id}"): 2,
+        ("GET", "<unmatched>"): 1,
+    }
+    assert 'route="/items/{item_id}",status="2xx"} 3' in response.text
+
+
+def test_token_buckets_refill_and_evict():
+    buckets = TokenBuckets(rate=10, burst=2, max_clients=2)
+    assert buckets.take("a") == 0 and buckets.take("a") == 0
+    wait = buckets.take("a")
+    assert 0.09 < wait <= 0.1
+    buckets.take("b")
+    buckets.take("c")
+    assert len(buckets) == 2
+    assert buckets.take("a") == 0  # "a" was evicted and starts full again
+    with pytest.raises(ToolboxError):
+        TokenBuckets(rate=0, burst=1)
+
+
+def test_tarpit_holds_then_turns_away_when_full():
+    tarpit = Tarpit(delay=0.05, max_held=2, resolution=0.01)
+
+    async def run():
+        started = time.perf_counter()
+        held = await asyncio.gather(*(tarpit.hold() for _ in range(3)))
+        return held, time.perf_counter() - started
+
+    held, elapsed = asyncio.run(run())
+    assert sorted(held) == [False, True, True]
+    assert elapsed >= 0.05
+    assert tarpit.held == 0
+
+
+def test_rate_limit_ignores_client_chosen_headers():
+    app = FastAPI()
+    rate_limit_middleware(app, rate=0.01, burst=1)
+    app.get("/ping")(lambda: "pong")
+
+    reqs = [("/ping", {"x-api-key": f"key{i}"}) for i in range(10)]
+    responses = asyncio.run(fetch_all(app, reqs))
+    assert sorted(r.status_code for r in responses) == [200] + [429] * 9
+    assert all(
+        int(r.headers["retry-after"]) >= 1 for r in responses if r.status_code == 429
+    )
+
+
+def test_rate_limit_key_func_and_route_limits():
+    app = FastAPI()
+    keys = {"good": "acct-1"}
+    rate_limit_middleware(
+        app,
+        rate=0.01,
+        burst=5,
+        route_limits={"/search*": (0.01, 1)},
+        key_func=lambda r: keys.get(r.headers.get("x-api-key"), r.client.host),
+    )
+    app.get("/ping")(lambda: "pong")
+    app.get("/search/{q}")(lambda q: q)
+
+    search = asyncio.run(fetch_all(app, [("/search/a", {}), ("/search/b", {})]))
+    assert sorted(r.status_code for r in search) == [200, 429]
+    ping = asyncio.run(
+        fetch_all(app, [("/ping", {"x-api-key": "good"})] * 5 + [("/ping", {})] * 5)
+    )
+    assert [r.status_code for r in ping] == [200] * 10
+
+
+def test_streaming_routes_are_never_buffered_or_cached():
+    app = FastAPI()
+    cache = init_response_cache(app, ttl=60, paths=["/ticks", "/events"])
+    calls = {"ticks": 0, "events": 0}
+
+    async def numbers():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield f"{i}\n"
+
+    @app.get("/ticks")
+    async def ticks():
+        calls["ticks"] += 1
+        return StreamingResponse(numbers(), media_type="text/plain")
+
+    @app.get("/events", response_class=StreamingResponse)
+    async def events():
+        calls["events"] += 1
+        return StreamingResponse(numbers(), media_type="text/event-stream")
+
+    reqs = [("/ticks", {})] * 3 + [("/events", {})] * 3
+    responses = asyncio.run(fetch_all(app, reqs))
+    assert [r.text for r in responses] == ["0\n1\n2\n"] * 6
+    assert all("x-cache" not in r.headers for r in responses)
+    assert calls["events"] == 3
+    again = asyncio.run(fetch_all(app, [("/ticks", {})] * 2))
+    assert [r.text for r in again] == ["0\n1\n2\n"] * 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_route_index_prefers_the_first_declared_route():
+    app = FastAPI()
+    app.post("/items/latest")(lambda: None)
+    app.get("/items/{name}")(lambda name: None)
+    app.get("/items/latest")(lambda: None)
+    app.get("/files/{path:path}")(lambda path: None)
+    app.get("/files/readme")(lambda: None)
+
+    assert get_route_index(app).lookup("/items/latest") == "/items/latest"
+    gets = RouteIndex(app, methods=("GET",))
+    assert gets.lookup("/items/latest") == "/items/{name}"
+    assert gets.lookup("/files/readme") == "/files/{path:path}"
+
+
+def test_cache_policy_follows_the_dispatched_route():
+    app = FastAPI()
+    cache = init_response_cache(app)
+    calls = []
+
+    @app.get("/items/{name}")
+    async def item(name: str):
+        calls.append(name)
+        return {"name": name, "call": len(calls)}
+
+    @app.get("/items/special")
+    @cache_response(ttl=60)
+    async def special():  # shadowed: Starlette dispatches to item() first
+        return {"special": True}
+
+    responses = asyncio.run(fetch_all(app, [("/items/special", {})] * 3))
+    assert sorted(r.json()["call"] for r in responses) == [1, 2, 3]
+    assert all("x-cache" not in r.headers for r in responses)
+    assert cache.stats()["entries"] == 0
+
+
+def test_run_server_production_profile(monkeypatch, tmp_path):
+    import toolbox.api as api
+
+    runs = []
+    monkeypatch.setattr(api.uvicorn, "run", lambda app, **kw: runs.append((app, kw)))
+    monkeypatch.setattr(api, "find_spec", lambda name: None)
+    monkeypatch.setattr(api.os, "cpu_count", lambda: 3)
+    (tmp_path / "preload_app.py").write_text("app = object()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    api.run_server("preload_app:app", "PROD", production=True)
+    app, kw = runs[-1]
+    assert app == "preload_app:app"
+    assert (kw["workers"], kw["timeout_graceful_shutdown"]) == (3, 30)
+    assert (kw["loop"], kw["http"]) == ("asyncio", "h11")
+
+    api.run_server("preload_app:app", "DEV", hot_reload=True, workers=4)
+    assert runs[-1][1]["workers"] == 1 and runs[-1][1]["loop"] == "auto"
+
+    api.run_server("preload_app:app", "PROD", preload=True, uds="/tmp/api.sock")
+    app, kw = runs[-1]
+    assert app is __import__("preload_app").app
+    assert kw["uds"] == "/tmp/api.sock" and kw["workers"] == 1
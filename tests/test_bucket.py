@@ -0,0 +1,59 @@
+from array import array
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pytest
+from toolbox.bucket import aggregate, ceil_ts, floor_ts, ohlc
+from toolbox.exceptions import ToolboxError
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def local_midnight(ts: int) -> int:
+    day = datetime.fromtimestamp(ts, NEW_YORK)
+    return int(day.replace(hour=0, minute=0, second=0).timestamp())
+
+
+def test_floor_and_ceil_in_utc():
+    ts = [0, 299, 300, 301]
+    assert floor_ts(ts, "5m") == array("q", [0, 0, 300, 300])
+    assert ceil_ts(ts, 300) == array("q", [0, 300, 300, 600])
+    assert floor_ts([1_500], "1s", unit="ms") == array("q", [1_000])
+    with pytest.raises(ToolboxError):
+        floor_ts(ts, "5x")
+
+
+def test_daily_buckets_follow_local_midnight_across_dst():
+    spring = int(datetime(2024, 3, 9, tzinfo=NEW_YORK).timestamp())
+    autumn = int(datetime(2024, 11, 2, tzinfo=NEW_YORK).timestamp())
+    ts = [start + h * 3600 + 59 for start in (spring, autumn) for h in range(72)]
+    expected = array("q", [local_midnight(t) for t in ts])
+    assert floor_ts(ts, "1d", tz="America/New_York") == expected
+
+
+def test_hourly_buckets_on_a_half_hour_offset():
+    ts = int(datetime(2024, 1, 1, 10, 45, tzinfo=ZoneInfo("Asia/Kolkata")).timestamp())
+    start = datetime(2024, 1, 1, 10, tzinfo=ZoneInfo("Asia/Kolkata")).timestamp()
+    assert floor_ts([ts], "1h", tz="Asia/Kolkata") == array("q", [int(start)])
+    assert floor_ts([ts], "1h") == array("q", [ts - ts % 3600])
+
+
+def test_numpy_input_matches_python():
+    np = pytest.importorskip("numpy")
+    ts = list(range(1_710_000_000, 1_710_400_000, 7_777))
+    for tz in (None, "America/New_York"):
+        expected = floor_ts(ts, "15m", tz=tz)
+        assert floor_ts(np.array(ts), "15m", tz=tz).tolist() == expected.tolist()
+        assert floor_ts(array("q", ts), "15m", tz=tz) == expected
+
+
+def test_ohlc_and_aggregate():
+    ts = [0, 10, 70, 80, 130]
+    bars = ohlc(ts, [1, 3, 2, 5, 4], interval="1m", volumes=[1, 1, 2, 2, 3])
+    assert list(bars["bucket"]) == [0, 60, 120]
+    assert bars["open"] == [1, 2, 4] and bars["close"] == [3, 5, 4]
+    assert bars["high"] == [3, 5, 4] and bars["low"] == [1, 2, 4]
+    assert list(bars["count"]) == [2, 2, 1] and bars["volume"] == [2, 4, 3]
+    counts = aggregate(ts, interval=120, aggs=["count"])
+    assert list(counts["bucket"]) == [0, 120] and list(counts["count"]) == [4, 1]
+    with pytest.raises(ToolboxError):
+        aggregate(ts, interval=120)
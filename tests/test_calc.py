@@ -0,0 +1,177 @@
+import math
+import random
+import statistics
+from decimal import Decimal
+import pytest
+from toolbox import calc
+from toolbox.calc import NearestIndex, P2Quantile, deltas, ema, rolling, select_nearest
+from toolbox.exceptions import ToolboxError
+
+random.seed(44)
+SERIES = [random.uniform(-50, 150) for _ in range(2000)] + [0.0, 0.0, 5.0]
+INTS = [random.randint(-5, 5) for _ in range(500)]
+
+
+def naive_rolling(values, window, stat, ddof=1):
+    result = []
+    for i in range(len(values)):
+        if i + 1 < window:
+            result.append(None)
+            continue
+        chunk = values[i + 1 - window : i + 1]
+        if stat == "mean":
+            result.append(sum(chunk) / window)
+        elif stat == "sum":
+            result.append(sum(chunk))
+        elif stat == "min":
+            result.append(min(chunk))
+        elif stat == "max":
+            result.append(max(chunk))
+        else:
+            if window - ddof <= 0:
+                result.append(None)
+                continue
+            mean = sum(chunk) / window
+            var = sum((v - mean) ** 2 for v in chunk) / (window - ddof)
+            result.append(var if stat == "var" else math.sqrt(var))
+    return result
+
+
+def close(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def naive_pct(values):
+    return [(b - a) / a * 100 if a else None for a, b in zip(values, values[1:])]
+
+
+@pytest.mark.parametrize("values", [SERIES, INTS])
+def test_deltas_match_naive(values):
+    expected = [b - a for a, b in zip(values, values[1:])]
+    assert deltas(values) == pytest.approx(expected)
+    assert all(map(close, deltas(values, pct=True), naive_pct(values)))
+
+
+@pytest.mark.parametrize("values", [SERIES, INTS])
+def test_numpy_deltas_match_naive(values):
+    np = pytest.importorskip("numpy")
+    expected = [b - a for a, b in zip(values, values[1:])]
+    assert deltas(np.array(values)).tolist() == pytest.approx(expected)
+    expected_pct = naive_pct(values)
+    vectorized = deltas(np.array(values), pct=True).tolist()
+    assert all(
+        math.isnan(got) if want is None else close(got, want)
+        for got, want in zip(vectorized, expected_pct)
+    )
+
+
+def test_ema_matches_naive():
+    alpha = 2 / (10 + 1)
+    expected, value = [], None
+    for x in SERIES:
+        value = x if value is None else alpha * x + (1 - alpha) * value
+        expected.append(value)
+    assert ema(SERIES, span=10) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("values", [SERIES, INTS])
+@pytest.mark.parametrize("window", [1, 2, 7, 50])
+def test_rolling_matches_naive(values, window):
+    stats = ("mean", "sum", "min", "max", "var", "std")
+    result = rolling(values, window, stats=stats)
+    for stat in stats:
+        expected = naive_rolling(values, window, stat)
+        assert all(map(close, result[stat], expected)), stat
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.9, 0.99])
+def test_p2_quantile_tracks_exact_quantile(q):
+    values = [random.gauss(0, 1) for _ in range(20_000)]
+    sketch = P2Quantile(q)
+    for value in values:
+        sketch.update(value)
+    exact = statistics.quantiles(values, n=1000, method="inclusive")[
+        round(q * 1000) - 1
+    ]
+    assert sketch.value == pytest.approx(exact, abs=0.05)
+
+
+def test_p2_quantile_exact_for_few_values():
+    sketch = P2Quantile(0.5)
+    for value in (5, 1, 3):
+        sketch.update(value)
+    assert sketch.value == statistics.median([5, 1, 3])
+
+
+def test_streams_accept_decimal():
+    values = [Decimal("1.5"), Decimal("2.25"), Decimal("-0.75"), Decimal("4")]
+    floats = [float(v) for v in values]
+    assert ema(values, span=3) == pytest.approx(ema(floats, span=3))
+    stats = ("mean", "sum", "min", "max", "std")
+    result = rolling(values, 2, stats=stats)
+    expected = rolling(floats, 2, stats=stats)
+    for stat in stats:
+        assert all(map(close, result[stat], expected[stat])), stat
+    assert result["min"][1] == Decimal("1.5")
+    sketch = P2Quantile(0.5)
+    for value in values * 3:
+        sketch.update(value)
+    assert isinstance(sketch.value, float)
+
+
+@pytest.fixture(params=["optional", "pure"])
+def backend(request, monkeypatch):
+    if request.param == "pure":
+        monkeypatch.setattr(calc, "np", None)
+        monkeypatch.setattr(calc, "SortedList", None)
+    return request.param
+
+
+def test_nearest_index_matches_select_nearest(backend):
+    rng = random.Random(3)
+    options = [rng.randint(-50, 50) for _ in range(40)]
+    index = NearestIndex(options)
+    targets = [rng.uniform(-60, 60) for _ in range(200)] + [0.5, 10, -50, 50]
+    expected = [select_nearest(t, options) for t in targets]
+    assert [index.nearest(t) for t in targets] == expected
+    assert index.nearest_many(targets) == expected
+    assert index.nearest_many(sorted(targets)) == sorted(expected)
+    assert index.nearest_many(iter(targets)) == expected
+
+
+def test_nearest_index_ties(backend):
+    lower, higher = NearestIndex([1, 3, 7]), NearestIndex([1, 3, 7], ties="higher")
+    assert lower.nearest(2) == 1 and higher.nearest(2) == 3
+    assert lower.nearest_many([2, 5]) == [1, 3]
+    assert higher.nearest_many([2, 5]) == [3, 7]
+    assert lower.k_nearest(5, 3) == [3, 7, 1]
+    assert higher.k_nearest(5, 3) == [7, 3, 1]
+    assert lower.k_nearest(100, 5) == [7, 3, 1]
+    with pytest.raises(ToolboxError):
+        NearestIndex([1], ties="middle")
+
+
+def test_nearest_index_add_discard(backend):
+    index = NearestIndex([10, 20])
+    assert index.nearest_many([14]) == [10]
+    index.add(15)
+    assert 15 in index and list(index) == [10, 15, 20]
+    assert index.nearest_many([14]) == [15]
+    assert index.discard(15) and not index.discard(15)
+    assert index.nearest(14) == 10 and index.nearest_many([14]) == [10]
+    assert index.discard(10) and index.discard(20) and len(index) == 0
+    with pytest.raises(ToolboxError):
+        index.nearest(1)
+    with pytest.raises(ToolboxError):
+        index.nearest_many([1])
+
+
+def test_nearest_index_numpy_targets():
+    np = pytest.importorskip("numpy")
+    index = NearestIndex([0.0, 2.5, 10.0])
+    result = index.nearest_many(np.array([-1.0, 1.25, 6.0, 7.0, 12.0]))
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == [0.0, 0.0, 2.5, 10.0, 10.0]
+    assert index.nearest_many(x / 4 for x in (5, 30)) == [0.0, 10.0]
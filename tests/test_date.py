@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+import pytz
+from toolbox.date import (
+    DateRange,
+    date_parser,
+    dates_between,
+    get_tz,
+    local_tz,
+    localize,
+    set_tz,
+    to_dates,
+)
+from toolbox.exceptions import ToolboxError
+
+FORMATS = {
+    "%Y-%m-%d %H:%M:%S.%f %z": [
+        "2024-03-09 13:05:07.123456 +0130",
+        "2024-03-09 13:05:07.1 -01:30",
+        "2024-03-09 13:05:07.123 Z",
+        "2024-03-09 13:05:07.123 z",
+        "2024-03-09 13:05:07.123 +01:0030",
+        "2024-03-09 13:05:07.123 +0100:30",
+        "2024-03-09 13:05:07.123 +01:00:30.5",
+        "2024-03-09 13:05:07.123 +2400",
+        "2024-3-9 1:5:7.0 +0000",
+        "2024-03-09  13:05:07.5 +0000",
+    ],
+    "%Y%m%d%H%M%S%f": [
+        "20240309130507123456",
+        "202403091305071234567",
+        "2024030913050712",
+        "2024030913050٣",
+    ],
+    "%Y-%m-%d": ["2024-03-09", "2024-02-30", "2024-3-9", "2024-03-09 ", "24-03-09"],
+    "%Y-%m-%dT%H:%M:%S": [
+        "2024-03-09T13:05:07",
+        "2024-03-09t13:05:07",
+        "2024-03-09 13:05:07",
+        "2024-03-09T24:00:00",
+        "2024-03-09T13:05:60",
+    ],
+    "%d/%m/%y %H%M": ["09/03/24 1305", "09/03/68 1305", "09/03/69 1305", "9/3/24 135"],
+    "%m-%d": ["02-29", "12-31"],
+    "%Y %%": ["2024 %", "2024 "],
+    "%Y %": ["2024 %", "2024 "],
+}
+CASES = [(fmt, text) for fmt, texts in FORMATS.items() for text in texts]
+
+
+def outcome(parse, text):
+    try:
+        return parse(text)
+    except ValueError:
+        return ValueError
+
+
+@pytest.mark.parametrize("fmt,text", CASES)
+def test_date_parser_matches_strptime(fmt, text):
+    expected = outcome(lambda t: datetime.strptime(t, fmt), text)
+    assert outcome(date_parser(fmt), text) == expected
+
+
+def test_date_parser_cuts_long_fractions_after_a_dot():
+    parse = date_parser("%Y-%m-%d %H:%M:%S.%f")
+    assert parse("2024-03-09 13:05:07.1234567") == datetime(
+        2024, 3, 9, 13, 5, 7, 123456
+    )
+    with pytest.raises(ValueError):
+        date_parser("%Y%m%d%H%M%S%f")("202403091305071234567")
+
+
+def test_get_tz_caches_zones_and_passes_tzinfo_through():
+    berlin = ZoneInfo("Europe/Berlin")
+    assert get_tz("America/New_York") is get_tz("America/New_York")
+    assert get_tz(berlin) is berlin
+    assert get_tz() is local_tz()
+
+
+@pytest.mark.parametrize("tz", ["America/New_York", ZoneInfo("America/New_York")])
+def test_localize_uses_the_dst_offset_not_lmt(tz):
+    summer = localize(datetime(2024, 7, 1, 12), tz)
+    winter = localize(datetime(2024, 1, 1, 12), tz)
+    assert summer.utcoffset() == timedelta(hours=-4)
+    assert winter.utcoffset() == timedelta(hours=-5)
+    assert summer.replace(tzinfo=None) == datetime(2024, 7, 1, 12)
+    assert set_tz(datetime(2024, 7, 1, 12), "America/New_York") == summer
+
+
+@pytest.mark.parametrize(
+    "start",
+    [
+        datetime(2024, 3, 9, tzinfo=ZoneInfo("America/New_York")),
+        pytz.timezone("America/New_York").localize(datetime(2024, 3, 9)),
+        datetime(2024, 3, 9, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        datetime(2024, 3, 9),
+    ],
+)
+def test_date_range_timestamps_match_items_across_dst(start):
+    days = DateRange(start, timedelta(days=1), 4)
+    expected = [int(d.timestamp()) for d in days]
+    assert list(days.timestamps()) == expected
+    assert list(days.timestamps("ms")) == [t * 1000 for t in expected]
+    assert days[2] in days and days.index(days[3]) == 3
+    assert list(days[::2]) == [days[0], days[2]]
+
+
+def test_dates_between_lists_every_day():
+    dates, stamps = dates_between("2024-02-27", "2024-03-01")
+    assert dates == ["2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01"]
+    assert stamps[1] - stamps[0] == 86400
+    assert stamps[0] == int(datetime(2024, 2, 27, tzinfo=timezone.utc).timestamp())
+
+
+def test_to_dates_epoch_fallbacks():
+    rows = ["2024-03-09 13:05:07", "garbage"]
+    fallback = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ts = to_dates(rows, format="%Y-%m-%d %H:%M:%S", default=fallback, epoch="s")
+    assert list(ts) == [1709989507, 1704067200]
+    with pytest.raises(ToolboxError, match="datetime default"):
+        to_dates(rows, format="%Y-%m-%d %H:%M:%S", default=None, epoch="s")
@@ -0,0 +1,94 @@
+import os
+import time
+import pytest
+from dotenv import load_dotenv
+import toolbox.dot_env as dot_env
+from toolbox.dot_env import EnvConfig, EnvVar
+from toolbox.exceptions import ToolboxError
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    """A .env that load_env(reload=True) reads instead of searching the tree."""
+    path = tmp_path / ".env"
+    path.write_text("PORT=8080\n")
+
+    def load_env(reload=False):
+        load_dotenv(path, override=True)
+        dot_env._env_files[:] = [str(path)]
+        return dot_env._env_files
+
+    monkeypatch.setattr(dot_env, "load_env", load_env)
+    monkeypatch.setattr(dot_env, "_loaded", True)
+    monkeypatch.setattr(dot_env, "_env_files", [str(path)])
+    monkeypatch.delenv("PORT", raising=False)
+    load_env()
+    yield path
+    os.environ.pop("PORT", None)
+
+
+def touch(path, text):
+    path.write_text(text)
+    mtime = time.time_ns() + 5_000_000_000  # a different mtime tick
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_snapshot_is_immutable(monkeypatch):
+    monkeypatch.setenv("TB_FLAG", "false")
+    monkeypatch.setenv("TB_RATE", "2.5")
+    cfg = EnvConfig({"TB_FLAG": True, "TB_RATE": 1.0, "TB_NAME": "x"})
+    snap = cfg.snapshot
+    assert snap.as_dict() == {"TB_FLAG": False, "TB_RATE": 2.5, "TB_NAME": "x"}
+    assert cfg.TB_RATE == 2.5
+    with pytest.raises(AttributeError):
+        snap.TB_RATE = 3.0
+    with pytest.raises(AttributeError):
+        del snap.TB_FLAG
+    with pytest.raises(AttributeError):
+        snap.OTHER = 1
+    assert snap.TB_RATE == 2.5
+
+
+def test_errors_are_aggregated(monkeypatch):
+    monkeypatch.setenv("TB_PORT", "eighty")
+    monkeypatch.setenv("TB_RATE", "fast")
+    monkeypatch.delenv("TB_KEY", raising=False)
+    fields = {"port": EnvVar(1, key="TB_PORT"), "TB_RATE": 1.0}
+    with pytest.raises(ToolboxError) as info:
+        EnvConfig({**fields, "TB_KEY": EnvVar(required=True)})
+    message = str(info.value)
+    assert "TB_PORT='eighty'" in message and "TB_RATE='fast'" in message
+    assert "TB_KEY is required" in message
+
+
+@pytest.mark.parametrize("name", ["_x", "snapshot", "reload", "fields", "not-ok"])
+def test_reserved_field_names_are_rejected(name):
+    with pytest.raises(ToolboxError, match="Invalid EnvConfig field names"):
+        EnvConfig({name: 1})
+
+
+def test_reload_keeps_last_good_snapshot_and_retries(env_file):
+    cfg = EnvConfig({"PORT": 1})
+    good = cfg.snapshot
+    assert good.PORT == 8080
+    touch(env_file, "PORT=nope\n")
+    with pytest.raises(ToolboxError):
+        cfg.reload()
+    assert cfg.snapshot is good
+    with pytest.raises(ToolboxError):
+        cfg.reload_if_changed()  # still differs from the last good load
+    assert cfg.snapshot is good
+    touch(env_file, "PORT=9090\n")
+    assert cfg.reload_if_changed() is True
+    assert cfg.PORT == 9090
+
+
+def test_watch_reloads_after_a_broken_env_is_fixed(env_file, capsys):
+    cfg = EnvConfig({"PORT": 1}, watch=True, interval=0)
+    assert cfg.PORT == 8080
+    touch(env_file, "PORT=nope\n")
+    for _ in range(2):  # every check retries until the .env parses again
+        assert cfg.PORT == 8080
+        assert "keeping the last good settings" in capsys.readouterr().out
+    touch(env_file, "PORT=9090\n")
+    assert cfg.PORT == 9090
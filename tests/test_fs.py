@@ -0,0 +1,260 @@
+import os
+import pytest
+import toolbox.fs as fs
+from toolbox.fs import copy_many, move_many
+
+
+def test_copy_many_and_move_many_transfer_files(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    names = [f"f{i}.bin" for i in range(6)]
+    for i, name in enumerate(names):
+        (src / name).write_bytes(bytes([i]) * (i * 1000))
+    os.chmod(src / "f1.bin", 0o640)
+    pairs = {src / n: tmp_path / "copy" / str(i % 2) / n for i, n in enumerate(names)}
+    report = copy_many(pairs, workers=3)
+    assert report.ok == len(names) and report.failed == []
+    assert report.bytes == sum(i * 1000 for i in range(len(names)))
+    assert report.summary()["files"] == len(names)
+    for s, d in pairs.items():
+        assert d.read_bytes() == s.read_bytes()
+    assert (tmp_path / "copy" / "1" / "f1.bin").stat().st_mode & 0o777 == 0o640
+
+    moves = [(src / n, tmp_path / "moved" / n) for n in names]
+    moves.append((src / "missing.bin", tmp_path / "moved" / "missing.bin"))
+    report = move_many(moves, retries=3, backoff=0)
+    assert report.ok == len(names)
+    assert [r.src for r in report.failed] == [str(src / "missing.bin")]
+    assert report.failed[0].attempts == 1
+    assert os.listdir(src) == []
+    assert sorted(os.listdir(tmp_path / "moved")) == names
+    assert (tmp_path / "moved" / "f5.bin").read_bytes() == bytes([5]) * 5000
+
+
+def test_copy_many_same_file_is_refused(tmp_path):
+    src = tmp_path / "data.bin"
+    src.write_bytes(b"payload")
+    report = copy_many([(src, src)])
+    assert report.ok == 0
+    assert "SameFileError" in report.failed[0].error
+    assert report.failed[0].attempts == 1
+    assert src.read_bytes() == b"payload"
+
+
+def test_copy_many_onto_symlink_to_src_is_refused(tmp_path):
+    src = tmp_path / "data.bin"
+    src.write_bytes(b"payload")
+    link = tmp_path / "link.bin"
+    os.symlink(src, link)
+    report = copy_many([(src, link)])
+    assert report.ok == 0
+    assert "SameFileError" in report.failed[0].error
+    assert src.read_bytes() == b"payload"
+
+
+class _Vanished:
+    """DirEntry proxy for a file deleted between readdir and stat."""
+
+    def __init__(self, entry):
+        self._entry = entry
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def _gone(self, *args, **kwargs):
+        raise FileNotFoundError(2, "No such file or directory", self._entry.path)
+
+    stat = is_dir = is_file = _gone
+
+
+def test_scan_skips_only_the_vanished_entry(tmp_path, monkeypatch):
+    for name in ("a", "b", "c", "d"):
+        (tmp_path / name).write_text(name)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "deep").write_text("deep")
+    real_scandir = fs.os.scandir
+
+    class Scandir:
+        def __init__(self, path):
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._it.close()
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            entry = next(self._it)
+            return _Vanished(entry) if entry.name == "a" else entry
+
+    monkeypatch.setattr(fs.os, "scandir", Scandir)
+    errors = []
+    found = sorted(e.rel for e in fs.scan(tmp_path, onerror=errors.append))
+    assert found == ["b", "c", "d", "sub/deep"]
+    assert len(errors) == 1 and isinstance(errors[0], FileNotFoundError)
+
+
+def test_scan_classifies_special_files(tmp_path):
+    (tmp_path / "file").write_text("x")
+    os.mkfifo(tmp_path / "fifo")
+    os.symlink(tmp_path / "missing", tmp_path / "dangling")
+    (tmp_path / "dir").mkdir()
+    os.symlink(tmp_path / "dir", tmp_path / "dirlink")
+    os.symlink(tmp_path / "file", tmp_path / "filelink")
+    assert sorted(e.rel for e in fs.scan(tmp_path)) == ["file", "filelink"]
+    kinds = {e.rel: e.kind for e in fs.scan(tmp_path, special=True)}
+    assert kinds == {
+        "file": "file",
+        "filelink": "file",
+        "fifo": "special",
+        "dangling": "symlink",
+        "dirlink": "symlink",
+    }
+
+
+def test_scan_stats_the_target_of_file_symlinks(tmp_path):
+    (tmp_path / "file").write_bytes(b"x" * 1000)
+    os.utime(tmp_path / "file", ns=(10**18, 10**18))
+    os.symlink(tmp_path / "file", tmp_path / "filelink")
+    entries = {e.rel: e for e in fs.scan(tmp_path)}
+    link = entries["filelink"]
+    assert link.kind == "file" and link.is_symlink
+    assert (link.size, link.mtime_ns) == (1000, 10**18)
+
+
+def write(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_sync_delete_keeps_excluded_files(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src, {"a.txt": "a"})
+    write(dst, {"keep.log": "k", "old.txt": "o", "gone/x.txt": "x", "logs/y.log": "y"})
+    report = fs.sync(src, dst, exclude="*.log", delete=True)
+    assert sorted(report.deleted) == ["gone", "old.txt"]
+    assert (dst / "keep.log").exists() and (dst / "logs" / "y.log").exists()
+    assert (dst / "a.txt").read_text() == "a"
+
+
+def test_sync_delete_keeps_files_outside_include(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src, {"data/a.csv": "a"})
+    write(dst, {"data/old.csv": "o", "data/notes.md": "n", "x/old.csv": "o"})
+    report = fs.sync(src, dst, include="*.csv", delete=True)
+    assert sorted(report.deleted) == ["data/old.csv", "x"]
+    assert (dst / "data" / "notes.md").exists()
+    assert (dst / "data" / "a.csv").read_text() == "a"
+
+
+def test_sync_ignores_manifest_from_other_source(tmp_path):
+    one, two, dst = tmp_path / "one", tmp_path / "two", tmp_path / "dst"
+    write(one, {"f.txt": "one"})
+    write(two, {"f.txt": "two"})
+    fs.sync(one, dst)
+    mtime = (one / "f.txt").stat().st_mtime_ns
+    os.utime(two / "f.txt", ns=(mtime, mtime))
+    (dst / "f.txt").write_text("new")  # dst no longer matches the manifest
+    report = fs.sync(two, dst)
+    assert report.updated == ["f.txt"]
+    assert (dst / "f.txt").read_text() == "two"
+
+
+def test_sync_reports_skipped_symlinks(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src, {"a.txt": "a", "sub/b.txt": "b"})
+    os.symlink(src / "a.txt", src / "link.txt")
+    os.symlink(src / "sub", src / "sublink")
+    os.symlink(tmp_path / "missing", src / "dangling")
+    write(dst, {"link.txt": "mine"})
+    report = fs.sync(src, dst, delete=True)
+    assert sorted(report.skipped) == ["dangling", "link.txt", "sublink"]
+    assert report.summary()["skipped"] == 3 and report.deleted == []
+    assert (dst / "link.txt").read_text() == "mine"
+    assert not (dst / "sublink").exists() and not (dst / "dangling").exists()
+
+
+def test_sync_trusts_manifest_without_stat_ing_dst(tmp_path, monkeypatch):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src, {"a/f1.txt": "one", "b.txt": "b"})
+    fs.sync(src, dst)
+    real_stat, seen = os.stat, []
+
+    def stat(path, *args, **kwargs):
+        seen.append(os.fspath(path))
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(fs.os, "stat", stat)
+    assert fs.sync(src, dst).unchanged == 2
+    assert str(dst / "b.txt") not in seen and str(dst / "a" / "f1.txt") not in seen
+    assert fs.sync(src, dst, manifest=False).unchanged == 2
+    assert str(dst / "b.txt") in seen
+
+
+def test_sync_verify_recopies_files_removed_from_dst(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src, {"a/f1.txt": "one", "a/f2.txt": "two", "b.txt": "b"})
+    assert len(fs.sync(src, dst).created) == 3
+    (dst / "a" / "f2.txt").unlink()
+    (dst / "b.txt").write_text("changed by hand")
+    assert fs.sync(src, dst).unchanged == 3  # the manifest is trusted
+    report = fs.sync(src, dst, verify=True)
+    assert report.created == ["a/f2.txt"] and report.updated == ["b.txt"]
+    assert report.unchanged == 1
+    assert (dst / "a" / "f2.txt").read_text() == "two"
+    assert (dst / "b.txt").read_text() == "b"
+    assert fs.sync(src, dst).unchanged == 3
+
+
+def test_watcher_reports_changes(tmp_path):
+    write(tmp_path, {"a.txt": "a", "b.txt": "b", "skip.log": "s"})
+    watcher = fs.Watcher(tmp_path, exclude="*.log")
+    assert watcher.poll() == []
+    (tmp_path / "a.txt").write_text("longer")
+    (tmp_path / "b.txt").rename(tmp_path / "c.txt")
+    write(tmp_path, {"sub/d.txt": "d", "sub/e.log": "e"})
+    (tmp_path / "skip.log").unlink()
+    events = {(e.kind, os.path.relpath(e.path, tmp_path)): e for e in watcher.poll()}
+    assert sorted(events) == [
+        ("created", os.path.join("sub", "d.txt")),
+        ("modified", "a.txt"),
+        ("moved", "c.txt"),
+    ]
+    assert events["modified", "a.txt"].size == 6
+    assert events["moved", "c.txt"].src == str(tmp_path / "b.txt")
+    (tmp_path / "sub" / "d.txt").unlink()
+    assert [(e.kind, e.path) for e in watcher.poll()] == [
+        ("deleted", str(tmp_path / "sub" / "d.txt"))
+    ]
+
+
+def test_watcher_initial_and_iteration(tmp_path):
+    write(tmp_path, {"a.txt": "a", "sub/b.txt": "b"})
+    watcher = fs.Watcher(tmp_path, interval=0.01, recursive=False, initial=True)
+    seen = []
+    for event in watcher:
+        seen.append((event.kind, os.path.basename(event.path)))
+        watcher.stop()
+    assert seen == [("created", "a.txt")]
+    delays = [watcher._next_delay(False) for _ in range(2)]
+    assert delays == pytest.approx([0.015, 0.0225])
+    assert watcher._next_delay(True) == 0.01
+
+
+def test_watcher_honours_a_stop_before_iteration(tmp_path):
+    write(tmp_path, {"a.txt": "a"})
+    watcher = fs.Watcher(tmp_path, interval=0.01, initial=True)
+    watcher.stop()
+    assert list(watcher) == []
+    watcher.start()
+    seen = []
+    for event in watcher:
+        seen.append(event.kind)
+        watcher.stop()
+    assert seen == ["created"]
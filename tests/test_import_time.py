@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH = ROOT / "benchmarks" / "bench_import_time.py"
+
+sys.path.insert(0, str(BENCH.parent))
+from bench_import_time import BUDGETS_MS, MODULES  # noqa: E402
+
+# imports every module with dotenv's finders swapped for recorders, then reports
+# whether anything searched for or loaded a .env file
+_PROBE = """
+import json, sys
+import dotenv
+calls = []
+dotenv.find_dotenv = lambda *a, **k: calls.append("find_dotenv") or ""
+dotenv.load_dotenv = lambda *a, **k: calls.append("load_dotenv") or False
+for module in sys.argv[1:]:
+    __import__(module)
+import toolbox.dot_env
+print(json.dumps({"calls": calls, "loaded": toolbox.dot_env._loaded}))
+"""
+
+
+def _env() -> dict[str, str]:
+    path = os.environ.get("PYTHONPATH")
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), path])),
+    }
+
+
+def test_light_modules_within_budget():
+    proc = subprocess.run(
+        [sys.executable, str(BENCH), *BUDGETS_MS],
+        capture_output=True,
+        text=True,
+        env=_env(),
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def test_import_reads_no_env_file(tmp_path):
+    (tmp_path / ".env").write_text("TOOLBOX_IMPORT_PROBE=1\n")
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, *MODULES],
+        capture_output=True,
+        text=True,
+        cwd=tmp_path,
+        env=_env(),
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.splitlines()[-1]) == {"calls": [], "loaded": False}
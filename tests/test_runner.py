@@ -0,0 +1,314 @@
+import gc
+import asyncio
+import threading
+import pytest
+from toolbox.exceptions import ToolboxError
+from toolbox.runner import (
+    _mp_context,
+    current_loop_thread,
+    get_pool,
+    LoopThread,
+    parallel_imap,
+    parallel_map,
+    profile_snapshot,
+    profiled,
+    run_async_tasks,
+    run_bounded,
+    Scheduler,
+    shutdown_pools,
+    TaskPool,
+    timed_run,
+)
+
+PICKLES = 0
+
+
+class Shared:
+    def __init__(self, offset: int):
+        self.offset = offset
+
+    def __reduce__(self):
+        global PICKLES
+        PICKLES += 1
+        return (Shared, (self.offset,))
+
+
+def add_offset(shared: Shared, item: int) -> int:
+    return shared.offset + item
+
+
+def test_shared_sent_once_per_worker_on_owned_pool():
+    global PICKLES
+    PICKLES = 0
+    items = list(range(40))
+    result = parallel_map(
+        add_offset, items, workers=2, processes=True, chunksize=2, shared=Shared(5)
+    )
+    assert result == [i + 5 for i in items]
+    assert PICKLES <= 2  # 0 when forked, once per worker otherwise
+
+
+def test_shared_pickled_per_chunk_on_persistent_pool():
+    global PICKLES
+    PICKLES = 0
+    items = list(range(40))
+    try:
+        result = parallel_map(
+            add_offset,
+            items,
+            workers=2,
+            processes=True,
+            chunksize=2,
+            reuse_pool=True,
+            shared=Shared(5),
+        )
+    finally:
+        shutdown_pools()
+    assert result == [i + 5 for i in items]
+    assert PICKLES == len(items) // 2
+
+
+def test_no_fork_while_other_threads_run():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        assert _mp_context(prefer_fork=True).get_start_method() != "fork"
+        pool = get_pool(processes=True, workers=1)
+        assert pool.submit(abs, -3).result() == 3
+    finally:
+        stop.set()
+        thread.join()
+        shutdown_pools()
+
+
+def test_profiled_block_sampling_is_per_name():
+    for _ in range(1000):
+        with profiled("test.sampled", sample=0.1):
+            pass
+    assert profile_snapshot("test.sampled")["count"] == 100
+
+
+def test_timed_run_shares_the_profiled_histogram():
+    class Feed:
+        @profiled()
+        def poll(self):
+            return 1
+
+    class Book:
+        def poll(self):
+            return 2
+
+    feed = Feed()
+    feed.poll()
+    assert timed_run(Feed.poll.__wrapped__, feed) == 1
+    assert timed_run(Book().poll) == 2
+    feed_name = Feed.poll.__wrapped__.__qualname__
+    assert profile_snapshot(feed_name)["count"] == 2
+    assert profile_snapshot(Book.poll.__qualname__)["count"] == 1
+
+
+def test_profiler_pairs_starts_per_task():
+    profiler = profiled("test.interleaved")
+
+    async def job(delay: float) -> None:
+        async with profiler:
+            await asyncio.sleep(delay)
+
+    async def main() -> None:
+        await asyncio.gather(job(0.05), job(0.01))
+
+    asyncio.run(main())
+    stats = profile_snapshot("test.interleaved")
+    assert stats["count"] == 2
+    assert stats["max"] >= 50 and stats["p50"] < 40
+
+
+def test_scheduler_restart_rearms_delay_jobs():
+    scheduler = Scheduler()
+    started = []
+
+    async def tick() -> None:
+        started.append(True)
+        await asyncio.sleep(1)
+
+    scheduler.every(0.01, tick, name="tick", mode="delay")
+
+    async def main() -> None:
+        scheduler.start()
+        while not started:
+            await asyncio.sleep(0.005)
+        scheduler.stop()  # cancels the run in progress
+        await asyncio.sleep(0.01)
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+
+    asyncio.run(main())
+    assert len(started) == 2
+
+
+def test_loop_thread_reuses_one_loop_and_runs_shutdown_hooks():
+    loop_thread = LoopThread("test-loop").start()
+    closed = []
+
+    async def current() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    async def close() -> None:
+        closed.append(current_loop_thread() is loop_thread)
+
+    async def reenter() -> None:
+        loop_thread.run(current())
+
+    try:
+        assert loop_thread.run(current()) is loop_thread.run(current())
+        with pytest.raises(ToolboxError):
+            loop_thread.run(reenter())
+        loop_thread.on_shutdown(close)
+    finally:
+        loop_thread.shutdown()
+    assert closed == [True]
+    assert not loop_thread.is_running()
+
+
+def test_run_async_tasks_from_inside_a_running_loop():
+    async def double(x: int) -> int:
+        await asyncio.sleep(0)
+        return x * 2
+
+    async def main() -> list:
+        # sync code called from a coroutine: the caller's loop is never re-entered
+        return run_async_tasks(double(1), double(2))
+
+    assert asyncio.run(main()) == [2, 4]
+    assert run_async_tasks(double(3)) == 6
+
+
+def test_parallel_map_keeps_order_and_reports_progress():
+    items = range(-50, 0)
+    progress = []
+    result = parallel_map(
+        abs, items, workers=4, chunksize=3, progress=lambda *p: progress.append(p)
+    )
+    assert result == [abs(i) for i in items]
+    assert progress[-1] == (50, 50)
+    unordered = parallel_imap(abs, iter(items), workers=4, chunksize=3, ordered=False)
+    assert sorted(unordered) == sorted(result)
+
+
+def test_parallel_map_default_replaces_failed_items():
+    def tenth(x: int) -> int:
+        return 10 // x
+
+    result = parallel_map(tenth, [1, 0, 2], workers=2, chunksize=1, default=-1)
+    assert result == [10, -1, 5]
+    with pytest.raises(ToolboxError):
+        parallel_map(tenth, [1, 0, 2], workers=2, chunksize=1)
+
+
+class Gauge:
+    def __init__(self):
+        self.now = 0
+        self.peak = 0
+
+    async def work(self, value: int, delay: float = 0.005) -> int:
+        self.now += 1
+        self.peak = max(self.peak, self.now)
+        try:
+            await asyncio.sleep(delay)
+            if value < 0:
+                raise ValueError(value)
+            return value
+        finally:
+            self.now -= 1
+
+
+def test_task_pool_bounds_concurrency_while_consuming():
+    gauge = Gauge()
+
+    async def main() -> list:
+        results = []
+        async with TaskPool(limit=3) as pool:
+
+            async def produce() -> None:
+                for i in range(20):
+                    await pool.submit(gauge.work(i))
+                pool.close()
+
+            producer = asyncio.create_task(produce())
+            async for result in pool.as_completed():
+                results.append(result)
+            await producer
+        return results
+
+    assert sorted(asyncio.run(main())) == list(range(20))
+    assert gauge.peak == 3
+
+
+def test_task_pool_fail_fast_cancels_the_rest():
+    gauge = Gauge()
+
+    async def main() -> TaskPool:
+        pool = TaskPool(limit=5, fail_fast=True)
+        with pytest.raises(ValueError):
+            async with pool:
+                await pool.submit(gauge.work(-1, delay=0))
+                for i in range(4):
+                    await pool.submit(gauge.work(i, delay=1))
+                await pool.join()
+        return pool
+
+    pool = asyncio.run(main())
+    assert len(pool) == 0 and gauge.now == 0
+
+
+def test_run_bounded_pulls_lazily():
+    gauge = Gauge()
+    pulled = []
+
+    def source():
+        for i in range(10):
+            pulled.append(i)
+            yield gauge.work(-i if i == 7 else i)
+
+    async def main() -> list:
+        results = []
+        async for result in run_bounded(source(), limit=2, return_exceptions=True):
+            results.append(result)
+            assert len(pulled) <= len(results) + 2
+        return results
+
+    results = asyncio.run(main())
+    errors = [r for r in results if isinstance(r, ValueError)]
+    values = sorted(r for r in results if not isinstance(r, ValueError))
+    assert values == [i for i in range(10) if i != 7]
+    assert len(errors) == 1 and gauge.peak == 2
+
+
+def test_run_bounded_retrieves_every_failure():
+    unretrieved = []
+
+    async def fail(i: int):
+        raise ValueError(i)
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: unretrieved.append(context)
+        )
+        with pytest.raises(ValueError):
+            async for _ in run_bounded([fail(i) for i in range(4)], limit=4):
+                pass
+        gc.collect()
+
+    asyncio.run(main())
+    assert unretrieved == []
+
+
+def test_run_bounded_does_not_stop_at_none():
+    async def main():
+        async for _ in run_bounded([None]):
+            pass
+
+    with pytest.raises(TypeError):
+        asyncio.run(main())
@@ -0,0 +1,52 @@
+import json
+import math
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from hexbytes import HexBytes
+import toolbox.utils as utils
+from toolbox.utils import obj_to_json_bytes, obj_to_srl
+
+BACKENDS = ["stdlib"] + (["orjson"] if utils.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(utils, "orjson", None)
+    return request.param
+
+
+def test_matches_obj_to_srl(backend):
+    obj = {
+        "id": uuid.UUID(int=7),
+        "tx": HexBytes(b"\x01\x02"),
+        "price": Decimal("1.25"),
+        "qty": Decimal("3"),
+        "ts": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "tags": ["a", 1],
+        "ids": {3, 1, 2},
+        "frozen": frozenset([Decimal("0.5")]),
+    }
+    assert json.loads(obj_to_json_bytes(obj)) == obj_to_srl(obj)
+
+
+def test_big_ints(backend):
+    big = 2**70
+    obj = {"int": big, "dec": Decimal(big), "neg": -big}
+    assert json.loads(obj_to_json_bytes(obj)) == {"int": big, "dec": big, "neg": -big}
+
+
+def test_non_finite_floats_are_null(backend):
+    obj = {"nan": math.nan, "inf": [math.inf, -math.inf], "dec": Decimal("NaN")}
+    assert json.loads(obj_to_json_bytes(obj)) == {
+        "nan": None,
+        "inf": [None, None],
+        "dec": None,
+    }
+
+
+def test_unserializable_still_raises(backend):
+    with pytest.raises(TypeError):
+        obj_to_json_bytes({"x": object()})
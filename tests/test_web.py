@@ -0,0 +1,55 @@
+import asyncio
+from toolbox.runner import LoopThread
+from toolbox.web import SingleFlight, _loop_session
+
+
+def test_caller_after_last_waiter_cancelled_starts_fresh_call():
+    flight = SingleFlight()
+    started = []
+
+    async def fetch() -> int:
+        started.append(True)
+        await asyncio.sleep(0.01)
+        return len(started)
+
+    async def main() -> int:
+        first = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)  # first has given up; the shared call is unwinding
+        assert first.done() and not flight.running("k")
+        return await flight.do("k", fetch)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_waiters_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch() -> str:
+        calls.append(True)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def main() -> list:
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["ok"] * 5
+    assert len(calls) == 1
+
+
+def test_loop_session_registers_one_shutdown_hook():
+    loop_thread = LoopThread("test-web").start()
+
+    async def churn():
+        for _ in range(3):
+            await _loop_session().close()
+        return _loop_session()
+
+    try:
+        session = loop_thread.run(churn())
+        assert len(loop_thread._shutdown_hooks) == 1
+    finally:
+        loop_thread.shutdown()
+    assert session.closed
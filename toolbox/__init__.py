@@ -0,0 +1,30 @@
+import importlib
+
+# submodules are imported on first attribute access (PEP 562), so `import toolbox`
+# stays cheap and free of side effects until a module is actually used
+_SUBMODULES = frozenset(
+    {
+        "api",
+        "bucket",
+        "calc",
+        "date",
+        "dot_env",
+        "exceptions",
+        "fs",
+        "hash",
+        "log",
+        "runner",
+        "utils",
+        "web",
+    }
+)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _SUBMODULES)
@@ -1,15 +1,37 @@
+import os
+import re
 import json
+import math
 import time
+import heapq
 import asyncio
-from typing import Callable, Awaitable
-from fnmatch import fnmatch
-from toolbox.utils import debug, hr
+import inspect
+import functools
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from importlib.util import find_spec
+from typing import Any, Callable, Awaitable, Hashable, Iterable
+from fnmatch import translate
+from time import perf_counter_ns
+from urllib.parse import parse_qsl
+from toolbox.hash import hash_var
+from toolbox.utils import debug, hr, obj_to_json_bytes
+from toolbox.web import SingleFlight
+from toolbox.exceptions import ToolboxError, ToolboxWarning
 
 try:
     import uvicorn
     from fastapi import FastAPI, Request
-    from fastapi.responses import Response, StreamingResponse
+    from fastapi.datastructures import DefaultPlaceholder
+    from fastapi.responses import FileResponse, Response, StreamingResponse
+    from fastapi.routing import APIRoute
+    from starlette.datastructures import Headers
     from starlette.routing import Route
+    from starlette.convertors import CONVERTOR_TYPES
+    from uvicorn.importer import import_from_string
     from scalar_fastapi import get_scalar_api_reference
 except ImportError as e:
     raise ImportError(
@@ -18,122 +40,1162 @@ except ImportError as e:
     ) from e
 
 
-def logger_middleware(
+class ToolboxJSONResponse(Response):
+    """JSON response encoding Decimal/datetime/UUID/HexBytes in one pass to bytes.
+
+    Return it directly from an endpoint (ToolboxJSONResponse(data)) to skip
+    both obj_to_srl and FastAPI's jsonable_encoder walk.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if type(content) is _Unencoded:
+            content = content.value
+        return obj_to_json_bytes(content)
+
+
+class _Unencoded(str):
+    # jsonable_encoder hands str instances back untouched, so an endpoint's
+    # return value boxed in one reaches ToolboxJSONResponse.render unwalked
+    value: Any
+
+
+def _unencoded(value: Any) -> Any:
+    if isinstance(value, Response):
+        return value
+    box = _Unencoded()
+    box.value = value
+    return box
+
+
+class ToolboxJSONRoute(APIRoute):
+    """APIRoute sending plain return values to ToolboxJSONResponse unencoded.
+
+    For endpoints without a response_model whose response class is
+    ToolboxJSONResponse, the return value skips jsonable_encoder and is encoded
+    once by obj_to_json_bytes (same output as obj_to_srl). Status codes,
+    headers and cookies set on an injected Response, and background tasks still
+    apply; routes with a response_model keep FastAPI's validation path.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        call = self.dependant.call
+        if (
+            self.response_field is not None
+            or not issubclass(response_class, ToolboxJSONResponse)
+            or inspect.isasyncgenfunction(call)
+            or inspect.isgeneratorfunction(call)
+        ):
+            return
+        if inspect.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def unencoded(*args, **kwargs):
+                return _unencoded(await call(*args, **kwargs))
+
+        else:
+
+            @functools.wraps(call)
+            def unencoded(*args, **kwargs):
+                return _unencoded(call(*args, **kwargs))
+
+        self.dependant.call = unencoded
+
+
+def use_toolbox_json(app: FastAPI) -> None:
+    """Route plain return values of routes added later through ToolboxJSONResponse.
+
+    Sets ToolboxJSONResponse as the default response class and ToolboxJSONRoute
+    as the route class, so endpoints without a response_model are encoded in a
+    single pass without jsonable_encoder.
+    """
+    app.router.default_response_class = ToolboxJSONResponse
+    app.router.route_class = ToolboxJSONRoute
+
+
+_PARAM_RE = re.compile(r"^{([a-zA-Z_][a-zA-Z0-9_]*)(?::([a-zA-Z_][a-zA-Z0-9_]*))?}$")
+
+
+def compile_globs(patterns: Iterable[str]) -> re.Pattern:
+    """Fuse fnmatch-style globs into one precompiled regex (never matches if empty)."""
+    parts = [f"(?:{translate(p)})" for p in dict.fromkeys(patterns)]
+    return re.compile("|".join(parts) if parts else "(?!)")
+
+
+class _RouteNode:
+    __slots__ = ("literal", "params", "rest", "end")
+
+    def __init__(self):
+        self.literal: dict[str, "_RouteNode"] = {}
+        self.params: list[tuple[re.Pattern, "_RouteNode"]] = []
+        # (declaration order, template) of a trailing {name:path} param / a route
+        # ending here; the first declared route keeps the slot
+        self.rest: tuple[int, str] | None = None
+        self.end: tuple[int, str] | None = None
+
+
+class RouteIndex:
+    """Precompiled lookup of the app's routes by request path.
+
+    Literal paths live in a dict and parameterized paths in a segment trie, so a
+    lookup costs O(path segments) instead of one regex per route. Templates the
+    trie cannot express (e.g. "/v{major}.{minor}") fall back to their regex.
+    When several routes match, the first declared one wins, as in Starlette's
+    dispatch; with methods given, only routes serving one of them are indexed.
+    The index rebuilds itself when the top-level route list changes size; call
+    invalidate() after mutating routes in place.
+    """
+
+    def __init__(self, app: FastAPI, methods: Iterable[str] | None = None):
+        self.app = app
+        self.methods = frozenset(methods) if methods is not None else None
+        self._version: tuple[int, int] | None = None
+        self._literal: dict[str, int] = {}
+        self._root = _RouteNode()
+        self._fallback: list[tuple[int, re.Pattern, str]] = []
+
+    @staticmethod
+    def collect(routes: list) -> list:
+        """Return every Route in routes, descending into included routers.
+
+        Routes of lazily included routers come back as FastAPI's effective route
+        contexts, which carry the prefixed path, path_regex, methods and endpoint.
+        """
+        result = []
+        for route in routes:
+            if isinstance(route, Route):
+                result.append(route)
+            elif hasattr(route, "effective_candidates"):
+                result.extend(RouteIndex.collect(route.effective_candidates()))
+            elif hasattr(route, "original_route") and hasattr(route, "path_regex"):
+                result.append(route)
+        return result
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next lookup."""
+        self._version = None
+
+    def build(self) -> "RouteIndex":
+        """(Re)compile the index from app.routes."""
+        literal: dict[str, int] = {}
+        root = _RouteNode()
+        fallback: list[tuple[int, re.Pattern, str]] = []
+        for order, route in enumerate(self.collect(self.app.routes)):
+            methods = getattr(route, "methods", None)
+            if (
+                self.methods is not None
+                and methods
+                and self.methods.isdisjoint(methods)
+            ):
+                continue
+            path = route.path
+            if "{" not in path:
+                literal.setdefault(path, order)
+            elif not self._insert(root, path, order):
+                fallback.append((order, route.path_regex, path))
+        self._literal, self._root, self._fallback = literal, root, fallback
+        self._version = (id(self.app.routes), len(self.app.routes))
+        return self
+
+    @staticmethod
+    def _insert(root: _RouteNode, path: str, order: int) -> bool:
+        node = root
+        segments = path.split("/")
+        for i, seg in enumerate(segments):
+            if "{" not in seg:
+                node = node.literal.setdefault(seg, _RouteNode())
+                continue
+            match = _PARAM_RE.match(seg)
+            if not match:
+                return False
+            kind = match.group(2) or "str"
+            if kind == "path":
+                if i != len(segments) - 1:
+                    return False
+                node.rest = node.rest or (order, path)
+                return True
+            convertor = CONVERTOR_TYPES.get(kind)
+            if convertor is None:
+                return False
+            pattern = re.compile(convertor.regex)
+            for existing, child in node.params:
+                if existing.pattern == pattern.pattern:
+                    node = child
+                    break
+            else:
+                child = _RouteNode()
+                node.params.append((pattern, child))
+                node = child
+        node.end = node.end or (order, path)
+        return True
+
+    def _walk(
+        self, node: _RouteNode, segments: list[str], i: int
+    ) -> tuple[int, str] | None:
+        # every branch is explored: a later literal may lose to an earlier param
+        if i == len(segments):
+            return node.end
+        best = node.rest
+        seg = segments[i]
+        child = node.literal.get(seg)
+        if child is not None:
+            found = self._walk(child, segments, i + 1)
+            if found and (best is None or found < best):
+                best = found
+        if seg:
+            for pattern, child in node.params:
+                if pattern.fullmatch(seg):
+                    found = self._walk(child, segments, i + 1)
+                    if found and (best is None or found < best):
+                        best = found
+        return best
+
+    def lookup(self, path: str) -> str | None:
+        """Return the template of the first declared route matching path, or None."""
+        if self._version != (id(self.app.routes), len(self.app.routes)):
+            self.build()
+        order = self._literal.get(path)
+        best = (order, path) if order is not None else None
+        found = self._walk(self._root, path.split("/"), 0)
+        if found and (best is None or found < best):
+            best = found
+        for order, regex, template in self._fallback:
+            if best is not None and order > best[0]:
+                break
+            if regex.match(path):
+                best = (order, template)
+                break
+        return best[1] if best else None
+
+    def match(self, path: str) -> bool:
+        """Return True if path matches any route."""
+        return self.lookup(path) is not None
+
+
+def get_route_index(app: FastAPI) -> RouteIndex:
+    """Return the RouteIndex cached on app.state, creating it on first use."""
+    index = getattr(app.state, "toolbox_route_index", None)
+    if index is None:
+        index = app.state.toolbox_route_index = RouteIndex(app)
+    return index
+
+
+class Tarpit:
+    """Hold connections for delay seconds using a shared timer wheel.
+
+    Held requests wait on one future per wheel slot (resolution seconds wide),
+    released by a single timer, instead of each running its own sleep. When
+    max_held requests are already held, hold() returns False immediately.
+    """
+
+    def __init__(self, delay: float = 300, max_held: int = 20, resolution: float = 1):
+        self.delay = delay
+        self.max_held = max_held
+        self.resolution = resolution
+        self.held = 0
+        self._slots: dict[int, asyncio.Future] = {}
+        self._due: list[int] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _slot(self, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        slot = math.ceil((loop.time() + self.delay) / self.resolution)
+        fut = self._slots.get(slot)
+        if fut is None:
+            fut = self._slots[slot] = loop.create_future()
+            heapq.heappush(self._due, slot)
+            if self._timer is None or self._due[0] == slot:
+                self._arm(loop)
+        return fut
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(self._due[0] * self.resolution, self._tick, loop)
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._timer = None
+        now = loop.time()
+        while self._due and self._due[0] * self.resolution <= now:
+            fut = self._slots.pop(heapq.heappop(self._due))
+            if not fut.done():
+                fut.set_result(None)
+        if self._due:
+            self._arm(loop)
+
+    async def hold(self) -> bool:
+        """Wait out the tarpit delay; return False at once if the tarpit is full."""
+        if self.held >= self.max_held:
+            return False
+        self.held += 1
+        try:
+            # shield so a disconnecting client cannot cancel the shared slot
+            await asyncio.shield(self._slot(asyncio.get_running_loop()))
+        finally:
+            self.held -= 1
+        return True
+
+
+class TokenBuckets:
+    """Token buckets per client key in a bounded LRU table.
+
+    Each client may burst up to burst requests, refilled at rate per second.
+    take() is O(1); the least recently seen client is evicted once max_clients
+    is reached.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        if not rate > 0 or not burst >= 1:
+            raise ToolboxError(
+                f"Invalid rate limit rate={rate}, burst={burst}: "
+                "need rate > 0 and burst >= 1"
+            )
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+
+    def take(self, key: Hashable, cost: float = 1) -> float:
+        """Spend cost tokens for key; return 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._buckets.popitem(last=False)
+            self._buckets[key] = [self.burst - cost, now]
+            return 0.0
+        self._buckets.move_to_end(key)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return 0.0
+        bucket[0] = tokens
+        return (cost - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def rate_limit_middleware(
     app: FastAPI,
-    env: str,
-    log_requests: bool = False,
-    log_response: bool = False,
+    rate: float = 10,
+    burst: float = 20,
+    route_limits: dict[str, tuple[float, float]] | None = None,
+    key_func: Callable[[Request], Hashable] | None = None,
+    max_clients: int = 100_000,
     skip_paths: list[str] | None = None,
-    tarpit_max_concurrent: int = 20,
-    tarpit_delay: int = 300,
 ) -> None:
-    """Register HTTP middleware that logs req/resp and tarpits unknown routes."""
-    skip = set(["/", "/docs", "/openapi.json", "/favicon.ico"] + (skip_paths or []))
-    tarpit_sem = asyncio.Semaphore(tarpit_max_concurrent)
-
-    def get_valid_routes() -> list[Route]:
-        def collect(routes: list) -> list[Route]:
-            result = []
-            for route in routes:
-                if isinstance(route, Route):
-                    result.append(route)
-                elif hasattr(route, "original_router"):
-                    result.extend(collect(route.original_router.routes))
-            return result
-
-        return collect(app.routes)
+    """Register HTTP middleware that rate-limits each client with token buckets.
+
+    Clients are keyed by client IP. Headers such as API keys are chosen by the
+    client, so a key_func keying on one must validate it first (e.g. return the
+    account of a known key, else the IP). route_limits maps route templates or
+    globs (e.g. "/search*") to (rate, burst) and gets its own buckets; other
+    routes share the default limit. Over-limit requests get 429 with a
+    Retry-After header.
+    """
+    skip = compile_globs(skip_paths or [])
+    routes = get_route_index(app)
+    default = TokenBuckets(rate, burst, max_clients)
+    rules = [
+        (compile_globs([pattern]), TokenBuckets(r, b, max_clients))
+        for pattern, (r, b) in (route_limits or {}).items()
+    ]
+    per_route: dict[str | None, TokenBuckets] = {}
+
+    def buckets_for(template: str | None) -> TokenBuckets:
+        buckets = per_route.get(template)
+        if buckets is None:
+            buckets = next(
+                (b for rx, b in rules if template and rx.match(template)), default
+            )
+            per_route[template] = buckets
+        return buckets
+
+    def client_key(request: Request) -> Hashable:
+        if key_func is not None:
+            return key_func(request)
+        return request.client.host if request.client else "unknown"
 
     @app.middleware("http")
-    async def log_api_io(
+    async def rate_limit(
         request: Request, call_next: Callable[[Request], Awaitable[Response]]
     ) -> Response:
         url = request.url.path
-        is_valid_route = any(
-            route.path_regex.match(url) for route in get_valid_routes()
-        )
-        if any(fnmatch(url, p) for p in skip):
+        if skip.match(url):
             return await call_next(request)
-        if not is_valid_route:
-            if tarpit_sem.locked():
-                return Response(status_code=403)
-            async with tarpit_sem:
-                await asyncio.sleep(tarpit_delay)
-            return Response(status_code=403)
+        wait = buckets_for(routes.lookup(url)).take(client_key(request))
+        if wait:
+            return Response(
+                content="Too Many Requests",
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        return await call_next(request)
 
-        start_time = time.perf_counter()
 
-        if env == "DEV" or log_requests:
-            hr("←", color="bright_magenta", no_nl=True)
+class _BodyTee:
+    """Keep up to limit bytes of a body that is streamed through untouched."""
+
+    __slots__ = ("limit", "chunks", "size", "total", "done")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.total = 0
+        self.done = False
+
+    def feed(self, chunk: Any) -> None:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        self.total += len(chunk)
+        room = self.limit - self.size
+        if room > 0 and chunk:
+            part = bytes(chunk[:room])
+            self.chunks.append(part)
+            self.size += len(part)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.size
+
+    def value(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+# one worker keeps log output ordered and away from the event loop
+_log_executor = ThreadPoolExecutor(1, thread_name_prefix="toolbox-api-log")
+
+
+def _log_request(url: str, headers: dict, tee: _BodyTee) -> None:
+    hr("←", color="bright_magenta", no_nl=True)
+    debug(headers, f"[REQ:headers] {url}", no_nl=True)
+    body = tee.value()
+    if body:
+        print()
+        tag = f"[REQ:body] {url}"
+        if tee.truncated:
+            tag += f" (first {tee.size} of {tee.total} bytes)"
+        try:
+            debug(json.loads(body), tag, no_nl=True)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            debug(body.decode(errors="ignore")[:1000], tag, no_nl=True)
+    hr("←", color="bright_magenta", no_leading_nl=True)
+
+
+def _log_response(
+    url: str, status: int, content_type: str, process_time: float, tee: _BodyTee
+) -> None:
+    log_tag = f"[RESP:{status}] {url} ({process_time:.2f}ms)"
+    if tee.truncated:
+        log_tag += f" (first {tee.size} of {tee.total} bytes)"
+    body = tee.value()
+    hr("→", color="yellow", no_nl=True)
+    if body:
+        if "json" in content_type:
             try:
-                debug(dict(request.headers), f"[REQ:headers] {url}", no_nl=True)
-            except Exception:
-                debug(str(request.headers), f"[REQ:headers] {url}", no_nl=True)
-            body = await request.body()
-            if body:
-                print()
-                try:
-                    debug(json.loads(body), f"[REQ:body] {url}", no_nl=True)
-                except json.JSONDecodeError:
-                    debug(
-                        body.decode(errors="ignore")[:1000],
-                        f"[REQ:body] {url}",
-                        no_nl=True,
-                    )
-            hr("←", color="bright_magenta", no_leading_nl=True)
+                debug(json.loads(body), log_tag, no_nl=True)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                debug(body.decode(errors="ignore"), log_tag, no_nl=True)
+        else:
+            debug(url, f"[RESP:{status}] binary ({process_time:.2f}ms)", no_nl=True)
+    else:
+        debug({status}, log_tag, no_nl=True)
+    hr("→", color="yellow", no_leading_nl=True)
 
-            async def receive():
-                return {"type": "http.request", "body": body, "more_body": False}
 
-            request = Request(request.scope, receive)
+class LoggerMiddleware:
+    """ASGI middleware logging request/response bodies and tarpitting unknown routes.
 
-        response: StreamingResponse = await call_next(request)  # type: ignore
-        process_time = (time.perf_counter() - start_time) * 1000
-        log_tag = f"[RESP:{response.status_code}] {url} ({process_time:.2f}ms)"
+    receive and send are wrapped, so body chunks pass straight through while the
+    first body_limit bytes of each are kept for logging.
+    """
 
-        if env == "DEV" or log_response:
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += (
-                    chunk
-                    if isinstance(chunk, bytes)
-                    else bytes(chunk) if not isinstance(chunk, str) else chunk.encode()
-                )
+    def __init__(
+        self,
+        app,
+        skip: re.Pattern,
+        tarpit: Tarpit,
+        index: RouteIndex,
+        tee_requests: bool,
+        tee_responses: bool,
+        body_limit: int,
+    ):
+        self.app = app
+        self.skip = skip
+        self.tarpit = tarpit
+        self.index = index
+        self.tee_requests = tee_requests
+        self.tee_responses = tee_responses
+        self.body_limit = body_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.skip.match(scope["path"]):
+            return await self.app(scope, receive, send)
+        url = scope["path"]
+        if not self.index.match(url):
+            await self.tarpit.hold()
+            return await Response(status_code=403)(scope, receive, send)
+
+        start_time = time.perf_counter()
+        process_time: float | None = None
+        status, content_type = 500, ""
+        req_tee = _BodyTee(self.body_limit) if self.tee_requests else None
+        resp_tee = _BodyTee(self.body_limit) if self.tee_responses else None
+
+        def flush_request() -> None:
+            if req_tee is not None and not req_tee.done:
+                req_tee.done = True
+                headers = dict(Headers(scope=scope))
+                _log_executor.submit(_log_request, url, headers, req_tee)
+
+        async def receive_teed() -> dict:
+            message = await receive()
+            if message["type"] == "http.request":
+                req_tee.feed(message.get("body", b""))
+                if not message.get("more_body", False):
+                    flush_request()
+            return message
 
-            hr("→", color="yellow", no_nl=True)
-            if response_body:
-                content_type = response.media_type or response.headers.get(
-                    "content-type", ""
+        async def send_teed(message: dict) -> None:
+            nonlocal process_time, status, content_type
+            if message["type"] == "http.response.start":
+                process_time = (time.perf_counter() - start_time) * 1000
+                status = message["status"]
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+            elif resp_tee is not None and message["type"] == "http.response.body":
+                resp_tee.feed(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_teed if req_tee else receive, send_teed)
+        finally:
+            flush_request()
+            if process_time is None:
+                process_time = (time.perf_counter() - start_time) * 1000
+            if resp_tee is not None:
+                _log_executor.submit(
+                    _log_response, url, status, content_type, process_time, resp_tee
                 )
-                if "json" in content_type:
-                    try:
-                        debug(json.loads(response_body), log_tag, no_nl=True)
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        debug(
-                            response_body.decode(errors="ignore"), log_tag, no_nl=True
-                        )
-                else:
-                    debug(
-                        url,
-                        f"[RESP:{response.status_code}] binary ({process_time:.2f}ms)",
-                        no_nl=True,
+        if resp_tee is None:
+            debug(f"response took {process_time:.2f}ms", f"[RESP:{status}] {url}")
+
+
+def logger_middleware(
+    app: FastAPI,
+    env: str,
+    log_requests: bool = False,
+    log_response: bool = False,
+    skip_paths: list[str] | None = None,
+    tarpit_max_concurrent: int = 20,
+    tarpit_delay: int = 300,
+    log_body_limit: int = 64 * 1024,
+) -> None:
+    """Register HTTP middleware that logs req/resp and tarpits unknown routes.
+
+    Bodies are teed: chunks pass straight through to the app/client while the
+    first log_body_limit bytes are kept, and logging runs on a background
+    thread once the body has been sent, so streaming responses are preserved.
+    """
+    skip = compile_globs(
+        ["/", "/docs", "/openapi.json", "/favicon.ico"] + (skip_paths or [])
+    )
+    app.add_middleware(
+        LoggerMiddleware,
+        skip=skip,
+        tarpit=Tarpit(tarpit_delay, tarpit_max_concurrent),
+        index=get_route_index(app),
+        tee_requests=env == "DEV" or log_requests,
+        tee_responses=env == "DEV" or log_response,
+        body_limit=log_body_limit,
+    )
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RouteMetrics:
+    """Counters for one (method, route template) pair; updates never allocate."""
+
+    __slots__ = (
+        "method",
+        "route",
+        "requests",
+        "in_flight",
+        "request_bytes",
+        "response_bytes",
+        "statuses",
+        "bounds",
+        "buckets",
+        "sum_ns",
+    )
+
+    def __init__(self, method: str, route: str, bounds: tuple[int, ...]):
+        self.method = method
+        self.route = route
+        self.requests = 0
+        self.in_flight = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = array("q", bytes(8 * 6))  # index = status // 100
+        self.bounds = bounds
+        self.buckets = array("q", bytes(8 * (len(bounds) + 1)))
+        self.sum_ns = 0
+
+    def observe(self, status: int, ns: int) -> None:
+        """Record one finished request."""
+        self.requests += 1
+        self.statuses[min(status // 100, 5)] += 1
+        self.buckets[bisect_left(self.bounds, ns)] += 1
+        self.sum_ns += ns
+
+
+class MetricsRegistry:
+    """Per-route request metrics, rendered in Prometheus text format.
+
+    Intended to be updated from a single event loop per process, so it takes no
+    locks; with several workers each process exposes its own counters.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._bounds = tuple(int(b * 1e9) for b in self.buckets)
+        self._routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        """Return the metrics for method + route template, creating them if needed."""
+        metrics = self._routes.get((method, route))
+        if metrics is None:
+            metrics = RouteMetrics(method, route, self._bounds)
+            self._routes[(method, route)] = metrics
+        return metrics
+
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+        self._routes.clear()
+
+    def snapshot(self) -> list[dict]:
+        """Return the current metrics as a list of plain dicts."""
+        return [
+            {
+                "method": m.method,
+                "route": m.route,
+                "requests": m.requests,
+                "in_flight": m.in_flight,
+                "request_bytes": m.request_bytes,
+                "response_bytes": m.response_bytes,
+                "status": {f"{i}xx": n for i, n in enumerate(m.statuses) if n},
+                "latency_sum": m.sum_ns / 1e9,
+            }
+            for m in list(self._routes.values())
+        ]
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        routes = list(self._routes.values())
+        labels = {
+            id(m): f'method="{_label(m.method)}",route="{_label(m.route)}"'
+            for m in routes
+        }
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by status class.",
+            "# TYPE http_requests_total counter",
+        ]
+        for m in routes:
+            for cls, n in enumerate(m.statuses):
+                if n:
+                    lines.append(
+                        f'http_requests_total{{{labels[id(m)]},status="{cls}xx"}} {n}'
                     )
-            else:
-                debug({response.status_code}, log_tag, no_nl=True)
-            hr("→", color="yellow", no_leading_nl=True)
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        name = "http_request_duration_seconds"
+        for m in routes:
+            lbl = labels[id(m)]
+            total = 0
+            for le, n in zip(self.buckets, m.buckets):
+                total += n
+                lines.append(f'{name}_bucket{{{lbl},le="{le}"}} {total}')
+            total += m.buckets[-1]
+            lines.append(f'{name}_bucket{{{lbl},le="+Inf"}} {total}')
+            lines.append(f"{name}_sum{{{lbl}}} {m.sum_ns / 1e9}")
+            lines.append(f"{name}_count{{{lbl}}} {total}")
+        for metric, kind, help_text, attr in (
+            ("http_requests_in_flight", "gauge", "Requests in progress.", "in_flight"),
+            (
+                "http_request_size_bytes_total",
+                "counter",
+                "Request body bytes received.",
+                "request_bytes",
+            ),
+            (
+                "http_response_size_bytes_total",
+                "counter",
+                "Response body bytes sent.",
+                "response_bytes",
+            ),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for m in routes:
+                lines.append(f"{metric}{{{labels[id(m)]}}} {getattr(m, attr)}")
+        return "\n".join(lines) + "\n"
 
-            return Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-                background=response.background,
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding a MetricsRegistry, keyed by route template.
+
+    Non-standard methods are counted as OTHER so clients cannot grow the label
+    set; paths in exclude pass straight through unrecorded.
+    """
+
+    def __init__(
+        self,
+        app,
+        registry: MetricsRegistry,
+        index: RouteIndex,
+        exclude: Iterable[str] = (),
+    ):
+        self.app = app
+        self.registry = registry
+        self.index = index
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+        route = self.index.lookup(scope["path"]) or "<unmatched>"
+        method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+        metrics = self.registry.route(method, route)
+        status = 500
+
+        async def receive_counted():
+            message = await receive()
+            if message["type"] == "http.request":
+                metrics.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                metrics.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        start = perf_counter_ns()
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(status, perf_counter_ns() - start)
+
+
+def init_metrics(
+    app: FastAPI,
+    path: str = "/metrics",
+    buckets: Iterable[float] = DEFAULT_BUCKETS,
+) -> MetricsRegistry:
+    """Collect per-route metrics and serve them in Prometheus format at path."""
+    registry = MetricsRegistry(buckets)
+    app.state.toolbox_metrics = registry
+    app.add_middleware(
+        MetricsMiddleware,
+        registry=registry,
+        index=get_route_index(app),
+        exclude=(path,),
+    )
+
+    @app.get(path, include_in_schema=False)
+    async def metrics():
+        return Response(
+            content=registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    return registry
+
+
+def cache_response(ttl: float = 5, stale_ttl: float = 0, vary: Iterable[str] = ()):
+    """Mark a GET endpoint as cacheable by the init_response_cache middleware."""
+
+    def decorator(func: Callable) -> Callable:
+        func.__toolbox_cache__ = CachePolicy(ttl, stale_ttl, vary)
+        return func
+
+    return decorator
+
+
+class CachePolicy:
+    __slots__ = ("ttl", "stale_ttl", "vary")
+
+    def __init__(self, ttl: float = 5, stale_ttl: float = 0, vary: Iterable[str] = ()):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.vary = tuple(h.lower() for h in vary)
+
+
+class CacheEntry:
+    __slots__ = (
+        "status",
+        "headers",
+        "body",
+        "etag",
+        "created",
+        "expires",
+        "stale",
+        "shareable",
+    )
+
+    def __init__(
+        self,
+        status: int,
+        headers: list,
+        body: bytes,
+        policy: CachePolicy,
+        shareable: bool = True,
+    ):
+        self.status = status
+        self.body = body
+        self.etag = next((v for k, v in headers if k == b"etag"), None)
+        if self.etag is None and shareable:
+            self.etag = f'"{hash_var(body)}"'.encode()
+        self.headers = [(k, v) for k, v in headers if k != b"etag"]
+        self.created = time.monotonic()
+        self.expires = self.created + policy.ttl
+        self.stale = self.expires + policy.stale_ttl
+        self.shareable = shareable
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + 64 * len(self.headers)
+
+
+class ResponseCache:
+    """In-memory LRU of GET responses, bounded by total bytes, with hit stats."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._stats = dict.fromkeys(
+            ("hits", "stale_hits", "misses", "not_modified", "refreshes", "evictions"),
+            0,
+        )
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: CacheEntry) -> None:
+        size = entry.size
+        if size > self.max_bytes // 4:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        self._entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self._stats["evictions"] += 1
+
+    def count(self, stat: str) -> None:
+        self._stats[stat] += 1
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, hit rate, entry count and cached bytes."""
+        served = self._stats["hits"] + self._stats["stale_hits"]
+        total = served + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": served / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+
+class _Streaming(Exception):
+    """Raised from _compute's send to abandon a response that must not be buffered."""
+
+
+def _streaming(status: int, headers: list) -> bool:
+    # no content-length on a response with a body means its end is unknown
+    # (SSE, generators, ...); 204/304 legitimately carry neither
+    content_type = next((v for k, v in headers if k == b"content-type"), b"")
+    if content_type.startswith(b"text/event-stream"):
+        return True
+    if status in (204, 304) or status < 200:
+        return False
+    return not any(k == b"content-length" for k, _ in headers)
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    # weak comparison (RFC 9110): whole tags, W/ prefixes ignored
+    if if_none_match.strip() == b"*":
+        return True
+    ours = etag.strip().removeprefix(b"W/")
+    return any(
+        tag.strip().removeprefix(b"W/") == ours for tag in if_none_match.split(b",")
+    )
+
+
+def _uncacheable(headers: list) -> bool:
+    for k, v in headers:
+        if k == b"set-cookie":
+            return True
+        if k == b"cache-control" and (b"no-store" in v or b"private" in v):
+            return True
+    return False
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached GET responses for cacheable routes.
+
+    A route is cacheable when its template matches one of paths or its GET
+    endpoint is decorated with @cache_response. Requests resolve against the
+    GET routes in declaration order, so the policy is that of the route
+    Starlette dispatches to. Policies are read from the app's routes up front
+    (and again whenever the route list changes), so other routes pass straight
+    through without buffering or coalescing. Fresh entries
+    are served directly, stale ones (within stale_ttl) are served while one
+    background refresh runs, and concurrent misses share one computation.
+    Responses with Set-Cookie, private/no-store or a non-200 status are never
+    cached or shared, and requests carrying Authorization or Cookie bypass the
+    cache unless the route lists that header in vary. Streaming and file
+    responses are never buffered: routes declaring one are skipped up front,
+    and a route found streaming at runtime is passed through from then on.
+    """
+
+    def __init__(
+        self,
+        app,
+        cache: ResponseCache,
+        index: RouteIndex,
+        paths: re.Pattern,
+        policy: CachePolicy,
+    ):
+        self.app = app
+        self.cache = cache
+        self.index = index
+        self.paths = paths
+        self.policy = policy
+        self._version: tuple[int, int] | None = None
+        self._policies: dict[str, CachePolicy] = {}
+        self._flight = SingleFlight()
+        self._refreshing: set[asyncio.Task] = set()
+
+    def _build_policies(self) -> None:
+        routes = self.index.app.routes
+        policies = {}
+        for route in RouteIndex.collect(routes):
+            if "GET" not in (getattr(route, "methods", None) or ()):
+                continue
+            response_class = getattr(route, "response_class", None)
+            if isinstance(response_class, DefaultPlaceholder):
+                response_class = response_class.value
+            if isinstance(response_class, type) and issubclass(
+                response_class, (StreamingResponse, FileResponse)
+            ):
+                continue
+            policy = getattr(route.endpoint, "__toolbox_cache__", None)
+            if policy is None and self.paths.match(route.path):
+                policy = self.policy
+            if policy is not None:
+                policies.setdefault(route.path, policy)
+        self._policies = policies
+        self._version = (id(routes), len(routes))
+
+    def _policy_for(self, template: str) -> CachePolicy | None:
+        routes = self.index.app.routes
+        if self._version != (id(routes), len(routes)):
+            self._build_policies()
+        return self._policies.get(template)
+
+    async def _compute(
+        self, scope: dict, template: str, key: tuple, policy: CachePolicy
+    ) -> CacheEntry | None:
+        """Run the request once and buffer its response; None if it streams."""
+        status, headers, chunks = 500, [], []
+        requested = False
+        finished = asyncio.Event()
+
+        async def receive() -> dict:
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # like a live connection: nothing more arrives until the response ends
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(k.lower(), v) for k, v in message.get("headers", [])]
+                if _streaming(status, headers):
+                    raise _Streaming()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(dict(scope), receive, send)
+        except _Streaming:
+            self._policies.pop(template, None)
+            return None
+        finally:
+            finished.set()
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in headers if k != b"content-length"]
+        shareable = status == 200 and not _uncacheable(headers)
+        entry = CacheEntry(status, headers, body, policy, shareable)
+        if shareable:
+            self.cache.put(key, entry)
+        return entry
+
+    def _refresh(
+        self, scope: dict, template: str, key: tuple, policy: CachePolicy
+    ) -> None:
+        if self._flight.running(key):
+            return
+        self.cache.count("refreshes")
+        task = asyncio.ensure_future(
+            self._flight.do(key, self._compute, scope, template, key, policy)
+        )
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshed)
+
+    def _refreshed(self, task: asyncio.Task) -> None:
+        self._refreshing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            debug(str(task.exception()), "[CACHE] refresh failed")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        template = self.index.lookup(scope["path"])
+        policy = self._policy_for(template) if template is not None else None
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        req_headers = dict(scope.get("headers", []))
+        for private in (b"authorization", b"cookie"):
+            if private in req_headers and private.decode() not in policy.vary:
+                return await self.app(scope, receive, send)
+        key = (
+            scope["path"],
+            tuple(sorted(parse_qsl(scope.get("query_string", b"").decode()))),
+            tuple(req_headers.get(h.encode(), b"") for h in policy.vary),
+        )
+        entry = None
+        if b"no-cache" not in req_headers.get(b"cache-control", b""):
+            entry = self.cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires:
+            self.cache.count("hits")
+            state = b"HIT"
+        elif entry is not None and now < entry.stale:
+            self.cache.count("stale_hits")
+            self._refresh(scope, template, key, policy)
+            state = b"STALE"
+        else:
+            self.cache.count("misses")
+            leader = not self._flight.running(key)
+            entry = await self._flight.do(
+                key, self._compute, scope, template, key, policy
             )
+            if entry is None:
+                # a streaming response: abandoned unsent, so serve it uncached
+                return await self.app(scope, receive, send)
+            if not entry.shareable and not leader:
+                # someone else's response that may be user-specific: run our own
+                return await self.app(scope, receive, send)
+            state = b"MISS"
 
-        debug(
-            f"response took {process_time:.2f}ms",
-            f"[RESP:{response.status_code}] {url}",
+        inm = req_headers.get(b"if-none-match")
+        length = (b"content-length", str(len(entry.body)).encode())
+        if entry.etag is None:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": entry.status,
+                    "headers": entry.headers + [length],
+                }
+            )
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+        if inm is not None and _etag_matches(inm, entry.etag):
+            self.cache.count("not_modified")
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(b"etag", entry.etag), (b"x-cache", state)],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": entry.status,
+                "headers": entry.headers
+                + [
+                    length,
+                    (b"etag", entry.etag),
+                    (b"age", str(int(now - entry.created)).encode()),
+                    (b"x-cache", state),
+                ],
+            }
         )
-        return response
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+def init_response_cache(
+    app: FastAPI,
+    ttl: float = 5,
+    stale_ttl: float = 0,
+    max_bytes: int = 64 * 1024 * 1024,
+    vary: Iterable[str] = ("accept",),
+    paths: list[str] | None = None,
+) -> ResponseCache:
+    """Cache GET responses for routes matching paths or marked @cache_response."""
+    cache = ResponseCache(max_bytes)
+    app.state.toolbox_response_cache = cache
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=cache,
+        index=RouteIndex(app, methods=("GET",)),
+        paths=compile_globs(paths or []),
+        policy=CachePolicy(ttl, stale_ttl, vary),
+    )
+    return cache
 
 
 def init_scalar_docs(
@@ -164,6 +1226,38 @@ def init_scalar_docs(
         )
 
 
+def add_warmup(app: FastAPI, *hooks: Callable[[FastAPI], Any]) -> None:
+    """Warm caches in each worker during startup, before it accepts traffic.
+
+    Runs after the app's own lifespan startup: builds the route index, then
+    calls every hook with the app (sync or async), in registration order.
+    """
+    warmups = getattr(app.state, "toolbox_warmup", None)
+    if warmups is None:
+        warmups = app.state.toolbox_warmup = []
+        lifespan_context = app.router.lifespan_context
+
+        @asynccontextmanager
+        async def lifespan(asgi_app):
+            async with lifespan_context(asgi_app) as state:
+                started = perf_counter_ns()
+                get_route_index(app).build()
+                for hook in warmups:
+                    result = hook(app)
+                    if inspect.isawaitable(result):
+                        await result
+                elapsed_ms = (perf_counter_ns() - started) / 1e6
+                debug(f"warm-up done in {elapsed_ms:.1f}ms", "api", lvl=2)
+                yield state
+
+        app.router.lifespan_context = lifespan
+    warmups.extend(hooks)
+
+
+def _pick_impl(module: str, fallback: str) -> str:
+    return module if find_spec(module) is not None else fallback
+
+
 def run_server(
     module: str,
     env: str,
@@ -172,16 +1266,63 @@ def run_server(
     use_ssl: bool = False,
     ssl_keyfile: str | None = None,
     ssl_certfile: str | None = None,
+    production: bool = False,
+    workers: int | None = None,
+    host: str = "0.0.0.0",
+    uds: str | None = None,
+    backlog: int = 2048,
+    keep_alive: int = 5,
+    limit_concurrency: int | None = None,
+    limit_max_requests: int | None = None,
+    graceful_timeout: int | None = None,
+    preload: bool = False,
+    **kwargs,
 ) -> None:
-    """Start a uvicorn server for the given ASGI module string."""
+    """Start a uvicorn server for the given ASGI module string.
+
+    production=True runs one worker per CPU (unless workers is given) on
+    uvloop/httptools when installed, with a 30s graceful shutdown by default.
+    uds binds a Unix domain socket instead of host:port. preload imports the
+    app in this process first so import errors fail fast; with a single
+    worker that same app object is then served. Extra kwargs go to uvicorn.run.
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if production else 1
+    if production and graceful_timeout is None:
+        graceful_timeout = 30
+    if hot_reload and workers > 1:
+        ToolboxWarning("hot_reload runs a single worker; ignoring workers")
+        workers = 1
+    loop = _pick_impl("uvloop", "asyncio") if production else "auto"
+    http = _pick_impl("httptools", "h11") if production else "auto"
+    app = module
+    if preload:
+        imported = import_from_string(module)
+        if workers == 1 and not hot_reload:
+            app = imported
     ssl_mode = "SSL" if ssl_keyfile and ssl_certfile else "no SSL"
-    print(f"\n{'=' * 80}\n[FastAPI] Running in {env} Mode ({ssl_mode})\n{'=' * 80}\n")
+    bind = f"unix:{uds}" if uds else f"{host}:{port}"
+    print(
+        f"\n{'=' * 80}\n[FastAPI] Running in {env} Mode ({ssl_mode})"
+        f" on {bind} with {workers} worker(s), loop={loop}, http={http}"
+        f"\n{'=' * 80}\n"
+    )
     uvicorn.run(
-        module,
+        app,
         port=port,
-        host="0.0.0.0",
+        host=host,
+        uds=uds,
         ssl_keyfile=ssl_keyfile if use_ssl else None,
         ssl_certfile=ssl_certfile if use_ssl else None,
         reload=hot_reload,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=backlog,
+        timeout_keep_alive=keep_alive,
+        limit_concurrency=limit_concurrency,
+        limit_max_requests=limit_max_requests,
+        timeout_graceful_shutdown=graceful_timeout,
         log_level="info",
+        **kwargs,
     )
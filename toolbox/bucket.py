@@ -0,0 +1,326 @@
+import re
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, tzinfo
+from typing import Any, Iterable, Optional, Union
+from toolbox.date import get_tz
+from toolbox.exceptions import ToolboxError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AGGS = ("count", "sum", "first", "last", "min", "max")
+_SCALE = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+_INTERVAL_RE = re.compile(r"^\s*(\d+)\s*([smhdw])\s*$")
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_DAY = 86400
+
+Timestamps = Union[Iterable[int], array, "np.ndarray"]
+
+
+def interval_seconds(interval: Union[int, str, timedelta]) -> int:
+    """Return interval in whole seconds; accepts seconds, a timedelta or "5m"-style."""
+    if isinstance(interval, timedelta):
+        seconds = interval.total_seconds()
+    elif isinstance(interval, str):
+        match = _INTERVAL_RE.match(interval)
+        if not match:
+            raise ToolboxError(f"Invalid interval={interval}, use e.g. 30s, 5m, 1h, 1d")
+        seconds = int(match.group(1)) * _INTERVAL_UNITS[match.group(2)]
+    else:
+        seconds = interval
+    if seconds <= 0 or seconds != int(seconds):
+        raise ToolboxError(f"Invalid interval={interval}, must be whole seconds > 0")
+    return int(seconds)
+
+
+def _offset(tz: tzinfo, ts: int) -> int:
+    return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+def _transitions(tz: tzinfo, lo: int, hi: int) -> tuple[list[int], list[int]]:
+    """Return (starts, offsets) of tz's UTC offsets in effect over [lo, hi] seconds.
+
+    Samples once per day and bisects to the second where the offset changes,
+    so it assumes at most one transition per day (true for real zones).
+    """
+    start = lo - 2 * _DAY
+    starts, offsets = [start], [_offset(tz, start)]
+    for probe in range(start + _DAY, hi + 3 * _DAY, _DAY):
+        offset = _offset(tz, probe)
+        if offset == offsets[-1]:
+            continue
+        before, after = probe - _DAY, probe
+        while after - before > 1:
+            mid = (before + after) // 2
+            if _offset(tz, mid) == offset:
+                after = mid
+            else:
+                before = mid
+        starts.append(after)
+        offsets.append(offset)
+    return starts, offsets
+
+
+class _Bucketer:
+    """Floors epochs to interval buckets aligned on tz's local wall clock."""
+
+    def __init__(
+        self,
+        interval: Union[int, str, timedelta],
+        tz: Optional[Union[str, tzinfo]],
+        unit: str,
+        offset: int,
+    ):
+        if unit not in _SCALE:
+            raise ToolboxError(f"Unknown unit={unit}, use s, ms, us or ns")
+        self.scale = _SCALE[unit]
+        self.step = interval_seconds(interval) * self.scale
+        self.origin = offset * self.scale
+        self.tz = get_tz(tz) if tz else None
+
+    def _zone(self, lo: int, hi: int) -> tuple[list[int], list[int]]:
+        if self.tz is None:
+            return [lo], [0]
+        starts, offsets = _transitions(self.tz, lo // self.scale, hi // self.scale + 1)
+        return [s * self.scale for s in starts], [o * self.scale for o in offsets]
+
+    def numpy(self, ts: "np.ndarray", ceil: bool) -> "np.ndarray":
+        ts = ts.astype(np.int64, copy=False)
+        if not len(ts):
+            return ts.copy()
+        starts, offsets = self._zone(int(ts.min()), int(ts.max()))
+        starts, offsets = np.array(starts, np.int64), np.array(offsets, np.int64)
+        if len(offsets) == 1:
+            local = ts + offsets[0]
+            floor = local - (local - self.origin) % self.step
+            if ceil:
+                floor = np.where(floor == local, floor, floor + self.step)
+            return floor - offsets[0]
+
+        def offset_at(values):
+            return offsets[np.searchsorted(starts, values, side="right") - 1]
+
+        def to_utc(local, own):
+            # prefer the ts's own offset (ambiguous hours), then the other one;
+            # a local time inside a DST gap maps to the transition instant
+            first = local - own
+            first_offset = offset_at(first)
+            second = local - first_offset
+            valid = offset_at(second) == first_offset
+            resolved = np.where(valid, second, np.maximum(first, second))
+            return np.where(first_offset == own, first, resolved)
+
+        own = offset_at(ts)
+        local = ts + own
+        floor = local - (local - self.origin) % self.step
+        if ceil:
+            exact = floor == local
+            floor = np.where(exact, floor, floor + self.step)
+            return np.where(exact, ts, to_utc(floor, own))
+        return to_utc(floor, own)
+
+    def python(self, ts: Iterable[int], ceil: bool) -> array:
+        ts = ts if isinstance(ts, (array, list, tuple)) else list(ts)
+        if not len(ts):
+            return array("q")
+        starts, offsets = self._zone(min(ts), max(ts))
+        step, origin = self.step, self.origin
+        if len(offsets) == 1:
+            off = offsets[0]
+            result = array("q", [t - (t + off - origin) % step for t in ts])
+            if ceil:
+                for i, (t, b) in enumerate(zip(ts, result)):
+                    if b != t:
+                        result[i] = b + step
+            return result
+
+        def offset_at(value):
+            return offsets[bisect_right(starts, value) - 1]
+
+        def to_utc(local, own):
+            first = local - own
+            first_offset = offset_at(first)
+            if first_offset == own:
+                return first
+            second = local - first_offset
+            return second if offset_at(second) == first_offset else max(first, second)
+
+        result = array("q", bytes(8 * len(ts)))
+        for i, t in enumerate(ts):
+            own = offset_at(t)
+            local = t + own
+            floor = local - (local - origin) % step
+            if ceil and floor == local:
+                result[i] = t
+                continue
+            if ceil:
+                floor += step
+            result[i] = to_utc(floor, own)
+        return result
+
+    def __call__(
+        self, ts: Timestamps, ceil: bool = False
+    ) -> Union[array, "np.ndarray"]:
+        if np is not None and isinstance(ts, np.ndarray):
+            return self.numpy(ts, ceil)
+        if np is not None and isinstance(ts, array) and ts.typecode == "q":
+            return array("q", self.numpy(np.frombuffer(ts, np.int64), ceil).tobytes())
+        return self.python(ts, ceil)
+
+
+def floor_ts(
+    ts: Timestamps,
+    interval: Union[int, str, timedelta],
+    tz: Optional[Union[str, tzinfo]] = None,
+    unit: str = "s",
+    offset: int = 0,
+) -> Union[array, "np.ndarray"]:
+    """Floor epoch timestamps to the start of their interval bucket.
+
+    With tz, buckets follow that zone's wall clock (1d starts at local midnight,
+    1h at :00 even for +05:30), including across DST changes. offset shifts the
+    bucket origin by that many seconds (e.g. 4 * 86400 starts weeks on Monday).
+    Returns a NumPy array for NumPy input, else array('q').
+    """
+    return _Bucketer(interval, tz, unit, offset)(ts)
+
+
+def ceil_ts(
+    ts: Timestamps,
+    interval: Union[int, str, timedelta],
+    tz: Optional[Union[str, tzinfo]] = None,
+    unit: str = "s",
+    offset: int = 0,
+) -> Union[array, "np.ndarray"]:
+    """Ceil epoch timestamps to the next bucket start; exact boundaries stay put."""
+    return _Bucketer(interval, tz, unit, offset)(ts, ceil=True)
+
+
+def _group_numpy(buckets: "np.ndarray", values: Any, aggs: tuple) -> dict:
+    if values is not None:
+        values = np.asarray(values if hasattr(values, "__len__") else list(values))
+    if len(buckets) and np.any(buckets[1:] < buckets[:-1]):
+        order = np.argsort(buckets, kind="stable")
+        buckets = buckets[order]
+        values = values[order] if values is not None else None
+    if not len(buckets):
+        empty = np.array([], np.int64)
+        return {"bucket": empty, **{agg: empty for agg in aggs}}
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+    result = {"bucket": buckets[starts]}
+    for agg in aggs:
+        if agg == "count":
+            result[agg] = ends - starts
+        elif agg == "sum":
+            result[agg] = np.add.reduceat(values, starts)
+        elif agg == "min":
+            result[agg] = np.minimum.reduceat(values, starts)
+        elif agg == "max":
+            result[agg] = np.maximum.reduceat(values, starts)
+        elif agg == "first":
+            result[agg] = values[starts]
+        elif agg == "last":
+            result[agg] = values[ends - 1]
+    return result
+
+
+def _group_python(buckets: Iterable[int], values: Any, aggs: tuple) -> dict:
+    groups: dict[int, list] = {}
+    if values is None:
+        for bucket in buckets:
+            state = groups.get(bucket)
+            if state is None:
+                groups[bucket] = [1]
+            else:
+                state[0] += 1
+    else:
+        # state: [count, sum, first, last, min, max]
+        for bucket, value in zip(buckets, values):
+            state = groups.get(bucket)
+            if state is None:
+                groups[bucket] = [1, value, value, value, value, value]
+                continue
+            state[0] += 1
+            state[1] += value
+            state[3] = value
+            if value < state[4]:
+                state[4] = value
+            elif value > state[5]:
+                state[5] = value
+    keys = sorted(groups)
+    result = {"bucket": array("q", keys)}
+    for agg in aggs:
+        column = AGGS.index(agg)
+        if agg == "count":
+            result[agg] = array("q", [groups[k][0] for k in keys])
+        else:
+            result[agg] = [groups[k][column] for k in keys]
+    return result
+
+
+def aggregate(
+    ts: Timestamps,
+    values: Optional[Iterable] = None,
+    interval: Union[int, str, timedelta] = 60,
+    aggs: Iterable[str] = AGGS,
+    tz: Optional[Union[str, tzinfo]] = None,
+    unit: str = "s",
+    offset: int = 0,
+) -> dict:
+    """Group values by floor_ts bucket and aggregate each group in one pass.
+
+    Returns {"bucket": starts, <agg>: column, ...} sorted by bucket, with aggs
+    drawn from count/sum/first/last/min/max; first/last follow input order.
+    Without values only "count" is available.
+    """
+    aggs = tuple(aggs)
+    unknown = [agg for agg in aggs if agg not in AGGS]
+    if unknown or (values is None and aggs != ("count",)):
+        raise ToolboxError(
+            f"Unsupported aggs={aggs} (values given={values is not None})"
+        )
+    buckets = floor_ts(ts, interval, tz=tz, unit=unit, offset=offset)
+    if np is not None and (
+        isinstance(buckets, np.ndarray) or isinstance(values, np.ndarray)
+    ):
+        return _group_numpy(np.asarray(buckets), values, aggs)
+    if values is not None and not isinstance(values, (list, tuple, array)):
+        values = list(values)
+    return _group_python(buckets, values, aggs)
+
+
+def ohlc(
+    ts: Timestamps,
+    prices: Iterable,
+    interval: Union[int, str, timedelta] = 60,
+    volumes: Optional[Iterable] = None,
+    tz: Optional[Union[str, tzinfo]] = None,
+    unit: str = "s",
+    offset: int = 0,
+) -> dict:
+    """Resample trades into bars: bucket, open, high, low, close, count (+ volume)."""
+    buckets = floor_ts(ts, interval, tz=tz, unit=unit, offset=offset)
+    use_numpy = np is not None and (
+        isinstance(buckets, np.ndarray) or isinstance(prices, np.ndarray)
+    )
+    group = _group_numpy if use_numpy else _group_python
+    if use_numpy:
+        buckets = np.asarray(buckets)
+    elif not isinstance(prices, (list, tuple, array)):
+        prices = list(prices)
+    bars = group(buckets, prices, ("first", "max", "min", "last", "count"))
+    result = {
+        "bucket": bars["bucket"],
+        "open": bars["first"],
+        "high": bars["max"],
+        "low": bars["min"],
+        "close": bars["last"],
+        "count": bars["count"],
+    }
+    if volumes is not None:
+        result["volume"] = group(buckets, volumes, ("sum",))["sum"]
+    return result
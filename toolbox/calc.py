@@ -1,6 +1,21 @@
+import math
 import bisect
-from typing import Union
+from collections import deque
+from typing import Iterable, Iterator, Optional, Union
 from toolbox.utils import debug
+from toolbox.exceptions import ToolboxError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+Number = Union[int, float]
 
 
 def calc_delta(a: Union[int, float], b: Union[int, float]) -> Union[int, float]:
@@ -32,3 +47,425 @@ def select_nearest(
         nearest = left if abs(target - left) <= abs(right - target) else right
     debug(nearest, lvl=2)
     return nearest
+
+
+class NearestIndex:
+    """Sorted option set answering nearest-value queries in O(log n).
+
+    Build once and reuse instead of calling select_nearest repeatedly. ties
+    picks the lower ("lower", like select_nearest) or higher ("higher") option
+    when a target sits exactly between two. add/discard keep it sorted; with
+    sortedcontainers installed they are O(log n), otherwise O(n).
+    """
+
+    def __init__(self, options: Iterable[Number] = (), ties: str = "lower"):
+        if ties not in ("lower", "higher"):
+            raise ToolboxError(f"Unknown ties={ties}, use lower or higher")
+        self.ties = ties
+        values = sorted(options)
+        self._values = SortedList(values) if SortedList is not None else values
+        self._list: Optional[list] = None
+        self._array = None
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Number]:
+        return iter(self._values)
+
+    def __contains__(self, value: Number) -> bool:
+        values = self._values
+        i = self._bisect(value)
+        return i < len(values) and values[i] == value
+
+    def _bisect(self, value: Number) -> int:
+        if SortedList is not None:
+            return self._values.bisect_left(value)
+        return bisect.bisect_left(self._values, value)
+
+    def _changed(self) -> None:
+        self._list = None
+        self._array = None
+
+    def add(self, value: Number) -> None:
+        """Insert value, keeping the index sorted."""
+        if SortedList is not None:
+            self._values.add(value)
+        else:
+            bisect.insort(self._values, value)
+        self._changed()
+
+    def discard(self, value: Number) -> bool:
+        """Remove one occurrence of value; return False if it was not present."""
+        if value not in self:
+            return False
+        if SortedList is not None:
+            self._values.remove(value)
+        else:
+            del self._values[self._bisect(value)]
+        self._changed()
+        return True
+
+    def _snapshot(self) -> list:
+        if self._list is None:
+            self._list = list(self._values)
+        return self._list
+
+    def _pick(self, target: Number, values, i: int) -> Number:
+        if i == 0:
+            return values[0]
+        if i == len(values):
+            return values[-1]
+        left, right = values[i - 1], values[i]
+        if self.ties == "lower":
+            return left if target - left <= right - target else right
+        return right if right - target <= target - left else left
+
+    def nearest(self, target: Number) -> Number:
+        """Return the option closest to target."""
+        if not self._values:
+            raise ToolboxError("NearestIndex is empty")
+        return self._pick(target, self._values, self._bisect(target))
+
+    def nearest_many(self, targets: Iterable[Number]) -> Union[list, "np.ndarray"]:
+        """Return the nearest option for each target in one pass.
+
+        Uses numpy.searchsorted when NumPy is available and the options are
+        numeric (NumPy input gives a NumPy result); otherwise sorted targets are
+        merged against the options in O(n + m) and unsorted ones bisected.
+        """
+        if not self._values:
+            raise ToolboxError("NearestIndex is empty")
+        values = self._snapshot()
+        if np is not None and isinstance(targets, np.ndarray):
+            options = self._numeric_array()
+            if options is not None:
+                return self._nearest_numpy(options, targets)
+        targets = targets if isinstance(targets, (list, tuple)) else list(targets)
+        if np is not None:
+            options = self._numeric_array()
+            if options is not None and targets:
+                return self._nearest_numpy(options, np.asarray(targets)).tolist()
+        if any(b < a for a, b in zip(targets, targets[1:])):
+            pick, search = self._pick, bisect.bisect_left
+            return [pick(t, values, search(values, t)) for t in targets]
+        result, i, n = [], 0, len(values)
+        for target in targets:
+            while i < n and values[i] < target:
+                i += 1
+            result.append(self._pick(target, values, i))
+        return result
+
+    def _numeric_array(self) -> Optional["np.ndarray"]:
+        if self._array is None:
+            options = np.asarray(self._snapshot())
+            self._array = options if options.dtype.kind in "iuf" else False
+        return self._array if self._array is not False else None
+
+    def _nearest_numpy(
+        self, options: "np.ndarray", targets: "np.ndarray"
+    ) -> "np.ndarray":
+        i = np.searchsorted(options, targets, side="left")
+        left = options[np.maximum(i - 1, 0)]
+        right = options[np.minimum(i, len(options) - 1)]
+        if self.ties == "lower":
+            return np.where(targets - left <= right - targets, left, right)
+        return np.where(right - targets <= targets - left, right, left)
+
+    def k_nearest(self, target: Number, k: int) -> list:
+        """Return up to k options ordered by distance to target (ties per policy)."""
+        values = self._values
+        hi = self._bisect(target)
+        lo = hi - 1
+        result = []
+        while len(result) < k and (lo >= 0 or hi < len(values)):
+            if hi >= len(values):
+                take_low = True
+            elif lo < 0:
+                take_low = False
+            else:
+                below, above = target - values[lo], values[hi] - target
+                if below == above:
+                    take_low = self.ties == "lower"
+                else:
+                    take_low = below < above
+            if take_low:
+                result.append(values[lo])
+                lo -= 1
+            else:
+                result.append(values[hi])
+                hi += 1
+        return result
+
+
+class StreamDelta:
+    """Running delta and percent change against the previous value, O(1) per update."""
+
+    __slots__ = ("prev", "delta", "pct")
+
+    def __init__(self):
+        self.prev: Optional[Number] = None
+        self.delta: Optional[Number] = None
+        self.pct: Optional[float] = None
+
+    def update(self, value: Number) -> Optional[Number]:
+        """Feed value; return value - previous (None for the first value)."""
+        prev = self.prev
+        if prev is None:
+            self.delta = self.pct = None
+        else:
+            self.delta = calc_delta(prev, value)
+            self.pct = self.delta / prev * 100 if prev else None
+        self.prev = value
+        return self.delta
+
+
+class EMA:
+    """Exponential moving average seeded with the first value.
+
+    Give either alpha or span (alpha = 2 / (span + 1)). Values (e.g. Decimal)
+    are averaged as floats.
+    """
+
+    __slots__ = ("alpha", "value", "count")
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None):
+        if alpha is None:
+            if not span or span < 1:
+                raise ToolboxError("EMA needs span >= 1 or 0 < alpha <= 1")
+            alpha = 2 / (span + 1)
+        if not 0 < alpha <= 1:
+            raise ToolboxError(f"EMA alpha={alpha} must be in (0, 1]")
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self.count = 0
+
+    def update(self, value: Number) -> float:
+        """Feed value and return the updated average."""
+        value = float(value)
+        self.count += 1
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class RollingWindow:
+    """Mean, variance, min and max over the last size values, O(1) amortized.
+
+    Mean/variance use Welford updates with removal, re-derived exactly once
+    per size evictions so rounding drift stays bounded; min/max use monotonic
+    deques and return the values as given. Mean and variance are computed on
+    float(value), so Decimal input works too. Memory is bounded by size.
+    """
+
+    __slots__ = ("size", "count", "mean", "_m2", "_values", "_mins", "_maxs", "_seen")
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ToolboxError(f"RollingWindow size={size} must be >= 1")
+        self.size = size
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._values: deque = deque()
+        self._mins: deque = deque()  # (index, value), values increasing
+        self._maxs: deque = deque()  # (index, value), values decreasing
+        self._seen = 0
+
+    def update(self, value: Number) -> "RollingWindow":
+        """Add value, evicting the oldest once the window is full."""
+        index = self._seen
+        self._seen += 1
+        number = float(value)
+        self._values.append(number)
+        self.count += 1
+        delta = number - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (number - self.mean)
+        if self.count > self.size:
+            old = self._values.popleft()
+            self.count -= 1
+            if (self._seen - self.size) % self.size:
+                delta = old - self.mean
+                self.mean -= delta / self.count
+                self._m2 = max(self._m2 - delta * (old - self.mean), 0.0)
+            else:
+                # removal updates drift; re-derive exactly once per window length
+                self.mean = math.fsum(self._values) / self.count
+                self._m2 = math.fsum((v - self.mean) ** 2 for v in self._values)
+        mins, maxs, start = self._mins, self._maxs, index - self.size
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((index, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((index, value))
+        if mins[0][0] <= start:
+            mins.popleft()
+        if maxs[0][0] <= start:
+            maxs.popleft()
+        return self
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def min(self) -> Optional[Number]:
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self) -> Optional[Number]:
+        return self._maxs[0][1] if self._maxs else None
+
+    @property
+    def sum(self) -> float:
+        return self.mean * self.count
+
+    def var(self, ddof: int = 1) -> Optional[float]:
+        """Return the window variance (sample by default), None if too few values."""
+        if self.count - ddof <= 0:
+            return None
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 1) -> Optional[float]:
+        var = self.var(ddof)
+        return None if var is None else math.sqrt(var)
+
+
+class P2Quantile:
+    """Streaming quantile estimate (P-squared) in O(1) time and memory per update.
+
+    Exact until five values have been seen, then tracks five markers. Values
+    are tracked as floats.
+    """
+
+    __slots__ = ("q", "count", "_heights", "_pos", "_want", "_step")
+
+    def __init__(self, q: float):
+        if not 0 <= q <= 1:
+            raise ToolboxError(f"P2Quantile q={q} must be in [0, 1]")
+        self.q = q
+        self.count = 0
+        self._heights: list = []
+        self._pos = [0, 1, 2, 3, 4]
+        self._want = [0, 2 * q, 4 * q, 2 + 2 * q, 4]
+        self._step = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def update(self, value: Number) -> None:
+        value = float(value)
+        self.count += 1
+        h = self._heights
+        if self.count <= 5:
+            bisect.insort(h, value)
+            return
+        if value < h[0]:
+            h[0] = value
+            k = 0
+        elif value >= h[4]:
+            h[4] = value
+            k = 3
+        else:
+            k = bisect.bisect_right(h, value, 1, 4) - 1
+        pos, want = self._pos, self._want
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            want[i] += self._step[i]
+        for i in (1, 2, 3):
+            d = want[i] - pos[i]
+            below, here, above = pos[i - 1], pos[i], pos[i + 1]
+            if not ((d >= 1 and above - here > 1) or (d <= -1 and below - here < -1)):
+                continue
+            d = 1 if d > 0 else -1
+            parabolic = h[i] + d / (above - below) * (
+                (here - below + d) * (h[i + 1] - h[i]) / (above - here)
+                + (above - here - d) * (h[i] - h[i - 1]) / (here - below)
+            )
+            if h[i - 1] < parabolic < h[i + 1]:
+                h[i] = parabolic
+            else:
+                h[i] += d * (h[i + d] - h[i]) / (pos[i + d] - here)
+            pos[i] += d
+
+    @property
+    def value(self) -> Optional[float]:
+        """Current estimate (linear interpolation while fewer than five values)."""
+        h = self._heights
+        if not h:
+            return None
+        if self.count > 5:
+            return h[2]
+        rank = self.q * (len(h) - 1)
+        lo = int(rank)
+        hi = min(lo + 1, len(h) - 1)
+        return h[lo] + (h[hi] - h[lo]) * (rank - lo)
+
+
+def deltas(values: Iterable[Number], pct: bool = False) -> Union[list, "np.ndarray"]:
+    """Return successive differences (or percent changes) of values in one pass.
+
+    The result is one shorter than values; a percent change from 0 is None
+    (NaN for NumPy input, which is computed vectorized).
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        diff = np.diff(values)
+        if not pct:
+            return diff
+        prev = values[:-1].astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(prev != 0, diff / prev * 100, np.nan)
+    stream = StreamDelta()
+    result = []
+    for value in values:
+        if stream.update(value) is not None:
+            result.append(stream.pct if pct else stream.delta)
+    return result
+
+
+def ema(
+    values: Iterable[Number],
+    span: Optional[float] = None,
+    alpha: Optional[float] = None,
+) -> list:
+    """Return the EMA after each value, in one pass."""
+    stream = EMA(span=span, alpha=alpha)
+    return [stream.update(value) for value in values]
+
+
+ROLLING_STATS = ("mean", "sum", "min", "max", "var", "std")
+
+
+def rolling(
+    values: Iterable[Number],
+    window: int,
+    stats: Iterable[str] = ("mean",),
+    ddof: int = 1,
+) -> dict:
+    """Compute rolling stats over values in one pass; {stat: list} aligned to values.
+
+    Positions before the window first fills hold None.
+    """
+    stats = tuple(stats)
+    unknown = [stat for stat in stats if stat not in ROLLING_STATS]
+    if unknown:
+        raise ToolboxError(f"Unknown rolling stats={unknown}, use {ROLLING_STATS}")
+    stream = RollingWindow(window)
+    result = {stat: [] for stat in stats}
+    getters = {
+        "mean": lambda w: w.mean,
+        "sum": lambda w: w.sum,
+        "min": lambda w: w.min,
+        "max": lambda w: w.max,
+        "var": lambda w: w.var(ddof),
+        "std": lambda w: w.std(ddof),
+    }
+    columns = [(result[stat].append, getters[stat]) for stat in stats]
+    for value in values:
+        stream.update(value)
+        full = stream.full
+        for append, get in columns:
+            append(get(stream) if full else None)
+    return result
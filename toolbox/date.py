@@ -1,10 +1,15 @@
 import re
+import time
 import pytz
-from typing import Optional, Union, Tuple, List
-from datetime import datetime, timedelta
-from tzlocal import get_localzone
-from toolbox.dot_env import get_env
-from toolbox.utils import DATE_FORMAT, debug
+from array import array
+from collections.abc import Sequence
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, Optional, Union, Tuple, List
+from datetime import datetime, timedelta, timezone, tzinfo
+from tzlocal import get_localzone, reload_localzone
+from toolbox import utils
+from toolbox.utils import debug
 from toolbox.exceptions import ToolboxError, ToolboxWarning
 
 
@@ -19,31 +24,72 @@ def default_date() -> datetime:
     return datetime.fromtimestamp(timestamp, tz=pytz.utc)
 
 
+_local_tz: Optional[tzinfo] = None
+_NS_PER = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+
+@lru_cache(maxsize=None)
+def _zone(tz_name: str) -> tzinfo:
+    return pytz.timezone(tz_name)
+
+
+def local_tz() -> tzinfo:
+    """Return the local timezone, resolved once and cached (see refresh_local_tz)."""
+    global _local_tz
+    if _local_tz is None:
+        _local_tz = get_localzone()
+    return _local_tz
+
+
+def refresh_local_tz() -> tzinfo:
+    """Re-read the system timezone, e.g. after TZ or /etc/localtime changed."""
+    global _local_tz
+    _local_tz = reload_localzone()
+    return _local_tz
+
+
+def get_tz(tz_name: Optional[Union[str, tzinfo]] = None) -> tzinfo:
+    """Return a cached zone for tz_name; tzinfo objects pass through, None is local."""
+    if isinstance(tz_name, tzinfo):
+        return tz_name
+    return _zone(tz_name) if tz_name else local_tz()
+
+
+def _attacher(tz: tzinfo) -> Callable[[datetime], datetime]:
+    """Return a function placing a datetime's wall-clock time in tz."""
+    if hasattr(tz, "localize"):  # pytz: replace() would pick the zone's LMT offset
+        return lambda date: tz.localize(date.replace(tzinfo=None))
+    return lambda date: date.replace(tzinfo=tz)
+
+
+def localize(date: datetime, tz_name: Optional[Union[str, tzinfo]] = None) -> datetime:
+    """Attach tz_name (default local) to date's wall-clock time, DST-correct."""
+    return _attacher(get_tz(tz_name))(date)
+
+
 def set_tz(date: datetime, tz_name: Optional[str] = None) -> datetime:
     """Replace the timezone on date with tz_name, or the local zone if omitted."""
     try:
-        tz = pytz.timezone(tz_name) if tz_name else get_localzone()
         if isinstance(date, datetime):
-            return date.replace(tzinfo=tz)
+            return localize(date, tz_name)
     except Exception as e:
         ToolboxWarning(f"Error setting timezone: {e}")
     return date
 
 
+def now_ts(unit: str = "ms") -> int:
+    """Return the current Unix time as an int in s, ms, us or ns, no datetime built."""
+    return time.time_ns() // _NS_PER[unit]
+
+
 def time_now(
-    tz_name: Optional[Union[str, pytz.BaseTzInfo]] = None,
+    tz_name: Optional[Union[str, tzinfo]] = None,
     format: Union[bool, str] = False,
     s: bool = True,
     ms: bool = False,
 ) -> Union[datetime, str]:
     """Return the current time in the given timezone, or as a formatted string."""
-    if isinstance(tz_name, pytz.BaseTzInfo):
-        tz = tz_name
-    elif isinstance(tz_name, str):
-        tz = pytz.timezone(tz_name)
-    else:
-        tz = get_localzone()
-    now = datetime.now(tz)
+    now = datetime.now(get_tz(tz_name))
     if not s:
         now = now.replace(second=0)
     if not ms:
@@ -53,7 +99,7 @@ def time_now(
     elif isinstance(format, str):
         return now.strftime(format)
     else:
-        return now.strftime(DATE_FORMAT)
+        return now.strftime(utils.DATE_FORMAT)
 
 
 def utc_now(
@@ -70,20 +116,143 @@ def utc_now_min(
     return time_now(tz_name=pytz.utc, format=format, s=False, ms=ms)
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_UNITS = {
+    "s": timedelta(seconds=1),
+    "ms": timedelta(milliseconds=1),
+    "us": timedelta(microseconds=1),
+}
+_ISO_FORMATS = {
+    "%Y-%m-%d": "____-__-__",
+    "%Y-%m-%d %H:%M": "____-__-__ __:__",
+    "%Y-%m-%dT%H:%M": "____-__-__T__:__",
+    "%Y-%m-%d %H:%M:%S": "____-__-__ __:__:__",
+    "%Y-%m-%dT%H:%M:%S": "____-__-__T__:__:__",
+}
+# directive -> (regex, datetime argument index, converter); mirrors strptime
+_DIRECTIVES = {
+    "Y": (r"(\d\d\d\d)", 0, int),
+    "y": (r"(\d\d)", 0, lambda v: int(v) + (2000 if int(v) < 69 else 1900)),
+    "m": (r"(1[0-2]|0[1-9]|[1-9])", 1, int),
+    "d": (r"(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])", 2, int),
+    "H": (r"(2[0-3]|[0-1]\d|\d)", 3, int),
+    "M": (r"([0-5]\d|\d)", 4, int),
+    "S": (r"(6[0-1]|[0-5]\d|\d)", 5, int),
+    "f": (r"([0-9]{1,6})", 6, lambda v: int(v.ljust(6, "0"))),
+    "z": (r"([+-]\d\d:?[0-5]\d(?::?[0-5]\d(?:\.\d{1,6})?)?|(?-i:Z))", 7, None),
+}
+_TOKEN_RE = re.compile(r"%(.)|(\s+)|([^%\s]+)", re.DOTALL)
+# fractions longer than microseconds are cut to 6 digits before parsing
+_LONG_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+@lru_cache(maxsize=None)
+def _offset_tz(value: str) -> timezone:
+    # same checks and arithmetic as strptime's %z
+    if value == "Z":
+        return timezone.utc
+    z = value
+    if z[3] == ":":
+        z = z[:3] + z[4:]
+        if len(z) > 5:
+            if z[5] != ":":
+                raise ValueError(f"Inconsistent use of : in {value}")
+            z = z[:5] + z[6:]
+    sign = -1 if z[0] == "-" else 1
+    offset = timedelta(
+        hours=int(z[1:3]),
+        minutes=int(z[3:5]),
+        seconds=int(z[5:7] or 0),
+        microseconds=int(z[8:].ljust(6, "0")),
+    )
+    return timezone(sign * offset) if offset else timezone.utc
+
+
+def _strptime_parser(format: str) -> Callable[[str], datetime]:
+    def parse(text: str) -> datetime:
+        return datetime.strptime(_LONG_FRACTION.sub(r"\1", text), format)
+
+    return parse
+
+
+@lru_cache(maxsize=256)
+def date_parser(format: Optional[str] = None) -> Callable[[str], datetime]:
+    """Return a parser specialized for format, compiled once and cached.
+
+    ISO-shaped formats go through datetime.fromisoformat, other formats built
+    from %Y %y %m %d %H %M %S %f %z and literals through one precompiled regex
+    with direct int conversion; anything else falls back to strptime. Every
+    parser accepts exactly what strptime does (after cutting fractions to 6
+    digits) and raises ValueError on mismatch. format=None uses DATE_FORMAT.
+    """
+    if format is None:
+        return date_parser(utils.DATE_FORMAT)
+    if _TOKEN_RE.sub("", format):
+        return _strptime_parser(format)  # e.g. a stray trailing %
+    pattern, plan, seen = [], [], set()
+    for directive, space, literal in _TOKEN_RE.findall(format):
+        if space:
+            pattern.append(r"\s+")
+        elif literal or directive == "%":
+            pattern.append(re.escape(literal or "%"))
+        elif directive in _DIRECTIVES and directive not in seen:
+            regex, index, convert = _DIRECTIVES[directive]
+            seen.add(directive)
+            pattern.append(regex)
+            plan.append((index, convert or _offset_tz))
+        else:
+            return _strptime_parser(format)
+    if "Y" in seen and "y" in seen:
+        return _strptime_parser(format)
+    match = re.compile("".join(pattern), re.IGNORECASE).fullmatch
+    plan = tuple((group, index, convert) for group, (index, convert) in enumerate(plan))
+    defaults = (1900, 1, 1, 0, 0, 0, 0, None)
+
+    def parse(text: str) -> datetime:
+        if "." in text:
+            text = _LONG_FRACTION.sub(r"\1", text)
+        m = match(text)
+        if m is None:
+            raise ValueError(f"time data {text!r} does not match format {format!r}")
+        groups = m.groups()
+        args = list(defaults)
+        for group, index, convert in plan:
+            args[index] = convert(groups[group])
+        return datetime(*args)
+
+    shape = _ISO_FORMATS.get(format)
+    if shape is None:
+        return parse
+    positions = [i for i, c in enumerate(shape) if c != "_"]
+    pick, separators = itemgetter(*positions), tuple(shape[i] for i in positions)
+    size = len(shape)
+    fromisoformat = datetime.fromisoformat
+
+    def parse_iso(text: str) -> datetime:
+        if len(text) == size and pick(text) == separators:
+            try:
+                return fromisoformat(text)
+            except ValueError:
+                pass
+        return parse(text)
+
+    return parse_iso
+
+
 def to_date(
     date: Union[datetime, str],
-    format: str = DATE_FORMAT,
+    format: Optional[str] = None,
     default: Union[str, datetime] = "utc",
     tz: pytz.BaseTzInfo = pytz.utc,
     tz_override: bool = False,
 ) -> datetime:
     """Parse a date string or passthrough a datetime, applying tz when needed."""
+    format = format or utils.DATE_FORMAT
     if is_date(date):
-        return date.replace(tzinfo=tz) if tz_override or not date.tzinfo else date
+        return localize(date, tz) if tz_override or not date.tzinfo else date
     try:
-        date = re.sub(r"(\.\d{6})\d+", r"\1", date)
-        parsed = datetime.strptime(date, format)
-        return parsed.replace(tzinfo=tz) if tz_override or not parsed.tzinfo else parsed
+        parsed = date_parser(format)(date)
+        return localize(parsed, tz) if tz_override or not parsed.tzinfo else parsed
     except Exception as e:
         ToolboxWarning(
             f"Error converting date={date}, format={format}, default={default} [{e}]"
@@ -91,8 +260,61 @@ def to_date(
         return utc_now() if default == "utc" else default
 
 
-def to_str(date: datetime, format: str = DATE_FORMAT) -> Union[str, None]:
+def to_dates(
+    dates: Iterable[Union[datetime, str]],
+    format: Optional[str] = None,
+    default: Union[str, datetime] = "utc",
+    tz: pytz.BaseTzInfo = pytz.utc,
+    tz_override: bool = False,
+    epoch: Optional[str] = None,
+) -> Union[List[datetime], array]:
+    """Parse many dates with one compiled parser, like to_date applied to each.
+
+    epoch="s"|"ms"|"us"|"ns" returns an array('q') of integer epochs instead of
+    datetimes, so default must then be "utc" or a datetime. Unparseable items
+    get default; one warning reports how many.
+    """
+    format = format or utils.DATE_FORMAT
+    if epoch is not None:
+        if epoch not in _EPOCH_UNITS and epoch != "ns":
+            raise ToolboxError(f"Unknown epoch unit={epoch}, use s, ms, us or ns")
+        if default != "utc" and not is_date(default):
+            raise ToolboxError(
+                f"epoch={epoch} needs a datetime default, not {default!r}"
+            )
+    parse = date_parser(format)
+    attach = _attacher(get_tz(tz))
+    fallback = None
+    failed, first_error = 0, None
+    parsed = []
+    for date in dates:
+        if not is_date(date):
+            try:
+                date = parse(date)
+            except Exception as e:
+                failed += 1
+                first_error = first_error or f"date={date} [{e}]"
+                if fallback is None:
+                    fallback = utc_now() if default == "utc" else default
+                date = fallback
+        if is_date(date) and (tz_override or not date.tzinfo):
+            date = attach(date)
+        parsed.append(date)
+    if failed:
+        ToolboxWarning(
+            f"Error converting {failed} dates, format={format}, default={default}, "
+            f"first {first_error}"
+        )
+    if epoch is None:
+        return parsed
+    unit = _EPOCH_UNITS.get(epoch, _EPOCH_UNITS["us"])
+    scale = 1000 if epoch == "ns" else 1
+    return array("q", [(date - _EPOCH) // unit * scale for date in parsed])
+
+
+def to_str(date: datetime, format: Optional[str] = None) -> Union[str, None]:
     """Format a datetime as a string, raising ToolboxError on failure."""
+    format = format or utils.DATE_FORMAT
     try:
         return date.strftime(format)
     except Exception as e:
@@ -101,15 +323,16 @@ def to_str(date: datetime, format: str = DATE_FORMAT) -> Union[str, None]:
 
 def to_utc_date(
     date: Union[datetime, str],
-    format: str = DATE_FORMAT,
+    format: Optional[str] = None,
     default: Union[str, datetime] = "utc",
 ) -> datetime:
     """Parse date and force its timezone to UTC."""
     return to_date(date, format=format, default=default, tz=pytz.utc, tz_override=True)
 
 
-def to_utc_str(date: datetime, format: str = DATE_FORMAT) -> Union[str, None]:
+def to_utc_str(date: datetime, format: Optional[str] = None) -> Union[str, None]:
     """Replace date's timezone with UTC and return it as a formatted string."""
+    format = format or utils.DATE_FORMAT
     try:
         date = date.replace(tzinfo=pytz.utc)
         return date.strftime(format)
@@ -117,7 +340,7 @@ def to_utc_str(date: datetime, format: str = DATE_FORMAT) -> Union[str, None]:
         raise ToolboxError(f"Error converting date={date}, format={format} [{e}]")
 
 
-def to_timestamp(date: Union[datetime, str], format: str = DATE_FORMAT) -> int:
+def to_timestamp(date: Union[datetime, str], format: Optional[str] = None) -> int:
     """Convert a date or date string to a Unix timestamp integer."""
     date = to_date(date, format=format)
     return int(date.timestamp())
@@ -134,7 +357,7 @@ def timestamp_to_date(timestamp: int, tz: pytz.BaseTzInfo = pytz.utc) -> datetim
 def time_delta(
     start: Union[datetime, str],
     end: Optional[Union[datetime, str]] = None,
-    format: str = DATE_FORMAT,
+    format: Optional[str] = None,
 ) -> float:
     """Return the absolute difference in seconds between start and end (default=now)."""
     try:
@@ -155,7 +378,7 @@ def round_date(
     date: Union[datetime, str],
     mins: int = 5,
     ceil: bool = False,
-    format: str = DATE_FORMAT,
+    format: Optional[str] = None,
 ) -> datetime:
     """Round date down (up when ceil=True) to the nearest multiple of mins minutes."""
     try:
@@ -173,7 +396,7 @@ def round_date(
 
 
 def round_to_last_min(
-    date: Union[datetime, str], format: str = DATE_FORMAT
+    date: Union[datetime, str], format: Optional[str] = None
 ) -> datetime:
     """Truncate date to the start of the preceding minute."""
     parsed = to_date(date, format=format)
@@ -184,7 +407,7 @@ def round_to_last_min(
 def delta_days(
     start: Union[datetime, str],
     end: Optional[Union[datetime, str]] = None,
-    format: str = DATE_FORMAT,
+    format: Optional[str] = None,
 ) -> Union[int, None]:
     """Return the number of calendar days between start and end (defaults to now)."""
     try:
@@ -199,32 +422,148 @@ def delta_days(
         )
 
 
-def fill_days(
+_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+_US = timedelta(microseconds=1)
+
+
+class DateRange(Sequence):
+    """Lazy, evenly spaced datetimes: start + i * step for i in range(count).
+
+    Items are computed on access, so len, indexing, slicing and `in` are O(1)
+    and nothing is materialized until iterated. timestamps() exports epochs
+    to an array('q') arithmetically, without building datetimes, when start
+    has a fixed offset (UTC, timezone, pytz).
+    """
+
+    __slots__ = ("start", "step", "size")
+
+    def __init__(self, start: datetime, step: timedelta, count: int):
+        if not step:
+            raise ToolboxError("DateRange step must be non-zero")
+        self.start = start
+        self.step = step
+        self.size = max(count, 0)
+
+    @classmethod
+    def between(cls, start: datetime, end: datetime, step: timedelta) -> "DateRange":
+        """Return the range from start stepping towards end, end included."""
+        span = end - start
+        count = span // step + 1 if span / step >= 0 else 0
+        return cls(start, step, count)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[datetime, "DateRange"]:
+        if isinstance(index, slice):
+            first, stop, stride = index.indices(self.size)
+            count = len(range(first, stop, stride))
+            start = self.start + self.step * first if count else self.start
+            return DateRange(start, self.step * stride, count)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("DateRange index out of range")
+        return self.start + self.step * index
+
+    def __iter__(self) -> Iterator[datetime]:
+        current, step = self.start, self.step
+        for _ in range(self.size):
+            yield current
+            current += step
+
+    def __reversed__(self) -> Iterator[datetime]:
+        return iter(self[::-1])
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, datetime):
+            return False
+        try:
+            index, remainder = divmod(item - self.start, self.step)
+        except TypeError:  # naive vs aware
+            return False
+        return not remainder and 0 <= index < self.size
+
+    def index(self, item: object, start: int = 0, stop: Optional[int] = None) -> int:
+        if item in self:
+            index = (item - self.start) // self.step
+            if start <= index < (self.size if stop is None else stop):
+                return index
+        raise ValueError(f"{item} is not in range")
+
+    def count(self, item: object) -> int:
+        return int(item in self)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DateRange):
+            return NotImplemented
+        if self.size != other.size:
+            return False
+        if self.size <= 1:
+            return self.size == 0 or self.start == other.start
+        return self.start == other.start and self.step == other.step
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"DateRange(start={self.start!r}, step={self.step!r}, count={self.size})"
+
+    def timestamps(self, unit: str = "s") -> array:
+        """Return every item as an epoch int in s, ms, us or ns in an array('q').
+
+        Naive starts are read as local time, like datetime.timestamp().
+        """
+        div = 1 if unit == "ns" else _NS_PER[unit] // 1000
+        if not isinstance(self.start.tzinfo, (timezone, pytz.BaseTzInfo)):
+            # items are wall-clock times, so in zoneinfo/dateutil zones (and local
+            # time) the offset shifts across DST: convert each item
+            deltas = ((d if d.tzinfo else d.astimezone()) - _EPOCH for d in self)
+            if unit == "ns":
+                return array("q", [d // _US * 1000 for d in deltas])
+            return array("q", [d // _US // div for d in deltas])
+        # UTC, fixed offsets and pytz zones keep one offset: pure arithmetic
+        first, step = (self.start - _EPOCH) // _US, self.step // _US
+        if unit == "ns":
+            first, step = first * 1000, step * 1000
+        if step % div:
+            return array("q", [(first + i * step) // div for i in range(self.size)])
+        first = first // div
+        step = step // div
+        return array("q", range(first, first + step * self.size, step))
+
+
+def date_range(
     start: Union[datetime, str],
     end: Optional[Union[datetime, str]] = None,
     mins: int = 10,
-    format: str = DATE_FORMAT,
-) -> List[datetime]:
-    """Return a list of datetimes at mins-minute intervals from start to end."""
-    intervals = []
+    format: Optional[str] = None,
+) -> DateRange:
+    """Return the lazy DateRange that fill_days would list, from start to end."""
     try:
         end = end or utc_now()
-        start = round_date(start, mins=mins)
-        end = round_date(end, mins=mins, ceil=True)
+        start = round_date(start, mins=mins, format=format)
+        end = round_date(end, mins=mins, ceil=True, format=format)
         debug(start, lvl=3)
         debug(end, lvl=3)
-        current_date = start
-        while current_date <= end:
-            intervals.append(current_date)
-            current_date += timedelta(minutes=mins)
-        debug(intervals, lvl=3)
-        return intervals
+        return DateRange.between(start, end, timedelta(minutes=mins))
     except Exception as e:
         raise ToolboxError(
             f"Error filling days: start={start}, end={end}, format={format} [{e}]"
         )
 
 
+def fill_days(
+    start: Union[datetime, str],
+    end: Optional[Union[datetime, str]] = None,
+    mins: int = 10,
+    format: Optional[str] = None,
+) -> List[datetime]:
+    """Return a list of datetimes at mins-minute intervals from start to end."""
+    intervals = list(date_range(start, end, mins=mins, format=format))
+    debug(intervals, lvl=3)
+    return intervals
+
+
 def date_days_ago(
     days: Union[int, None] = None, now: Optional[datetime] = None
 ) -> datetime:
@@ -239,6 +578,17 @@ def date_days_ago(
     return now - timedelta(days=days)
 
 
+def day_range(
+    start: Union[datetime, str],
+    end: Optional[Union[datetime, str]] = None,
+    format: str = "%Y-%m-%d",
+) -> DateRange:
+    """Return a lazy DateRange stepping one day from start to end (default now)."""
+    start = to_date(start, format=format)
+    end = to_date(end, format=format) if end else utc_now()
+    return DateRange.between(start, end, timedelta(days=1))
+
+
 def dates_between(
     start: Union[datetime, str],
     end: Optional[Union[datetime, str]] = None,
@@ -246,17 +596,11 @@ def dates_between(
     string: bool = True,
 ) -> Tuple[List[Union[str, datetime]], List[int]]:
     """Return (date_list, timestamp_list) for every calendar day from start to end."""
-    start = to_date(start, format=format)
-    end = to_date(end, format=format) if end else utc_now()
-    dates = []
-    intervals = []
-    current = start
-    while current <= end:
-        curr_date = str(current.date())
-        if string:
-            dates.append(curr_date)
-        else:
-            dates.append(current.date())
-        intervals.append(to_timestamp(curr_date, format="%Y-%m-%d"))
-        current += timedelta(days=1)
+    days = day_range(start, end, format=format)
+    first = days.start.toordinal()
+    ordinals = range(first, first + len(days))
+    dates = [datetime.fromordinal(o).date() for o in ordinals]
+    if string:
+        dates = [d.isoformat() for d in dates]
+    intervals = [(o - _EPOCH_ORDINAL) * 86400 for o in ordinals]
     return dates, intervals
@@ -1,6 +1,8 @@
 import os
 import pathlib
-from typing import Any
+import time
+import threading
+from typing import Any, Callable
 from dotenv import find_dotenv, load_dotenv
 from traceback import format_exc
 from toolbox.exceptions import ToolboxError
@@ -11,10 +13,6 @@ def print_env(title: str, var: Any = None):
     print(f"\033[36m[env] \033[96m{title}\033[36m : \033[92m{var}\033[0m")
 
 
-ENV_FILE = find_dotenv()
-print_env("ENV_FILE", ENV_FILE)
-load_dotenv(ENV_FILE, override=True)
-
 _ENV_OVERRIDE_MAP = {
     "DEV": ".env.dev",
     "STAGING": ".env.staging",
@@ -22,32 +20,70 @@ _ENV_OVERRIDE_MAP = {
     "LOCAL": ".env.local",
     "TEST": ".env.test",
 }
-_env_name = os.environ.get("ENV", "").upper()
-_override_filename = _ENV_OVERRIDE_MAP.get(_env_name)
+_env_lock = threading.Lock()
+_env_files: list[str] = []  # .env files loaded by load_env, in load order
+_loaded = False
 
-if _env_name and not _override_filename:
-    print_env(
-        "ENV_OVERRIDE", f"WARNING: unknown ENV value '{_env_name}'; using default .env"
-    )
-elif _override_filename:
-    _base_dir = pathlib.Path(ENV_FILE).parent if ENV_FILE else pathlib.Path.cwd()
-    _override_path = _base_dir / _override_filename
-    if _override_path.exists():
-        load_dotenv(_override_path, override=True)
-        print_env("ENV_OVERRIDE", _override_path)
-    else:
+
+def load_env(reload: bool = False) -> list[str]:
+    """Find and load .env plus the ENV-selected override; return the files loaded.
+
+    Runs once, on the first get_env call (or ENV_FILE/DEBUG access), so importing
+    toolbox never walks the filesystem. reload=True searches and loads again.
+    """
+    global ENV_FILE, DEBUG, _loaded
+    with _env_lock:
+        if _loaded and not reload:
+            return _env_files
+        files = []
+        env_file = find_dotenv()
+        if env_file:
+            load_dotenv(env_file, override=True)
+            files.append(env_file)
+        env_name = os.environ.get("ENV", "").upper()
+        override_filename = _ENV_OVERRIDE_MAP.get(env_name)
+        override_path = None
+        if override_filename:
+            base_dir = pathlib.Path(env_file).parent if env_file else pathlib.Path.cwd()
+            override_path = base_dir / override_filename
+            if override_path.exists():
+                load_dotenv(override_path, override=True)
+                files.append(str(override_path))
+        ENV_FILE, DEBUG = env_file, int(os.environ.get("DEBUG", 0))
+        _env_files[:] = files
+        _loaded = True
+
+    if DEBUG:
+        print_env("ENV_FILE", ENV_FILE)
+    if env_name and not override_filename:
         print_env(
             "ENV_OVERRIDE",
-            f"WARNING: {_override_filename} not found; using default .env",
+            f"WARNING: unknown ENV value '{env_name}'; using default .env",
         )
+    elif override_filename and str(override_path) not in files:
+        print_env(
+            "ENV_OVERRIDE",
+            f"WARNING: {override_filename} not found; using default .env",
+        )
+    elif override_filename and DEBUG:
+        print_env("ENV_OVERRIDE", override_path)
+    return _env_files
 
-DEBUG = int(os.environ.get("DEBUG", 0))
+
+def __getattr__(name: str) -> Any:
+    # ENV_FILE and DEBUG only exist once load_env has run (PEP 562)
+    if name in ("ENV_FILE", "DEBUG"):
+        load_env()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_env(
     key: str, default: Any = None, verbose: int = 0, required: bool = False
 ) -> Any:
     """Read an environment variable, casting it to the same type as default."""
+    if not _loaded:
+        load_env()
     val = os.environ.get(key, default)
 
     if verbose and DEBUG >= verbose:
@@ -77,3 +113,184 @@ def get_env(
             val = float(0)
 
     return val
+
+
+_FALSE = ("false", "0", "none", "null", "")
+
+
+def _cast(raw: str, kind: Callable[[str], Any]) -> Any:
+    """Cast a raw env string like get_env does, but raise instead of using 0."""
+    if kind is bool:
+        return raw.strip().lower() not in _FALSE
+    if kind is int:
+        try:
+            return int(raw)
+        except ValueError:
+            return int(float(raw))
+    return kind(raw)
+
+
+class EnvVar:
+    """Declaration of one env-backed setting for EnvConfig.
+
+    default also sets the cast type (bool/int/float/str) unless cast is given;
+    key is the env var name when it differs from the attribute name.
+    """
+
+    __slots__ = ("default", "cast", "required", "key")
+
+    def __init__(
+        self,
+        default: Any = None,
+        cast: Callable[[str], Any] | None = None,
+        required: bool = False,
+        key: str | None = None,
+    ):
+        self.default = default
+        if cast is None:
+            cast = type(default) if isinstance(default, (int, float)) else str
+        self.cast = cast
+        self.required = required
+        self.key = key
+
+
+class EnvSnapshot:
+    """Immutable set of parsed settings; each EnvConfig makes a slotted subclass."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the settings as a plain dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+class EnvConfig:
+    """Typed settings parsed once from the environment into an EnvSnapshot.
+
+    fields maps attribute names to an EnvVar or a plain default. Every key is
+    read and cast up front and all failures are raised together in one
+    ToolboxError, so reads afterwards are plain attribute lookups on the
+    snapshot (bind cfg.snapshot to a local in hot loops). reload() re-reads the
+    .env files and the environment and swaps in a new snapshot in one assignment;
+    if validation fails the current snapshot is kept. With watch=True the .env
+    mtimes are checked at most every interval seconds on snapshot access and a
+    change triggers reload(); a failed reload is printed and retried at the
+    next check. Field names must not clash with EnvConfig's own attributes.
+    """
+
+    __slots__ = (
+        "fields",
+        "watch",
+        "interval",
+        "_type",
+        "_snapshot",
+        "_mtimes",
+        "_next_check",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        fields: dict[str, Any],
+        watch: bool = False,
+        interval: float = 1.0,
+        name: str = "EnvSnapshot",
+    ):
+        reserved = set(dir(EnvConfig))  # would shadow cfg.fields, cfg.reload, ...
+        bad = [
+            k
+            for k in fields
+            if not k.isidentifier() or k.startswith("_") or k in reserved
+        ]
+        if bad:
+            raise ToolboxError(f"Invalid EnvConfig field names: {', '.join(bad)}")
+        self.fields = {
+            k: v if isinstance(v, EnvVar) else EnvVar(v) for k, v in fields.items()
+        }
+        self.watch = watch
+        self.interval = interval
+        self._type = type(name, (EnvSnapshot,), {"__slots__": tuple(self.fields)})
+        self._lock = threading.Lock()
+        if not _loaded:
+            load_env()
+        self._mtimes = self._env_mtimes()
+        self._next_check = time.monotonic() + interval
+        self._snapshot = self._parse()
+
+    def _parse(self) -> EnvSnapshot:
+        values, errors = {}, []
+        for name, var in self.fields.items():
+            key = var.key or name
+            raw = os.environ.get(key)
+            if raw is None:
+                if var.required:
+                    errors.append(f"{key} is required but not set")
+                values[name] = var.default
+                continue
+            try:
+                values[name] = _cast(raw, var.cast)
+            except Exception as e:
+                cast = getattr(var.cast, "__name__", var.cast)
+                errors.append(f"{key}={raw!r} is not a valid {cast} [{e}]")
+        if errors:
+            raise ToolboxError(f"Invalid environment: {'; '.join(errors)}")
+        snapshot = object.__new__(self._type)
+        for name, value in values.items():
+            object.__setattr__(snapshot, name, value)
+        return snapshot
+
+    @staticmethod
+    def _env_mtimes() -> dict[str, int | None]:
+        mtimes = {}
+        for path in _env_files:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    @property
+    def snapshot(self) -> EnvSnapshot:
+        """Current snapshot; with watch=True, reloads first if a .env file changed."""
+        if self.watch and time.monotonic() >= self._next_check:
+            try:
+                self.reload_if_changed()
+            except ToolboxError as e:
+                print_env("RELOAD", f"WARNING: {e}; keeping the last good settings")
+        return self._snapshot
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.snapshot, name)
+
+    def reload(self, env_files: bool = True) -> EnvSnapshot:
+        """Re-parse the environment (re-loading .env first unless env_files=False)."""
+        with self._lock:
+            if env_files:
+                load_env(reload=True)
+            mtimes = self._env_mtimes()
+            snapshot = self._parse()
+            # only after a good parse, so a broken .env is retried once fixed
+            self._mtimes = mtimes
+            self._next_check = time.monotonic() + self.interval
+            self._snapshot = snapshot
+            return snapshot
+
+    def reload_if_changed(self) -> bool:
+        """Reload if a loaded .env file changed since the last load; True if so."""
+        self._next_check = time.monotonic() + self.interval
+        if self._env_mtimes() == self._mtimes:
+            return False
+        self.reload()
+        return True
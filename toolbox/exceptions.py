@@ -3,10 +3,18 @@ import sys
 import inspect
 import traceback
 
-sys.excepthook = lambda exc_type, exc_value, exc_tb: print(
-    f"\033[33m🔍 {''.join(traceback.format_exception(exc_type, exc_value, exc_tb))}"
-    f"\033[0m\033[40m"
-)
+
+def excepthook(exc_type, exc_value, exc_tb) -> None:
+    """Print an uncaught exception in yellow with its full traceback."""
+    print(
+        f"\033[33m🔍 {''.join(traceback.format_exception(exc_type, exc_value, exc_tb))}"
+        f"\033[0m\033[40m"
+    )
+
+
+def install_excepthook() -> None:
+    """Install excepthook as sys.excepthook; opt-in, importing toolbox never does."""
+    sys.excepthook = excepthook
 
 
 def emit_exc(txt: str, lbl: str, col: str) -> None:
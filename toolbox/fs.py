@@ -1,8 +1,19 @@
+import os
 import re
 import sys
+import json
+import time
+import errno
+import asyncio
+import threading
 import shutil
+from stat import S_ISREG
 from pathlib import Path
+from fnmatch import translate
+from typing import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from toolbox.utils import warn
+from toolbox.hash import hash_file
 from toolbox.exceptions import ToolboxError
 
 
@@ -14,6 +25,11 @@ def basedir() -> Path | None:
         raise ToolboxError(f"Error getting basedir: {e}")
 
 
+def _base(base: Path | str | None) -> Path | str:
+    """Return base, or the running script's directory when base is None."""
+    return basedir() if base is None else base
+
+
 def os_path(path: str) -> str:
     """Normalize a path string using the OS-native separator."""
     return str(Path(path))
@@ -29,19 +45,19 @@ def slash_win(path: str) -> str:
     return path.replace("/", "\\")
 
 
-def strip_basedir(path: str, basedir: Path | str = basedir()) -> str:
+def strip_basedir(path: str, basedir: Path | str | None = None) -> str:
     """Remove the basedir prefix from a path, returning the relative remainder."""
-    base = str(basedir)
+    base = str(_base(basedir))
     if path.startswith(base):
         return path.replace(base, "").lstrip("/\\")
     return path
 
 
-def build_path(paths: list[str] | str, basedir: Path | str = basedir()) -> str:
+def build_path(paths: list[str] | str, basedir: Path | str | None = None) -> str:
     """Join one or more path segments onto basedir and return the result."""
     if not isinstance(paths, list):
         paths = [paths]
-    return str(Path(basedir).joinpath(*paths))
+    return str(Path(_base(basedir)).joinpath(*paths))
 
 
 def path_exists(path: Path | str) -> bool:
@@ -124,13 +140,13 @@ def sanitize_path(path: str, sub: str = "_") -> str:
 
 
 def dissect_path(
-    path: str, basedir: Path | str = basedir()
+    path: str, basedir: Path | str | None = None
 ) -> dict[str, str | list[str] | None]:
     """Break a path into components: base, dirs, file, name, and ext."""
     try:
         p = Path(path)
         parent = p.parent
-        base_path = Path(basedir)
+        base_path = Path(_base(basedir))
         v: dict[str, str | list[str] | None] = {}
         if parent.is_relative_to(base_path):
             v["base"] = str(base_path)
@@ -200,3 +216,855 @@ def copy_move(src: str, dst: str, no_move: bool = False, retries: int = 3) -> bo
     if no_move:
         return copy(src, dst, retries=retries)
     return move(src, dst, retries=retries)
+
+
+_KERNEL_CHUNK = 1 << 30
+_NO_KERNEL_COPY = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+def _kernel_copy(src: str, dst: str) -> str:
+    """Copy file data in the kernel when possible; return the method used."""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        # opening dst "wb" would truncate src before a single byte is read
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for method in ("copy_file_range", "sendfile"):
+            if not hasattr(os, method):
+                continue
+            try:
+                while True:
+                    if method == "copy_file_range":
+                        sent = os.copy_file_range(infd, outfd, _KERNEL_CHUNK)
+                    else:
+                        sent = os.sendfile(outfd, infd, None, _KERNEL_CHUNK)
+                    if not sent:
+                        return method
+            except OSError as e:
+                if e.errno not in _NO_KERNEL_COPY:
+                    raise
+        shutil.copyfileobj(fsrc, fdst, 1 << 20)
+        return "copy"
+
+
+def _copy_file(src: str, dst: str) -> str:
+    method = _kernel_copy(src, dst)
+    shutil.copymode(src, dst)
+    return method
+
+
+def _move_file(src: str, dst: str) -> str:
+    try:
+        os.replace(src, dst)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if os.path.isdir(src):
+        shutil.move(src, dst)
+        return "move"
+    method = _kernel_copy(src, dst)
+    shutil.copystat(src, dst)
+    os.unlink(src)
+    return method
+
+
+class TransferResult:
+    """Outcome of one file in a copy_many/move_many batch."""
+
+    __slots__ = ("src", "dst", "ok", "size", "attempts", "method", "error")
+
+    def __init__(self, src: str, dst: str):
+        self.src = src
+        self.dst = dst
+        self.ok = False
+        self.size = 0
+        self.attempts = 0
+        self.method: str | None = None
+        self.error: str | None = None
+
+    def __repr__(self) -> str:
+        status = self.method if self.ok else f"failed: {self.error}"
+        return f"TransferResult({self.src} -> {self.dst}, {status})"
+
+
+class TransferReport:
+    """Per-file results plus totals and throughput for a batch transfer."""
+
+    __slots__ = ("results", "seconds")
+
+    def __init__(self, results: list[TransferResult], seconds: float):
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> int:
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def failed(self) -> list[TransferResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def bytes(self) -> int:
+        return sum(r.size for r in self.results if r.ok)
+
+    @property
+    def files_per_s(self) -> float:
+        return self.ok / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> dict:
+        """Return totals and throughput as a plain dict."""
+        methods: dict[str, int] = {}
+        for r in self.results:
+            if r.ok:
+                methods[r.method] = methods.get(r.method, 0) + 1
+        return {
+            "files": len(self.results),
+            "ok": self.ok,
+            "failed": len(self.results) - self.ok,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "files_per_s": round(self.files_per_s, 1),
+            "mb_per_s": round(self.mb_per_s, 1),
+            "methods": methods,
+        }
+
+    def __repr__(self) -> str:
+        return f"TransferReport({self.summary()})"
+
+
+def _transfer_many(
+    pairs: Iterable[tuple[str, str]] | dict[str, str],
+    op: Callable[[str, str], str],
+    workers: int,
+    retries: int,
+    backoff: float,
+) -> TransferReport:
+    started = time.perf_counter()
+    pairs = list(pairs.items() if isinstance(pairs, dict) else pairs)
+    for parent in sorted({os.path.dirname(os.path.abspath(dst)) for _, dst in pairs}):
+        try:
+            os.makedirs(parent, exist_ok=True)
+        except OSError:
+            pass  # reported per file below
+
+    def run(pair: tuple[str, str]) -> TransferResult:
+        src, dst = str(pair[0]), str(pair[1])
+        result = TransferResult(src, dst)
+        for attempt in range(retries):
+            result.attempts = attempt + 1
+            try:
+                size = os.stat(src).st_size
+                result.method = op(src, dst)
+                result.size, result.ok, result.error = size, True, None
+                return result
+            except shutil.SameFileError as e:
+                result.error = f"{type(e).__name__}: {e}"
+                break  # retrying can't help
+            except FileNotFoundError as e:
+                result.error = f"{type(e).__name__}: {e}"
+                if not os.path.lexists(src):
+                    break  # nothing to retry for
+            except OSError as e:
+                result.error = f"{type(e).__name__}: {e}"
+            if attempt + 1 < retries:
+                time.sleep(backoff * 2**attempt)
+        warn(f"Failed after {result.attempts} tries: {src} to {dst} [{result.error}]")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(run, pairs))
+    return TransferReport(results, time.perf_counter() - started)
+
+
+def copy_many(
+    pairs: Iterable[tuple[str, str]] | dict[str, str],
+    workers: int = 8,
+    retries: int = 3,
+    backoff: float = 0.1,
+) -> TransferReport:
+    """Copy many (src, dst) file pairs on a thread pool and report per-file results.
+
+    Destination directories are created once up front. Data is copied in the
+    kernel (copy_file_range, then sendfile) when available and mode bits are
+    kept like shutil.copy. Failures retry with exponential backoff.
+    """
+    return _transfer_many(pairs, _copy_file, workers, retries, backoff)
+
+
+def move_many(
+    pairs: Iterable[tuple[str, str]] | dict[str, str],
+    workers: int = 8,
+    retries: int = 3,
+    backoff: float = 0.1,
+) -> TransferReport:
+    """Move many (src, dst) pairs on a thread pool and report per-file results.
+
+    Same-filesystem moves are atomic renames; across filesystems the file is
+    copied in the kernel, its metadata kept, and the source removed.
+    """
+    return _transfer_many(pairs, _move_file, workers, retries, backoff)
+
+
+Patterns = str | re.Pattern | Iterable[str | re.Pattern] | None
+
+
+class ScanEntry:
+    """A path yielded by scan(), with type and stat info read once."""
+
+    __slots__ = (
+        "path",
+        "name",
+        "rel",
+        "depth",
+        "is_dir",
+        "is_file",
+        "is_symlink",
+        "inode",
+        "size",
+        "mtime_ns",
+    )
+
+    def __init__(
+        self,
+        entry: os.DirEntry,
+        rel: str,
+        depth: int,
+        is_dir: bool,
+        is_file: bool,
+        follow_symlinks: bool,
+        with_stat: bool,
+    ):
+        self.path = entry.path
+        self.name = entry.name
+        self.rel = rel
+        self.depth = depth
+        self.is_dir = is_dir
+        self.is_file = is_file
+        self.is_symlink = entry.is_symlink()
+        self.inode = entry.inode()
+        self.size: int | None = None
+        self.mtime_ns: int | None = None
+        if with_stat:
+            try:
+                # a symlink reported as a file describes the file it points to
+                st = entry.stat(follow_symlinks=follow_symlinks or is_file)
+            except OSError:  # dangling symlink
+                st = entry.stat(follow_symlinks=False)
+            self.size, self.mtime_ns = st.st_size, st.st_mtime_ns
+
+    @property
+    def kind(self) -> str:
+        """ "dir", "file", "symlink" (dangling or not followed) or "special"."""
+        if self.is_dir:
+            return "dir"
+        if self.is_file:
+            return "file"
+        return "symlink" if self.is_symlink else "special"
+
+    @property
+    def mtime(self) -> float | None:
+        return None if self.mtime_ns is None else self.mtime_ns / 1e9
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"ScanEntry({self.rel!r}, {self.kind}, size={self.size})"
+
+
+def _compile_filters(patterns: Patterns) -> Callable[[str, str], bool] | None:
+    """Fuse globs and regexes into one matcher over (name, rel path), or None.
+
+    Globs without a slash match the entry name, others the relative path;
+    compiled regexes are searched in the relative path.
+    """
+    if patterns is None:
+        return None
+    if isinstance(patterns, (str, re.Pattern)):
+        patterns = [patterns]
+    names, paths, regexes = [], [], []
+    for pattern in patterns:
+        if isinstance(pattern, re.Pattern):
+            regexes.append(pattern.pattern)
+        elif "/" in pattern:
+            paths.append(translate(pattern))
+        else:
+            names.append(translate(pattern))
+    fused = [
+        re.compile("|".join(f"(?:{p})" for p in group)) if group else None
+        for group in (names, paths, regexes)
+    ]
+    name_re, path_re, search_re = fused
+
+    def match(name: str, rel: str) -> bool:
+        return bool(
+            (name_re and name_re.match(name))
+            or (path_re and path_re.match(rel))
+            or (search_re and search_re.search(rel))
+        )
+
+    return match
+
+
+def scan(
+    path: Path | str,
+    include: Patterns = None,
+    exclude: Patterns = None,
+    max_depth: int | None = None,
+    follow_symlinks: bool = False,
+    files: bool = True,
+    dirs: bool = False,
+    stat: bool = True,
+    workers: int = 1,
+    onerror: Callable[[OSError], None] | None = None,
+    special: bool = False,
+) -> Iterator[ScanEntry]:
+    """Recursively yield ScanEntry items under path using os.scandir.
+
+    Type and stat info come from each DirEntry, so no extra stat per path.
+    include keeps only matching entries; exclude drops entries and prunes
+    excluded directories (globs, or compiled regexes searched in the relative
+    path). max_depth=0 lists only path itself. Symlinked directories are only
+    entered with follow_symlinks=True, with loop protection. workers > 1 lists
+    subtrees on a thread pool (useful on network filesystems); order is then
+    not deterministic. files yields regular files (and symlinks to them, with
+    the target's size and mtime); special=True also yields everything else:
+    FIFOs, sockets, devices, and dangling or unfollowed directory symlinks.
+    Unreadable directories, and entries that vanish or fail to stat mid-scan,
+    are skipped on their own (passed to onerror) without losing the rest of
+    the directory.
+    """
+    include_match = _compile_filters(include)
+    exclude_match = _compile_filters(exclude)
+
+    def dir_key(st: os.stat_result) -> tuple[int, int]:
+        return st.st_dev, st.st_ino
+
+    def list_entry(entry: os.DirEntry, rel: str, depth: int, ancestors, out):
+        name = entry.name
+        entry_rel = f"{rel}/{name}" if rel else name
+        if exclude_match and exclude_match(name, entry_rel):
+            return
+        is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+        is_file = not is_dir and entry.is_file()
+        if is_dir and (max_depth is None or depth < max_depth):
+            if not follow_symlinks:
+                out[1].append((entry.path, entry_rel, depth + 1, ancestors))
+            else:  # don't re-enter a directory we are already inside
+                key = dir_key(entry.stat())
+                if key not in ancestors:
+                    sub = (entry.path, entry_rel, depth + 1, ancestors | {key})
+                    out[1].append(sub)
+        if not (dirs if is_dir else files if is_file else special):
+            return
+        if include_match and not include_match(name, entry_rel):
+            return
+        out[0].append(
+            ScanEntry(entry, entry_rel, depth, is_dir, is_file, follow_symlinks, stat)
+        )
+
+    def list_one(dirpath: str, rel: str, depth: int, ancestors: frozenset):
+        out: tuple[list, list] = ([], [])
+        try:
+            it = os.scandir(dirpath)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            return out
+        with it:
+            while True:
+                try:
+                    entry = next(it)
+                except StopIteration:
+                    break
+                except OSError as e:  # the directory itself failed mid-read
+                    if onerror is not None:
+                        onerror(e)
+                    break
+                try:
+                    list_entry(entry, rel, depth, ancestors, out)
+                except OSError as e:  # e.g. removed between readdir and stat
+                    if onerror is not None:
+                        onerror(e)
+        return out
+
+    root = os.fspath(path)
+    top = frozenset([dir_key(os.stat(root))]) if follow_symlinks else frozenset()
+    if workers <= 1:
+        stack = [(root, "", 0, top)]
+        while stack:
+            entries, subdirs = list_one(*stack.pop())
+            yield from entries
+            stack.extend(reversed(subdirs))
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(list_one, root, "", 0, top)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entries, subdirs = future.result()
+                pending.update(pool.submit(list_one, *sub) for sub in subdirs)
+                yield from entries
+
+
+SYNC_MANIFEST = ".toolbox_sync.json"
+
+
+def _sync_copy(src: str, dst: str) -> str:
+    """Copy via a temp file renamed into place, keeping mtime for later compares."""
+    tmp = f"{dst}.~sync"
+    try:
+        method = _kernel_copy(src, tmp)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+    return method
+
+
+def _load_manifest(path: str, src: str) -> dict[str, list]:
+    """Return the manifest's file records, or {} if it was written for another src."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("files", {}) if data.get("src") == src else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, AttributeError) as e:
+        warn(f"Ignoring unreadable sync manifest: {path} [{e}]")
+        return {}
+
+
+def _save_manifest(path: str, src: str, files: dict[str, list]) -> None:
+    tmp = f"{path}.~sync"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "src": src, "files": files}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _extraneous(
+    dst: str,
+    skip: list[str],
+    include: Patterns,
+    exclude: list,
+    src_files: set[str],
+    src_dirs: set[str],
+) -> list[ScanEntry]:
+    """Return the dst entries sync(delete=True) removes, outermost first.
+
+    Like rsync, entries filtered out by include/exclude are outside the sync
+    and never deleted, and neither is any directory still holding something
+    that stays; a directory is only listed (and removed whole) when nothing
+    under it survives.
+    """
+    include_match = _compile_filters(include)
+    exclude_match = _compile_filters(exclude)
+    excluded_dirs, keep, candidates = set(), set(), []
+    # single-threaded scan yields a directory before anything inside it
+    for entry in scan(dst, exclude=skip, dirs=True, stat=False, special=True):
+        rel = entry.rel
+        parent = rel.rpartition("/")[0]
+        if parent in excluded_dirs or (
+            exclude_match and exclude_match(entry.name, rel)
+        ):
+            if entry.is_dir:
+                excluded_dirs.add(rel)
+            survives = True
+        elif entry.is_dir:
+            survives = rel in src_dirs
+        else:
+            survives = rel in src_files or bool(
+                include_match and not include_match(entry.name, rel)
+            )
+        if not survives:
+            candidates.append(entry)
+            continue
+        while parent and parent not in keep:
+            keep.add(parent)
+            parent = parent.rpartition("/")[0]
+
+    extraneous, gone = [], set()
+    for entry in candidates:
+        rel = entry.rel
+        if entry.is_dir and rel in keep:
+            continue
+        parts = rel.split("/")
+        if any("/".join(parts[:i]) in gone for i in range(1, len(parts))):
+            continue  # inside a directory that is removed as a whole
+        if entry.is_dir:
+            gone.add(rel)
+        extraneous.append(entry)
+    return extraneous
+
+
+class SyncReport:
+    """What sync() did (or would do with dry_run=True), by relative path."""
+
+    __slots__ = (
+        "created",
+        "updated",
+        "unchanged",
+        "deleted",
+        "skipped",
+        "failed",
+        "transfer",
+        "dry_run",
+        "seconds",
+    )
+
+    def __init__(self, dry_run: bool):
+        self.created: list[str] = []
+        self.updated: list[str] = []
+        self.unchanged = 0
+        self.deleted: list[str] = []
+        self.skipped: list[str] = []
+        self.failed: list[TransferResult] = []
+        self.transfer: TransferReport | None = None
+        self.dry_run = dry_run
+        self.seconds = 0.0
+
+    def summary(self) -> dict:
+        """Return counts, plus copy throughput when files were transferred."""
+        summary = {
+            "dry_run": self.dry_run,
+            "created": len(self.created),
+            "updated": len(self.updated),
+            "unchanged": self.unchanged,
+            "deleted": len(self.deleted),
+            "skipped": len(self.skipped),
+            "failed": len(self.failed),
+            "seconds": round(self.seconds, 3),
+        }
+        if self.transfer is not None:
+            summary["bytes"] = self.transfer.bytes
+            summary["mb_per_s"] = round(self.transfer.mb_per_s, 1)
+        return summary
+
+    def __repr__(self) -> str:
+        return f"SyncReport({self.summary()})"
+
+
+def sync(
+    src: Path | str,
+    dst: Path | str,
+    checksum: bool = False,
+    delete: bool = False,
+    dry_run: bool = False,
+    manifest: Path | str | bool = True,
+    include: Patterns = None,
+    exclude: Patterns = None,
+    workers: int = 8,
+    retries: int = 3,
+    verify: bool = False,
+) -> SyncReport:
+    """Mirror src into dst, copying only new or changed files (rsync-like).
+
+    Files match when size and mtime agree; with checksum=True a mismatch is
+    double-checked by SHA-256 (toolbox.hash) before copying. A manifest of what
+    dst holds (default dst/.toolbox_sync.json, False to disable) lets later
+    runs skip stat-ing and hashing dst for files whose src size and mtime match
+    their record; verify=True stats dst anyway and drops records for files
+    changed or removed there since. Copies run in parallel through a temp
+    file and keep mtimes. Symlinks and special files in src are not copied
+    and are listed in report.skipped (and kept in dst by delete=True).
+    delete=True removes dst entries missing from src; dry_run=True only reports.
+    """
+    started = time.perf_counter()
+    src, dst = os.fspath(src), os.fspath(dst)
+    if not os.path.isdir(src):
+        raise ToolboxError(f"Sync source is not a directory: {src}")
+    report = SyncReport(dry_run)
+    if manifest is True:
+        manifest_path = os.path.join(dst, SYNC_MANIFEST)
+    else:
+        manifest_path = os.fspath(manifest) if manifest else None
+    src_abs = os.path.abspath(src)
+    known = _load_manifest(manifest_path, src_abs) if manifest_path else {}
+    skip = [SYNC_MANIFEST, "*.~sync"]
+    exclude = [exclude] if isinstance(exclude, (str, re.Pattern)) else exclude
+    user_exclude = list(exclude or ())
+
+    files, src_dirs = {}, set()
+    for entry in scan(
+        src, include=include, exclude=skip + user_exclude, dirs=True, special=True
+    ):
+        if entry.is_dir:
+            src_dirs.add(entry.rel)
+        elif entry.is_file and not entry.is_symlink:
+            files[entry.rel] = entry
+        else:
+            report.skipped.append(entry.rel)
+
+    state: dict[str, list] = {}
+    to_copy, to_hash = [], []
+    for rel, entry in files.items():
+        record = known.get(rel)
+        if (
+            not verify
+            and record
+            and (record[0], record[1]) == (entry.size, entry.mtime_ns)
+        ):
+            state[rel] = record
+            continue
+        try:
+            st = os.stat(os.path.join(dst, rel))
+        except OSError:
+            st = None
+        held = (st.st_size, st.st_mtime_ns) if st and S_ISREG(st.st_mode) else None
+        if record and held != (record[0], record[1]):
+            record = None  # dst changed or vanished since the manifest was written
+        if held == (entry.size, entry.mtime_ns):
+            state[rel] = record or [entry.size, entry.mtime_ns, None]
+        elif checksum and held is not None:
+            to_hash.append((rel, entry, record))
+        else:
+            to_copy.append((rel, st is not None))
+
+    def compare(item: tuple) -> tuple[str, bool, str | None]:
+        rel, entry, record = item
+        digest = hash_file(entry.path, length=64)
+        theirs = record[2] if record else None
+        target = os.path.join(dst, rel)
+        if theirs is None and os.path.isfile(target):
+            if os.path.getsize(target) == entry.size:
+                theirs = hash_file(target, length=64)
+        return rel, digest is not None and digest == theirs, digest
+
+    digests: dict[str, str | None] = {}
+    retime = []  # same content, newer mtime: align dst so plain stat compares match
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for rel, same, digest in pool.map(compare, to_hash):
+            digests[rel] = digest
+            entry = files[rel]
+            if same:
+                state[rel] = [entry.size, entry.mtime_ns, digest]
+                retime.append(entry)
+            else:
+                to_copy.append((rel, True))
+    report.unchanged = len(state)
+    for rel, exists in to_copy:
+        (report.updated if exists else report.created).append(rel)
+
+    extraneous = []
+    if delete:
+        keep = set(files).union(report.skipped)
+        extraneous = _extraneous(dst, skip, include, user_exclude, keep, src_dirs)
+        report.deleted = [e.rel for e in extraneous]
+
+    if not dry_run:
+        for entry in extraneous:
+            try:
+                if entry.is_dir and not entry.is_symlink:
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+            except OSError as e:
+                warn(f"Failed to delete: {entry.path} [{e}]")
+                report.deleted.remove(entry.rel)
+        for entry in retime:
+            try:
+                os.utime(os.path.join(dst, entry.rel), ns=(entry.mtime_ns,) * 2)
+            except OSError:
+                pass  # only speeds up later runs without a manifest
+        for rel in sorted(src_dirs):
+            os.makedirs(os.path.join(dst, rel), exist_ok=True)
+        pairs = [(files[rel].path, os.path.join(dst, rel)) for rel, _ in to_copy]
+        transfer = _transfer_many(pairs, _sync_copy, workers, retries, 0.1)
+        for (rel, _), result in zip(to_copy, transfer.results):
+            if result.ok:
+                entry = files[rel]
+                state[rel] = [entry.size, entry.mtime_ns, digests.get(rel)]
+        report.transfer = transfer
+        report.failed = transfer.failed
+        if manifest_path:
+            os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+            _save_manifest(manifest_path, src_abs, state)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+class FileEvent:
+    """A change seen by Watcher: created, modified, deleted or moved (from src)."""
+
+    __slots__ = ("kind", "path", "src", "size", "mtime_ns")
+
+    def __init__(
+        self,
+        kind: str,
+        path: str,
+        size: int | None = None,
+        mtime_ns: int | None = None,
+        src: str | None = None,
+    ):
+        self.kind = kind
+        self.path = path
+        self.src = src
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self) -> str:
+        moved = f"{self.src} -> " if self.src else ""
+        return f"FileEvent({self.kind}, {moved}{self.path})"
+
+
+class Watcher:
+    """Poll a directory tree for file changes by diffing compact snapshots.
+
+    Each file is tracked as (inode, size, mtime_ns). Directories whose mtime
+    has not changed since they were listed are not listed again; only their
+    known files are stat-ed. A deleted and a created path with the same inode,
+    size and mtime are reported as one move. The poll interval grows by
+    backoff while nothing changes (up to max_interval) and resets on activity.
+    Pure Python polling, so it also works on bind and network mounts.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        interval: float = 1.0,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+        recursive: bool = True,
+        include: Patterns = None,
+        exclude: Patterns = None,
+        initial: bool = False,
+    ):
+        self.root = os.path.abspath(os.fspath(path))
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.recursive = recursive
+        self._include = _compile_filters(include)
+        self._exclude = _compile_filters(exclude)
+        self._delay = interval
+        self._stop = threading.Event()
+        # path -> (inode, size, mtime_ns)
+        self._files: dict[str, tuple[int, int, int]] = {}
+        # dir -> (mtime_ns, listed_at_ns, file names, subdir names)
+        self._dirs: dict[str, tuple[int, int, list[str], list[str]]] = {}
+        if not initial:
+            self._files, self._dirs = self._snapshot()
+
+    def _snapshot(self) -> tuple[dict, dict]:
+        files: dict[str, tuple[int, int, int]] = {}
+        dirs: dict[str, tuple[int, int, list[str], list[str]]] = {}
+        root_len = len(self.root) + 1
+        stack = [self.root]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                st = os.stat(dirpath)
+            except OSError:
+                continue
+            cached = self._dirs.get(dirpath)
+            # trust the cached listing only if it was taken after the dir's
+            # mtime tick ended, so same-tick changes are not missed
+            if (
+                cached
+                and cached[0] == st.st_mtime_ns
+                and cached[1] - cached[0] > 1_000_000_000
+            ):
+                names, subdirs = cached[2], cached[3]
+                for name in names:
+                    file = os.path.join(dirpath, name)
+                    try:
+                        fst = os.stat(file, follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files[file] = (fst.st_ino, fst.st_size, fst.st_mtime_ns)
+                dirs[dirpath] = cached
+            else:
+                listed_at = time.time_ns()
+                names, subdirs = [], []
+                try:
+                    with os.scandir(dirpath) as it:
+                        for entry in it:
+                            rel = entry.path[root_len:].replace(os.sep, "/")
+                            if self._exclude and self._exclude(entry.name, rel):
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                                continue
+                            if self._include and not self._include(entry.name, rel):
+                                continue
+                            try:
+                                fst = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            names.append(entry.name)
+                            files[entry.path] = (
+                                fst.st_ino,
+                                fst.st_size,
+                                fst.st_mtime_ns,
+                            )
+                except OSError:
+                    continue
+                dirs[dirpath] = (st.st_mtime_ns, listed_at, names, subdirs)
+            if self.recursive:
+                stack.extend(os.path.join(dirpath, d) for d in subdirs)
+        return files, dirs
+
+    def poll(self) -> list[FileEvent]:
+        """Take a new snapshot and return the changes since the previous one."""
+        old = self._files
+        new, self._dirs = self._snapshot()
+        self._files = new
+        created = [p for p in new if p not in old]
+        deleted = [p for p in old if p not in new]
+        events = []
+        if created and deleted:
+            gone = {old[p]: p for p in deleted}
+            for path in created[:]:
+                src = gone.pop(new[path], None)
+                if src is not None:
+                    created.remove(path)
+                    deleted.remove(src)
+                    _, size, mtime_ns = new[path]
+                    events.append(FileEvent("moved", path, size, mtime_ns, src=src))
+        for path in created:
+            events.append(FileEvent("created", path, new[path][1], new[path][2]))
+        for path, state in new.items():
+            before = old.get(path)
+            if before is not None and before != state:
+                events.append(FileEvent("modified", path, state[1], state[2]))
+        for path in deleted:
+            events.append(FileEvent("deleted", path))
+        return events
+
+    def _next_delay(self, changed: bool) -> float:
+        if changed:
+            self._delay = self.interval
+        else:
+            self._delay = min(self._delay * self.backoff, self.max_interval)
+        return self._delay
+
+    def stop(self) -> None:
+        """Make iterators finish after their current wait (or before they start)."""
+        self._stop.set()
+
+    def start(self) -> None:
+        """Re-arm the watcher after stop() so it can be iterated again."""
+        self._stop.clear()
+
+    def __iter__(self) -> Iterator[FileEvent]:
+        """Block and yield events as they are found until stop() is called."""
+        while not self._stop.is_set():
+            events = self.poll()
+            yield from events
+            self._stop.wait(self._next_delay(bool(events)))
+
+    async def __aiter__(self) -> AsyncIterator[FileEvent]:
+        """Async counterpart of iteration; snapshots run in a worker thread."""
+        while not self._stop.is_set():
+            events = await asyncio.to_thread(self.poll)
+            for event in events:
+                yield event
+            await asyncio.sleep(self._next_delay(bool(events)))
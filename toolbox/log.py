@@ -6,10 +6,7 @@ from colorlog import ColoredFormatter
 from toolbox.dot_env import get_env
 from traceback import format_exc
 
-LOG_LEVEL = get_env("LOG_LEVEL", 10, verbose=1)  # debug=10, info=20
-
 _utils_log = logging.getLogger("_utils_log")
-_utils_log.setLevel(LOG_LEVEL)
 
 _utils_formatter = ColoredFormatter(
     "%(log_color)s%(message)s",
@@ -27,6 +24,24 @@ _utils_handler.setFormatter(_utils_formatter)
 _utils_log.addHandler(_utils_handler)
 
 
+def _logger() -> logging.Logger:
+    """Return _utils_log, setting its level from LOG_LEVEL on first use."""
+    global LOG_LEVEL
+    if "LOG_LEVEL" not in globals():
+        LOG_LEVEL = get_env("LOG_LEVEL", 10, verbose=1)  # debug=10, info=20
+        _utils_log.setLevel(LOG_LEVEL)
+    return _utils_log
+
+
+def __getattr__(name: str):
+    # LOG_LEVEL is read on first access (PEP 562), so importing toolbox.log
+    # never loads .env files
+    if name == "LOG_LEVEL":
+        _logger()
+        return LOG_LEVEL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def log(
     message: str,
     lvl: str = "info",
@@ -34,6 +49,7 @@ def log(
     traceback: bool = True,
 ):
     """Log message at the given level, tagging it with the caller's file and func."""
+    _logger()
     lvl = lvl.lower()
     cat = f"{category}:" if category else ""
     try:
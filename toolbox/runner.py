@@ -1,55 +1,457 @@
+import os
+import heapq
+import random
+import atexit
 import asyncio
+import inspect
+import functools
+import itertools
 import threading
-from time import time
+import collections
+import contextvars
+import multiprocessing
+import concurrent.futures
+from array import array
+from time import monotonic, perf_counter, perf_counter_ns, time
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
 from toolbox.date import time_now
 from toolbox.utils import printc
 from toolbox.exceptions import ToolboxError, ToolboxWarning
 
+_thread_state = threading.local()
+
+
+class LoopThread:
+    """A long-lived event loop running in a daemon thread.
+
+    Sync code hands it coroutines with submit()/run() (via
+    run_coroutine_threadsafe), so repeated sync-to-async calls reuse one loop and
+    thread, along with anything bound to that loop such as connection pools.
+    """
+
+    def __init__(self, name: str = "toolbox-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks: list[Callable[[], Awaitable[Any]]] = []
+
+    def _run(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        _thread_state.loop_thread = self
+        started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def start(self) -> "LoopThread":
+        """Start the loop thread if it is not already running."""
+        with self._lock:
+            if self.is_running():
+                return self
+            try:
+                self.loop = asyncio.new_event_loop()
+                started = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(started,), name=self.name, daemon=True
+                )
+                self._thread.start()
+                started.wait()
+            except Exception as e:
+                raise ToolboxError(f"Failed to start loop thread: {e}")
+        return self
+
+    def is_running(self) -> bool:
+        """Return True if the loop thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule coro on the loop and return a concurrent.futures.Future."""
+        if not self.is_running():
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coro on the loop and block for its result, cancelling it on timeout."""
+        if current_loop_thread() is self:
+            coro.close()
+            raise ToolboxError("Cannot block on the loop thread from inside itself")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def on_shutdown(self, hook: Callable[[], Awaitable[Any]]) -> None:
+        """Register a coroutine function awaited on the loop during shutdown()."""
+        self._shutdown_hooks.append(hook)
+
+    async def _drain(self) -> None:
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                await hook()
+            except Exception as e:
+                ToolboxWarning(f"Loop thread shutdown hook failed: {hook} [{e}]")
+        self._shutdown_hooks.clear()
+        current = asyncio.current_task()
+        pending = [t for t in asyncio.all_tasks() if t is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def shutdown(self, timeout: Optional[float] = 5) -> None:
+        """Run shutdown hooks, cancel pending tasks, stop the loop and join."""
+        with self._lock:
+            if not self.is_running():
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result(
+                    timeout
+                )
+            except Exception as e:
+                ToolboxWarning(f"Loop thread did not drain cleanly [{e}]")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_loop_thread: Optional[LoopThread] = None
+_loop_thread_lock = threading.Lock()
+
+
+def get_loop_thread() -> LoopThread:
+    """Return the process-wide LoopThread, starting it on first use."""
+    global _loop_thread
+    if _loop_thread is None or not _loop_thread.is_running():
+        with _loop_thread_lock:
+            if _loop_thread is None:
+                _loop_thread = LoopThread()
+                atexit.register(_loop_thread.shutdown)
+            _loop_thread.start()
+    return _loop_thread
+
+
+def current_loop_thread() -> Optional[LoopThread]:
+    """Return the LoopThread running in the current thread, if any."""
+    return getattr(_thread_state, "loop_thread", None)
+
+
+def _reset_loop_thread() -> None:
+    # threads do not survive fork; the child starts its own loop thread on demand
+    global _loop_thread, _loop_thread_lock
+    _loop_thread = None
+    _loop_thread_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_loop_thread)
+
 
 def get_or_create_event_loop():
-    """Return the running event loop, creating and setting a new one if none exists."""
+    """Return the running loop, else this thread's loop, creating one if needed."""
     try:
-        loop = asyncio.get_event_loop()
-        return loop
+        return asyncio.get_running_loop()
     except RuntimeError:
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            return loop
-        except Exception as e:
-            raise ToolboxError(f"Failed to create event loop: {e}")
+        pass
+    loop = getattr(_thread_state, "loop", None)
+    if loop is not None and not loop.is_closed():
+        return loop
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _thread_state.loop = loop
+        return loop
+    except Exception as e:
+        raise ToolboxError(f"Failed to create event loop: {e}")
 
 
-def run_async_tasks(*tasks):
-    """Run one or more awaitables synchronously, returning a single result or a list."""
+async def _gather(*tasks):
+    return await asyncio.gather(*tasks)
+
+
+async def _await(task):
+    return await task
+
+
+def run_async_tasks(*tasks, timeout: Optional[float] = None):
+    """Run one or more awaitables on the shared loop thread and block for results.
+
+    Returns a single result for one task, otherwise a list. Safe to call from sync
+    code running inside an event loop, since the caller's loop is never re-entered.
+    """
     try:
-        loop = get_or_create_event_loop()
-        results = loop.run_until_complete(asyncio.gather(*tasks))
+        results = get_loop_thread().run(_gather(*tasks), timeout=timeout)
         return results[0] if len(tasks) == 1 else results
+    except concurrent.futures.TimeoutError:
+        raise ToolboxError(f"Timed out after {timeout}s running {len(tasks)} task(s)")
     except Exception as e:
         raise ToolboxError(f"Failed to run event loop: {e}")
 
 
 def run_async_bg_tasks(*coro_or_future):
-    """Schedule awaitables on a new event loop in a background thread."""
-    try:
+    """Schedule awaitables on the shared loop thread without waiting.
 
-        def run_in_thread(loop, tasks):
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(asyncio.gather(*tasks))
-            finally:
-                loop.close()
-
-        loop = asyncio.new_event_loop()
-        tasks = [asyncio.ensure_future(task, loop=loop) for task in coro_or_future]
-        thread = threading.Thread(target=run_in_thread, args=(loop, tasks))
-        thread.start()
-        return tasks[0] if len(tasks) == 1 else tasks
+    Returns a concurrent.futures.Future (or a list of them, one per awaitable).
+    """
+    try:
+        loop_thread = get_loop_thread()
+        futures = [loop_thread.submit(_await(task)) for task in coro_or_future]
+        return futures[0] if len(futures) == 1 else futures
     except Exception as e:
         raise ToolboxError(f"Failed to schedule background task(s): {e}")
 
 
+_RAISE = object()
+_EXHAUSTED = object()
+_pools: dict[tuple[bool, int], concurrent.futures.Executor] = {}
+_pools_lock = threading.Lock()
+_shared_args: dict[int, Any] = {}
+_shared_ids = itertools.count()
+
+
+def _mp_context(prefer_fork: bool = False) -> multiprocessing.context.BaseContext:
+    # forking while other threads run (e.g. the loop thread) can copy a held lock
+    # into the child and deadlock it, so fork only from a single-threaded process
+    methods = multiprocessing.get_all_start_methods()
+    if threading.active_count() > 1:
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        return multiprocessing.get_context(method)
+    if prefer_fork and "fork" in methods:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def get_pool(processes: bool = False, workers: Optional[int] = None):
+    """Return a persistent thread (or process) pool, shared process-wide per size."""
+    workers = workers or os.cpu_count() or 1
+    key = (processes, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if processes:
+                pool = concurrent.futures.ProcessPoolExecutor(
+                    workers, mp_context=_mp_context()
+                )
+            else:
+                pool = concurrent.futures.ThreadPoolExecutor(
+                    workers, thread_name_prefix="toolbox-pool"
+                )
+            _pools[key] = pool
+    return pool
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Shut down every persistent pool created by get_pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+atexit.register(shutdown_pools, wait=False)
+
+
+def _reset_pools() -> None:
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools)
+
+
+def _init_shared(token: int, shared: Any) -> None:
+    _shared_args[token] = shared
+
+
+def _run_chunk(func, start, chunk, capture, token=None, shared=None):
+    # token: look the shared argument up in this process (fork-inherited or
+    # installed once per worker by the pool initializer) instead of unpickling it
+    if token is not None:
+        shared = _shared_args[token]
+    results, errors = [], []
+    for i, item in enumerate(chunk):
+        try:
+            if token is None and shared is None:
+                results.append(func(item))
+            else:
+                results.append(func(shared, item))
+        except Exception as e:
+            if not capture:
+                raise
+            results.append(None)
+            errors.append((start + i, f"{type(e).__name__}: {e}"))
+    return start, results, errors
+
+
+def parallel_imap(
+    func: Callable,
+    items: Iterable,
+    workers: Optional[int] = None,
+    processes: bool = False,
+    chunksize: Optional[int] = None,
+    ordered: bool = True,
+    pool: Optional[concurrent.futures.Executor] = None,
+    reuse_pool: bool = False,
+    default: Any = _RAISE,
+    progress: Optional[Callable[[int, int], None]] = None,
+    shared: Any = None,
+) -> Iterator:
+    """Lazily yield func(item) for each item, fanned out across a thread/process pool.
+
+    Items are sent in chunks (sized automatically unless chunksize is given) with
+    a bounded number in flight. ordered=False yields results as chunks complete.
+    When default is given, items that raise yield default and a warning is
+    emitted instead of aborting the run. progress(done, total) is called in the
+    caller's thread after each chunk. When shared is given, func is called as
+    func(shared, item); a process pool created for this call receives it once
+    per worker (inherited via fork when this process is single-threaded, else
+    through the pool initializer), while persistent pools (reuse_pool or pool)
+    get it pickled with every chunk. Process pools never fork while other
+    threads are running; they use forkserver or spawn instead.
+    """
+    items = items if isinstance(items, collections.abc.Sized) else list(items)
+    total = len(items)
+    if not total:
+        return
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, -(-total // (workers * 4)))
+    capture = default is not _RAISE
+    owned = False
+    token = None
+    extra = (shared,) if shared is not None else ()
+    if pool is None and reuse_pool:
+        pool = get_pool(processes, workers)
+    if pool is None:
+        owned = True
+        if not processes:
+            pool = concurrent.futures.ThreadPoolExecutor(workers)
+        elif shared is None:
+            pool = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=_mp_context()
+            )
+        else:
+            token = next(_shared_ids)
+            extra = (token,)
+            context = _mp_context(prefer_fork=True)
+            if context.get_start_method() == "fork":
+                _shared_args[token] = shared
+                pool = concurrent.futures.ProcessPoolExecutor(
+                    workers, mp_context=context
+                )
+            else:
+                pool = concurrent.futures.ProcessPoolExecutor(
+                    workers,
+                    mp_context=context,
+                    initializer=_init_shared,
+                    initargs=(token, shared),
+                )
+
+    def chunks() -> Iterator[tuple[int, list]]:
+        if isinstance(items, collections.abc.Sequence):
+            for start in range(0, total, chunksize):
+                yield start, items[start : start + chunksize]
+        else:
+            it = iter(items)
+            for start in range(0, total, chunksize):
+                yield start, list(itertools.islice(it, chunksize))
+
+    def submit(start: int, chunk: list) -> concurrent.futures.Future:
+        if token is None:
+            args = (func, start, chunk, capture, None) + extra
+        else:
+            args = (func, start, chunk, capture) + extra
+        return pool.submit(_run_chunk, *args)
+
+    def collect(future: concurrent.futures.Future) -> list:
+        nonlocal done
+        try:
+            start, results, errors = future.result()
+        except Exception as e:
+            raise ToolboxError(f"Failed to run {func} in parallel [{e}]") from e
+        for idx, error in errors:
+            ToolboxWarning(f"Failed to safely run {func} on item {idx} [{error}]")
+            results[idx - start] = default
+        done += len(results)
+        if progress:
+            progress(done, total)
+        return results
+
+    done = 0
+    window = workers * 2
+    pending = collections.deque() if ordered else set()
+    add = pending.append if ordered else pending.add
+    source = chunks()
+    try:
+        for start, chunk in itertools.islice(source, window):
+            add(submit(start, chunk))
+        while pending:
+            if ordered:
+                finished = [pending.popleft()]
+            else:
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                pending -= finished
+            for future in finished:
+                for start, chunk in itertools.islice(source, 1):
+                    add(submit(start, chunk))
+                yield from collect(future)
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if token is not None:
+            _shared_args.pop(token, None)
+
+
+def parallel_map(
+    func: Callable,
+    items: Iterable,
+    workers: Optional[int] = None,
+    processes: bool = False,
+    chunksize: Optional[int] = None,
+    ordered: bool = True,
+    pool: Optional[concurrent.futures.Executor] = None,
+    reuse_pool: bool = False,
+    default: Any = _RAISE,
+    progress: Optional[Callable[[int, int], None]] = None,
+    shared: Any = None,
+) -> list:
+    """Return [func(item) for item in items], computed by parallel_imap."""
+    return list(
+        parallel_imap(
+            func,
+            items,
+            workers=workers,
+            processes=processes,
+            chunksize=chunksize,
+            ordered=ordered,
+            pool=pool,
+            reuse_pool=reuse_pool,
+            default=default,
+            progress=progress,
+            shared=shared,
+        )
+    )
+
+
 def safe_run(func, default=None):
     """Call func(), returning default and emitting a warning on any exception."""
     try:
@@ -59,22 +461,711 @@ def safe_run(func, default=None):
         return default
 
 
-async def async_safe_run(func, default=None):
-    """Async version of safe_run: call func() and return default on any exception."""
+async def async_safe_run(func, default=None, timeout: Optional[float] = None):
+    """Async version of safe_run: await func() and return default on any exception.
+
+    func may be a coroutine function, a plain callable, or an awaitable. When the
+    result is awaitable it is awaited, giving up after timeout seconds.
+    """
     try:
-        return func()
+        result = func() if callable(func) else func
+        if inspect.isawaitable(result):
+            result = await asyncio.wait_for(result, timeout)
+        return result
+    except asyncio.TimeoutError:
+        ToolboxWarning(f"Timed out after {timeout}s safely running: {func}")
+        return default
     except Exception as e:
         ToolboxWarning(f"Failed to safely run async function: {func} [{e}]")
         return default
 
 
+class TaskPool:
+    """Run awaitables with at most limit in flight at once.
+
+    submit() waits while the pool is full, so producers are slowed to the pace
+    of completions. Results can be consumed with as_completed() while tasks are
+    still being submitted; call close() (or leave the async with block) once no
+    more work is coming. With fail_fast=True the first failure cancels every
+    running task and is re-raised from submit(), join() and as_completed().
+    Pass keep_results=False when results are not consumed, so finished tasks
+    are not queued.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        fail_fast: bool = False,
+        timeout: Optional[float] = None,
+        keep_results: bool = True,
+    ):
+        self.limit = limit
+        self.fail_fast = fail_fast
+        self.timeout = timeout
+        self.keep_results = keep_results
+        self.submitted = 0
+        self.completed = 0
+        self._sem = asyncio.Semaphore(limit)
+        self._tasks: set[asyncio.Task] = set()
+        self._finished: asyncio.Queue = asyncio.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    async def submit(self, aw: Awaitable) -> asyncio.Task:
+        """Start aw as a task, first waiting for a free slot."""
+        if self._closed:
+            raise ToolboxError("Cannot submit to a closed TaskPool")
+        await self._sem.acquire()
+        if self._error is not None:
+            self._sem.release()
+            if inspect.iscoroutine(aw):
+                aw.close()
+            raise self._error
+        if self.timeout is not None:
+            aw = asyncio.wait_for(aw, self.timeout)
+        task = asyncio.ensure_future(aw)
+        self._tasks.add(task)
+        self.submitted += 1
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._sem.release()
+        self.completed += 1
+        if not task.cancelled() and task.exception() is not None:
+            if self.fail_fast and self._error is None:
+                self._error = task.exception()
+                self.cancel()
+        if self.keep_results:
+            self._finished.put_nowait(task)
+
+    def close(self) -> None:
+        """Mark that no more tasks will be submitted."""
+        self._closed = True
+        self._finished.put_nowait(None)  # wake as_completed() to re-check
+
+    def cancel(self) -> None:
+        """Cancel every running task."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def as_completed(self) -> AsyncIterator[Any]:
+        """Yield task results in completion order until the pool is closed and drained.
+
+        A failed task raises here (after cancelling the rest when fail_fast).
+        """
+        consumed = 0
+        while not (self._closed and consumed >= self.submitted):
+            task = await self._finished.get()
+            if task is None:
+                continue
+            consumed += 1
+            if self._error is not None:
+                raise self._error
+            if task.cancelled():
+                continue
+            yield task.result()
+
+    async def join(self) -> None:
+        """Wait for every submitted task to finish."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+        if self._error is not None:
+            raise self._error
+
+    async def __aenter__(self) -> "TaskPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if not self._closed:
+            self.close()
+        if exc_type is not None:
+            self.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            return False
+        await self.join()
+        return False
+
+
+async def run_bounded(
+    aws: Union[Iterable[Awaitable], AsyncIterable[Awaitable]],
+    limit: int = 100,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+) -> AsyncIterator[Any]:
+    """Yield results of aws in completion order, with at most limit in flight.
+
+    aws is pulled lazily (sync or async iterable), so generators producing
+    millions of coroutines are never materialised. On the first failure the
+    remaining tasks are cancelled and the error is raised, unless
+    return_exceptions=True, in which case exceptions are yielded as results.
+    """
+    if hasattr(aws, "__aiter__"):
+        source = aws.__aiter__()
+
+        async def pull() -> Any:
+            try:
+                return await source.__anext__()
+            except StopAsyncIteration:
+                return _EXHAUSTED
+
+    else:
+        source = iter(aws)
+
+        async def pull() -> Any:
+            return next(source, _EXHAUSTED)
+
+    def start(aw: Awaitable) -> asyncio.Future:
+        if timeout is not None:
+            aw = asyncio.wait_for(aw, timeout)
+        return asyncio.ensure_future(aw)
+
+    pending: set[asyncio.Future] = set()
+    done: set[asyncio.Future] = set()
+    try:
+        while len(pending) < limit:
+            aw = await pull()
+            if aw is _EXHAUSTED:
+                break
+            pending.add(start(aw))
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            while done:
+                task = done.pop()
+                aw = await pull()
+                if aw is not _EXHAUSTED:
+                    pending.add(start(aw))
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    if not return_exceptions:
+                        raise task.exception()
+                    yield task.exception()
+                else:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending or done:
+            # retrieve every outcome so none is logged as never retrieved
+            await asyncio.gather(*pending, *done, return_exceptions=True)
+
+
 def timed_run(func, *args, **kwargs):
-    """Call func with args/kwargs, print elapsed time, and return the result."""
-    exec_start = time()
+    """Call func with args/kwargs, print elapsed time, and return the result.
+
+    The duration is also recorded in the profiled() histogram for
+    func.__qualname__, the same key a profiled() decorator uses.
+    """
+    name = func.__qualname__
+    exec_start = perf_counter()
     result = func(*args, **kwargs)
-    exec_end = time()
+    exec_end = perf_counter()
+    get_histogram(name).record(int((exec_end - exec_start) * 1e9))
     printc(
-        f"[{time_now()}] {func.__name__}: completed in {exec_end - exec_start:.2f}s",
-        "yellow",
+        f"[{time_now()}] {name}: completed in {exec_end - exec_start:.2f}s", "yellow"
     )
     return result
+
+
+_SUB_BITS = 4  # 16 linear sub-buckets per power of two (<= ~6% relative error)
+_SUB_COUNT = 1 << _SUB_BITS
+_BUCKETS = 64 * _SUB_COUNT
+
+
+def _bucket_index(ns: int) -> int:
+    if ns < 2 * _SUB_COUNT:
+        return ns if ns > 0 else 0
+    shift = ns.bit_length() - _SUB_BITS - 1
+    return min(shift * _SUB_COUNT + (ns >> shift), _BUCKETS - 1)
+
+
+def _bucket_value(idx: int) -> int:
+    """Return the midpoint (in ns) of the values that land in bucket idx."""
+    if idx < 2 * _SUB_COUNT:
+        return idx
+    shift = idx // _SUB_COUNT - 1
+    low = (idx % _SUB_COUNT + _SUB_COUNT) << shift
+    return low + (1 << shift) // 2
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of nanosecond durations.
+
+    Counts live in a preallocated array, so record() allocates nothing that
+    outlives the call. Updates are not locked; under heavy thread contention a
+    few increments may be lost, which is acceptable for latency reporting.
+    """
+
+    __slots__ = ("name", "counts", "count", "total", "max")
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.counts = array("q", bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns: int) -> None:
+        """Add one duration in nanoseconds."""
+        self.counts[_bucket_index(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, q: float) -> int:
+        """Return the approximate q-th percentile (0-100) in nanoseconds."""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * q // 100))
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(_bucket_value(idx), self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Return count plus mean/p50/p90/p99/max in milliseconds."""
+        ms = 1e6
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count / ms) if self.count else 0.0,
+            "p50": self.percentile(50) / ms,
+            "p90": self.percentile(90) / ms,
+            "p99": self.percentile(99) / ms,
+            "max": self.max / ms,
+        }
+
+    def reset(self) -> None:
+        """Clear all recorded durations."""
+        for idx in range(_BUCKETS):
+            self.counts[idx] = 0
+        self.count = self.total = self.max = 0
+
+
+_histograms: dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+# sampling counters live next to the histograms so every Profiler for a name
+# (e.g. a fresh one per `with profiled(...)`) shares one call count
+_sample_counts: dict[str, itertools.count] = {}
+# start times of the open profiled blocks in this thread/task, innermost last
+_profile_starts: contextvars.ContextVar[tuple] = contextvars.ContextVar(
+    "toolbox_profile_starts", default=()
+)
+
+
+def get_histogram(name: str) -> LatencyHistogram:
+    """Return the histogram registered under name, creating it if needed."""
+    hist = _histograms.get(name)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(name, LatencyHistogram(name))
+    return hist
+
+
+def _sample_count(name: str) -> itertools.count:
+    counter = _sample_counts.get(name)
+    if counter is None:
+        with _histograms_lock:
+            counter = _sample_counts.setdefault(name, itertools.count(1))
+    return counter
+
+
+class Profiler:
+    """Times calls or blocks into the LatencyHistogram registered under name.
+
+    Created by profiled(); use it as a decorator or a (sync or async) context
+    manager. With sample < 1 only every round(1/sample)-th call for the name is
+    timed. Start times are kept per thread/task, so one instance can be entered
+    concurrently from interleaved coroutines.
+    """
+
+    def __init__(self, name: Optional[str] = None, sample: float = 1.0):
+        self.name = name
+        self.every = max(1, round(1 / sample)) if sample > 0 else 0
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name or func.__qualname__
+        hist = get_histogram(name)
+        every = self.every
+        calls = _sample_count(name)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not every or next(calls) % every:
+                    return await func(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    hist.record(perf_counter_ns() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not every or next(calls) % every:
+                return func(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.record(perf_counter_ns() - start)
+
+        return wrapper
+
+    def __enter__(self) -> "Profiler":
+        every = self.every
+        timed = every and not next(_sample_count(self.name or "unnamed")) % every
+        start = perf_counter_ns() if timed else -1
+        _profile_starts.set(_profile_starts.get() + (start,))
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        starts = _profile_starts.get()
+        _profile_starts.set(starts[:-1])
+        start = starts[-1]
+        if start >= 0:
+            get_histogram(self.name or "unnamed").record(perf_counter_ns() - start)
+        return False
+
+    async def __aenter__(self) -> "Profiler":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> bool:
+        return self.__exit__(*exc)
+
+
+def profiled(name: Optional[Any] = None, sample: float = 1.0):
+    """Record call/block durations (perf_counter_ns) into a named histogram.
+
+    Use as @profiled, @profiled("name"), @profiled(sample=0.01) on sync or async
+    functions, or as a context manager: with profiled("block"): ...
+    Decorated functions are recorded under their __qualname__ by default.
+    """
+    if callable(name):
+        return Profiler(None, sample)(name)
+    return Profiler(name, sample)
+
+
+def profile_snapshot(name: Optional[str] = None) -> dict:
+    """Return {name: stats} for every histogram, or just the stats for name."""
+    if name is not None:
+        hist = _histograms.get(name)
+        return hist.snapshot() if hist else {}
+    return {n: h.snapshot() for n, h in list(_histograms.items())}
+
+
+def profile_report(sort: str = "p99") -> None:
+    """Print a table of every histogram's stats (in ms), slowest first."""
+    rows = sorted(profile_snapshot().items(), key=lambda kv: -kv[1].get(sort, 0))
+    cols = ("count", "mean", "p50", "p90", "p99", "max")
+    printc(f"{'name':<40}" + "".join(f"{c:>12}" for c in cols), "bright_cyan")
+    for name, stats in rows:
+        cells = "".join(
+            f"{stats[c]:>12}" if c == "count" else f"{stats[c]:>12.3f}" for c in cols
+        )
+        printc(f"{name[:40]:<40}{cells}", "yellow")
+
+
+def profile_reset(name: Optional[str] = None) -> None:
+    """Reset one histogram, or all of them when name is omitted."""
+    hists = [_histograms[name]] if name in _histograms else []
+    for hist in hists if name is not None else list(_histograms.values()):
+        hist.reset()
+
+
+class ScheduledJob:
+    """A periodic job registered with a Scheduler, plus its runtime stats."""
+
+    __slots__ = (
+        "name",
+        "func",
+        "args",
+        "kwargs",
+        "interval",
+        "mode",
+        "align",
+        "offset",
+        "jitter",
+        "overrun",
+        "next",
+        "key",
+        "task",
+        "queued",
+        "cancelled",
+        "runs",
+        "skipped",
+        "failures",
+        "last_run",
+        "last_error",
+        "hist",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        interval: float,
+        mode: str = "rate",
+        align: bool = False,
+        offset: float = 0,
+        jitter: float = 0,
+        overrun: str = "skip",
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+    ):
+        if interval <= 0:
+            raise ToolboxError(f"Invalid interval for job {name}: {interval}")
+        if mode not in ("rate", "delay"):
+            raise ToolboxError(f"Invalid mode for job {name}: {mode}")
+        if overrun not in ("skip", "queue"):
+            raise ToolboxError(f"Invalid overrun policy for job {name}: {overrun}")
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.interval = interval
+        self.mode = mode
+        self.align = align
+        self.offset = offset
+        self.jitter = jitter
+        self.overrun = overrun
+        self.next = 0.0  # next nominal run, on the job's clock (wall when aligned)
+        self.key = 0.0  # monotonic time the job sits under in the heap
+        self.task: Optional[asyncio.Task] = None
+        self.queued = False
+        self.cancelled = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.hist = get_histogram(f"schedule:{name}")
+
+    def clock(self) -> float:
+        return time() if self.align else monotonic()
+
+    def stats(self) -> dict:
+        """Return run/skip/failure counts, last run info and runtime percentiles."""
+        return {
+            "interval": self.interval,
+            "mode": self.mode,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "running": self.task is not None and not self.task.done(),
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+            **self.hist.snapshot(),
+        }
+
+
+class Scheduler:
+    """Run periodic jobs from one timer heap and one sleeping task.
+
+    mode="rate" runs on a fixed grid (start + n * interval) that never drifts,
+    skipping ticks that were missed entirely; mode="delay" waits interval
+    seconds after each run finishes. align=True anchors the grid to wall-clock
+    multiples of interval (plus offset), e.g. every 300s fires at :00, :05, ...
+    When a run is still going at its next tick, overrun="skip" drops the tick
+    and overrun="queue" runs once more as soon as it finishes. Sync functions
+    run in the default thread pool so they cannot stall other jobs.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, ScheduledJob]] = []
+        self._seq = itertools.count()
+        self._jobs: dict[str, ScheduledJob] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Future] = None
+
+    def every(
+        self,
+        interval: float,
+        func: Callable,
+        *args,
+        name: Optional[str] = None,
+        mode: str = "rate",
+        align: bool = False,
+        offset: float = 0,
+        jitter: float = 0,
+        overrun: str = "skip",
+        **kwargs,
+    ) -> ScheduledJob:
+        """Schedule func(*args, **kwargs) every interval seconds, replacing name."""
+        job = ScheduledJob(
+            name or getattr(func, "__qualname__", repr(func)),
+            func,
+            interval,
+            mode=mode,
+            align=align,
+            offset=offset,
+            jitter=jitter,
+            overrun=overrun,
+            args=args,
+            kwargs=kwargs,
+        )
+        self._call(self._add, job)
+        return job
+
+    def cancel(self, job: Union[str, ScheduledJob]) -> None:
+        """Stop scheduling job (by name or object); a run in progress finishes."""
+        self._call(self._remove, job if isinstance(job, str) else job.name)
+
+    def jobs(self) -> list[ScheduledJob]:
+        """Return the scheduled jobs."""
+        return list(self._jobs.values())
+
+    def stats(self) -> dict[str, dict]:
+        """Return {name: stats} for every scheduled job."""
+        return {name: job.stats() for name, job in list(self._jobs.items())}
+
+    def _call(self, fn: Callable, *args) -> None:
+        # the heap belongs to the scheduler's loop; hop onto it from other threads
+        if self._loop is not None and self._loop.is_running():
+            try:
+                same = asyncio.get_running_loop() is self._loop
+            except RuntimeError:
+                same = False
+            if not same:
+                self._loop.call_soon_threadsafe(fn, *args)
+                return
+        fn(*args)
+
+    def _add(self, job: ScheduledJob) -> None:
+        self._remove(job.name)
+        self._jobs[job.name] = job
+        now = job.clock()
+        if job.align:
+            base = (now - job.offset) // job.interval + 1
+            job.next = base * job.interval + job.offset
+        else:
+            job.next = now + job.offset
+        self._push(job)
+
+    def _remove(self, name: str) -> None:
+        old = self._jobs.pop(name, None)
+        if old is not None:
+            old.cancelled = True
+
+    def _push(self, job: ScheduledJob) -> None:
+        # heap keys are monotonic; jitter delays the actual run, not the grid
+        delay = job.next - job.clock()
+        if job.jitter:
+            delay += random.uniform(0, job.jitter)
+        job.key = monotonic() + max(0.0, delay)
+        if self._wake is not None and (not self._heap or job.key < self._heap[0][0]):
+            self._wake.set()
+        heapq.heappush(self._heap, (job.key, next(self._seq), job))
+
+    def _advance(self, job: ScheduledJob) -> None:
+        job.next += job.interval
+        now = job.clock()
+        if job.next <= now:
+            missed = int((now - job.next) // job.interval) + 1
+            job.skipped += missed
+            job.next += missed * job.interval
+        self._push(job)
+
+    def _fire(self, job: ScheduledJob) -> None:
+        if job.task is not None and not job.task.done():
+            if job.overrun == "queue":
+                job.queued = True
+            else:
+                job.skipped += 1
+        else:
+            job.task = self._loop.create_task(self._invoke(job))
+            job.task.add_done_callback(lambda _, j=job: self._finished(j))
+        if job.mode == "rate":
+            self._advance(job)
+
+    def _finished(self, job: ScheduledJob) -> None:
+        if job.cancelled or self._wake is None:
+            return
+        if job.queued:
+            job.queued = False
+            job.task = self._loop.create_task(self._invoke(job))
+            job.task.add_done_callback(lambda _, j=job: self._finished(j))
+        elif job.mode == "delay":
+            job.next = job.clock() + job.interval
+            self._push(job)
+
+    async def _invoke(self, job: ScheduledJob) -> None:
+        start = perf_counter_ns()
+        job.last_run = time()
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await job.func(*job.args, **job.kwargs)
+            else:
+                result = await asyncio.to_thread(job.func, *job.args, **job.kwargs)
+                if inspect.isawaitable(result):
+                    await result
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            ToolboxWarning(f"Scheduled job {job.name} failed [{e}]")
+        finally:
+            job.runs += 1
+            job.hist.record(perf_counter_ns() - start)
+
+    async def run(self) -> None:
+        """Run the scheduler on the current loop until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        # re-arm every job: a previous run() may have stopped between a delay
+        # job finishing and it being pushed back, leaving it off the heap
+        self._heap.clear()
+        for job in self._jobs.values():
+            self._push(job)
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                now = monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    key, _, job = heapq.heappop(self._heap)
+                    if not job.cancelled and key == job.key:
+                        self._fire(job)
+                delay = self._heap[0][0] - now if self._heap else None
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wake = None
+            running = [
+                job.task
+                for job in self._jobs.values()
+                if job.task is not None and not job.task.done()
+            ]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def start(self) -> Union[asyncio.Task, concurrent.futures.Future]:
+        """Start run() on the running loop, or on the shared loop thread if none."""
+        if self._task is not None and not self._task.done():
+            return self._task
+        try:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        except RuntimeError:
+            self._task = get_loop_thread().submit(self.run())
+        return self._task
+
+    def stop(self) -> None:
+        """Cancel the scheduler task started by start()."""
+        if self._task is not None:
+            self._task.cancel()  # thread futures forward this to the loop's task
+            self._task = None
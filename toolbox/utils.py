@@ -4,10 +4,11 @@ import re
 import csv
 import time
 import json
+import math
 import uuid
 import inspect
 from types import FrameType
-from typing import Any, Union, Optional, List, Dict
+from typing import Any, Callable, Union, Optional, List, Dict
 from pprint import pp, pformat
 from decimal import Decimal as dec
 from datetime import datetime
@@ -20,25 +21,67 @@ from toolbox.exceptions import ToolboxError, ToolboxWarning
 from traceback import format_exc
 from rich.console import Console
 
-DEBUG = get_env("DEBUG", 0, verbose=1)
-DATE_FORMAT = get_env("DATE_FORMAT", "%Y-%m-%d %H:%M:%S.%f %z", verbose=2)
+_SETTINGS = {  # name: (default, get_env verbosity)
+    "DEBUG": (0, 1),
+    "DATE_FORMAT": ("%Y-%m-%d %H:%M:%S.%f %z", 2),
+}
 _console = Console()
 
 
-def obj_to_srl(obj: Any, dt_format: str = DATE_FORMAT, verbose: bool = False) -> Any:
+def _setting(name: str) -> Any:
+    """Return DEBUG or DATE_FORMAT, reading it with get_env on first use."""
+    try:
+        return globals()[name]
+    except KeyError:
+        default, verbose = _SETTINGS[name]
+        value = globals()[name] = get_env(name, default, verbose=verbose)
+        return value
+
+
+def _orjson() -> Any:
+    """Return the orjson module, imported on first use; None if not installed."""
+    try:
+        return globals()["orjson"]
+    except KeyError:
+        pass
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+    else:
+        globals()["_ORJSON_OPTS"] = (
+            orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+        )
+    globals()["orjson"] = orjson
+    return orjson
+
+
+def __getattr__(name: str) -> Any:
+    # DEBUG, DATE_FORMAT and orjson are resolved on first access (PEP 562), so
+    # importing toolbox.utils neither loads .env files nor imports orjson
+    if name in _SETTINGS:
+        return _setting(name)
+    if name == "orjson":
+        return _orjson()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def obj_to_srl(obj: Any, dt_format: Optional[str] = None, verbose: bool = False) -> Any:
     """Recursively convert an object to a JSON-serializable form."""
     lvl = 0 if verbose else 9
-    if DEBUG >= lvl:
+    if _setting("DEBUG") >= lvl:
         printc(
             f"[obj_to_srl] object type: {type(obj)}", color="bright_cyan", bg="black"
         )
         printc(f"[obj_to_srl] object value: {obj}", color="bright_cyan", bg="black")
-    if isinstance(obj, list) or isinstance(obj, tuple):
+    if isinstance(obj, (list, tuple, set, frozenset)):
         return [obj_to_srl(item) for item in obj]
     elif isinstance(obj, dict):
         return {key: obj_to_srl(value) for key, value in obj.items()}
     elif isinstance(obj, datetime):
-        return obj.strftime(dt_format)
+        return obj.strftime(dt_format or _setting("DATE_FORMAT"))
     elif isinstance(obj, uuid.UUID):
         return str(obj)
     elif isinstance(obj, HexBytes):
@@ -54,9 +97,73 @@ def obj_to_json(obj: Any) -> str:
     return json.dumps(obj_to_srl(obj))
 
 
+def _srl_default(obj: Any, dt_format: Optional[str] = None) -> Any:
+    """Encode a single non-JSON-native value the same way obj_to_srl does."""
+    if isinstance(obj, datetime):
+        return obj.strftime(dt_format or _setting("DATE_FORMAT"))
+    elif isinstance(obj, dec):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    elif isinstance(obj, HexBytes):
+        return obj.hex()
+    elif isinstance(obj, uuid.UUID):
+        return str(obj)
+    elif isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj: Any) -> Any:
+    """Return obj with NaN/Infinity floats replaced by None, as orjson writes them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def _json_bytes(obj: Any, default: Callable[[Any], Any]) -> bytes:
+    def dumps(obj: Any, default: Callable[[Any], Any]) -> bytes:
+        return json.dumps(
+            obj,
+            default=default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    try:
+        return dumps(obj, default)
+    except ValueError as e:
+        if "Out of range float" not in str(e):
+            raise
+    return dumps(_finite(obj), lambda o: _finite(default(o)))
+
+
+def obj_to_json_bytes(obj: Any, dt_format: Optional[str] = None) -> bytes:
+    """Serialize obj straight to compact UTF-8 JSON bytes in a single pass.
+
+    Produces the same values as obj_to_srl (Decimal, datetime, UUID, HexBytes)
+    without building an intermediate copy; uses orjson when it is installed and
+    falls back to the stdlib encoder for what orjson rejects (ints beyond 64
+    bits). NaN and Infinity are written as null by both encoders.
+    """
+    default = (
+        _srl_default if dt_format is None else lambda o: _srl_default(o, dt_format)
+    )
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_OPTS)
+        except TypeError:
+            pass
+    return _json_bytes(obj, default)
+
+
 def trace(msg: Optional[str] = "") -> str:
     """Return msg appended with the current traceback when DEBUG >= 2."""
-    if DEBUG < 2:
+    if _setting("DEBUG") < 2:
         return msg
     return f"{msg}\n\n{format_exc()}" if msg else format_exc()
 
@@ -316,7 +423,7 @@ def printc(
     lvl: int = -1,
 ) -> None:
     """Print text with ANSI foreground/background color and optional padding."""
-    if DEBUG < lvl:
+    if _setting("DEBUG") < lvl:
         return
     colors = {
         "default": "\033[0m",
@@ -391,7 +498,7 @@ def proc_msg(
     caller_file, caller_func = get_caller(caller)
     header = f"⚠️ [{caller_file}:{caller_func}] {tag}:"
     printc(f"{header} {msg}", col1, bg, pad=1)
-    if traceback and DEBUG > 1:
+    if traceback and _setting("DEBUG") > 1:
         printc(f"🔍 {format_exc()}", col2, pad=0)
     message = trace(msg) if traceback else msg
     return message
@@ -420,7 +527,7 @@ def debug(
     no_nl: bool = False,
 ) -> None:
     """Print a labeled debug dump of var when DEBUG >= lvl."""
-    if not always and DEBUG < lvl:
+    if not always and _setting("DEBUG") < lvl:
         return
 
     i = f":{lvl}" if lvl > 1 else ""
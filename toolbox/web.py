@@ -1,18 +1,161 @@
+import copy
 import json
+import time
 import asyncio
 import aiohttp
-from toolbox.runner import run_async_tasks
+from typing import Any, Awaitable, Callable, Hashable
+from toolbox.runner import run_async_tasks, current_loop_thread
 from toolbox.utils import debug
 from toolbox.exceptions import ToolboxError
 
 
+class SingleFlight:
+    """Share one in-flight call between concurrent callers asking for the same key.
+
+    The first caller for a key starts the call; callers arriving while it is still
+    running await the same task. With ttl > 0 the result is also kept for ttl
+    seconds and returned to later callers without calling func again (the same
+    object is handed to every caller, so treat it as read-only). Cancelling one
+    caller only cancels its own wait; the shared call is cancelled once every
+    caller waiting on it has gone.
+    """
+
+    def __init__(self, ttl: float = 0, max_results: int = 1024):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._calls: dict[Hashable, list] = {}  # key -> [task, waiters]
+        self._results: dict[Hashable, tuple[float, Any]] = {}  # key -> (expiry, res)
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        ttl: float | None = None,
+        cache_if: Callable[[Any], bool] | None = None,
+        **kwargs,
+    ) -> Any:
+        """Await func(*args, **kwargs), coalescing with any in-flight call for key.
+
+        cache_if, when given, decides whether a finished result may be kept.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl:
+            hit = self._results.get(key)
+            if hit:
+                if hit[0] > time.monotonic():
+                    return hit[1]
+                self._results.pop(key, None)
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        if call is None or call[0].get_loop() is not loop:
+            task = loop.create_task(func(*args, **kwargs))
+            call = self._calls[key] = [task, 0]
+            task.add_done_callback(
+                lambda t, c=call: self._done(key, c, t, ttl, cache_if)
+            )
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if call[1] == 1 and not task.done():
+                task.cancel()
+                # drop it now so a caller arriving before _done runs starts afresh
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            call[1] -= 1
+
+    def _done(
+        self,
+        key: Hashable,
+        call: list,
+        task: asyncio.Task,
+        ttl: float,
+        cache_if: Callable[[Any], bool] | None,
+    ) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not ttl or task.cancelled() or task.exception() is not None:
+            return
+        if cache_if and not cache_if(task.result()):
+            return
+        if len(self._results) >= self.max_results:
+            now = time.monotonic()
+            for k in [k for k, (exp, _) in self._results.items() if exp <= now]:
+                del self._results[k]
+            if len(self._results) >= self.max_results:
+                self._results.pop(next(iter(self._results)))
+        self._results[key] = (time.monotonic() + ttl, task.result())
+
+    def running(self, key: Hashable) -> bool:
+        """Return True if a call for key is currently in flight."""
+        return key in self._calls
+
+    def in_flight(self) -> int:
+        """Return the number of calls currently in flight."""
+        return len(self._calls)
+
+    def forget(self, key: Hashable) -> None:
+        """Drop any cached result for key; in-flight calls are left untouched."""
+        self._results.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._results.clear()
+
+
+_url_flight = SingleFlight()
+_sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+
+def _loop_session() -> aiohttp.ClientSession | None:
+    """Return a pooled session when running on the shared loop thread, else None."""
+    loop_thread = current_loop_thread()
+    if loop_thread is None:
+        return None
+    loop = loop_thread.loop
+    session = _sessions.get(loop)
+    if session is not None and not session.closed:
+        return session
+    if loop not in _sessions:
+        # one hook per loop; it closes whichever session is current at shutdown
+
+        async def close() -> None:
+            closing = _sessions.pop(loop, None)
+            if closing is not None:
+                await closing.close()
+
+        loop_thread.on_shutdown(close)
+    session = _sessions[loop] = aiohttp.ClientSession()
+    return session
+
+
+def _flight_key(url: str, headers: dict, payload: dict, response_type: str) -> tuple:
+    return (
+        url,
+        tuple(sorted((str(k).lower(), str(v)) for k, v in headers.items())),
+        json.dumps(payload, sort_keys=True, default=str) if payload else "",
+        response_type,
+    )
+
+
 async def async_get_url(
     url: str | list[str],
     headers: dict = {},
     payload: dict = {},
     response_type: str = "text",
+    coalesce: bool = False,
+    cache_ttl: float = 0,
 ):
-    """Fetch one or more URLs asynchronously and return status codes with responses."""
+    """Fetch one or more URLs asynchronously and return status codes with responses.
+
+    With coalesce=True, identical requests already in flight anywhere in the
+    process are shared instead of hitting the network again; cache_ttl > 0 also
+    keeps successful results for that many seconds.
+    """
 
     async def decode_response(resp: aiohttp.ClientResponse, response_type: str):
         if response_type == "json":
@@ -31,33 +174,41 @@ async def async_get_url(
         debug(response, url, lvl=3)
         return response
 
+    async def request(session: aiohttp.ClientSession, url: str) -> dict:
+        kwargs = {"data": json.dumps(payload)} if payload else {}
+        async with session.get(url, headers=headers, **kwargs) as resp:
+            return await prep_response(resp, url, response_type=response_type)
+
     async def fetch_url(url: str) -> dict:
         try:
+            session = _loop_session()
+            if session is not None:
+                return await request(session, url)
             async with aiohttp.ClientSession() as session:
-                if payload:
-                    async with session.get(
-                        url, headers=headers, data=json.dumps(payload)
-                    ) as resp:
-                        return await prep_response(
-                            resp, url, response_type=response_type
-                        )
-                else:
-                    async with session.get(url, headers=headers) as resp:
-                        return await prep_response(
-                            resp, url, response_type=response_type
-                        )
+                return await request(session, url)
         except Exception as e:
             ToolboxError(f"Error fetching url={url} [{e}]")
             return {"code": -1, "resp": None}
 
+    async def get(url: str) -> dict:
+        if not coalesce and not cache_ttl:
+            return await fetch_url(url)
+        key = _flight_key(url, headers, payload, response_type)
+        shared = await _url_flight.do(
+            key, fetch_url, url, ttl=cache_ttl, cache_if=lambda r: r["code"] != -1
+        )
+        # the flight result is shared with other callers and the cache: hand out
+        # a copy so mutating it can't leak into later responses
+        return copy.deepcopy(shared) if response_type == "json" else dict(shared)
+
     if isinstance(url, list):
         url = list(dict.fromkeys(url))
-        result = await asyncio.gather(*[fetch_url(u) for u in url])
+        result = await asyncio.gather(*[get(u) for u in url])
         result = {r["url"]: {"code": r["code"], "resp": r["resp"]} for r in result}
         if len(url) == 1:
             url = url[0]
     else:
-        result = await fetch_url(url)
+        result = await get(url)
     debug(result, "result", lvl=3)
     return result[url] if len(result) == 1 else result
 
@@ -67,10 +218,17 @@ def get_url(
     headers: dict = {},
     payload: dict = {},
     response_type: str = "text",
+    coalesce: bool = False,
+    cache_ttl: float = 0,
 ):
     """Synchronous wrapper around async_get_url."""
     return run_async_tasks(
         async_get_url(
-            url, headers=headers, payload=payload, response_type=response_type
+            url,
+            headers=headers,
+            payload=payload,
+            response_type=response_type,
+            coalesce=coalesce,
+            cache_ttl=cache_ttl,
         )
     )